@@ -51,29 +51,129 @@
 
 PYGAME_HIDE_SUPPORT_PROMPT = 1
 
+from profiling import ProfileSession, StartupTimer # first, it starts the startup timer
 import pygame
-from game_play import Gameplay
 from intro_about_help import IntroPage, Version, IntroPage
+from config import Config
+from settings import Settings
+from scale import Scale
+import argparse
+import asyncio
 import os 
 
-def main() :
+def parse_args(argv = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog = "ConnectLog2", description = "Connect tiles with the same log2 value to make the highest tile.")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument("--new", action = "store_true", help = "skip the intro and start a new game")
+    start.add_argument("--load", action = "store_true", help = "skip the intro and continue the saved game")
+    parser.add_argument("--leaderboard", metavar = "URL",
+                        help = "shared leaderboard server, e.g. http://localhost:8765 (see leaderboard_server.py)")
+    parser.add_argument("--bot-socket", metavar = "PATH|PORT",
+                        help = "let a program play the game over this unix socket or tcp port (see bot_api.py)")
+    parser.add_argument("--telemetry", metavar = "DIR", nargs = "?", const = "",
+                        help = "record every move in columnar files (needs numpy), default directory: telemetry in the user data path")
+    parser.add_argument("--fps", type = int, help = "target frames per second for this session (default: the settings, 60)")
+    parser.add_argument("--quality", choices = Settings.QUALITIES,
+                        help = "animation quality for this session, auto: lowered when the frames take too long (default: the settings)")
+    parser.add_argument("--scale", type = float,
+                        help = "scale of the window contents, e.g. 1.5 (default: from the display), the window can also be resized")
+    parser.add_argument("--replay", metavar = "FILE", nargs = "?", const = "",
+                        help = "watch the replay of a finished game, default: the last one")
+    parser.add_argument("--profile", choices = ProfileSession.MODES,
+                        help = "profile the session with cProfile or a sampling profiler and write a report at exit")
+    parser.add_argument("--profile-out", metavar = "PATH",
+                        help = "file for the profile report (default: profile-<time>.txt in the user data path)")
+    parser.add_argument("--exit-after-first-frame", action = "store_true",
+                        help = "quit as soon as the first frame is shown (startup benchmark)")
+    return parser.parse_args(argv)
+
+def main(argv = None) :
+    args = parse_args(argv)
+    StartupTimer.exit_after_first_frame = args.exit_after_first_frame
+    if args.leaderboard:
+        Config.LEADERBOARD_URL = args.leaderboard
+    session: ProfileSession | None = ProfileSession(args.profile, args.profile_out) if args.profile else None
+    if session:
+        session.start()
+    try:
+        asyncio.run(run(IntroPage.Return.NEW if args.new else IntroPage.Return.LOAD if args.load else None, args.bot_socket, args.telemetry, args.replay,
+                        args.fps, args.quality, args.scale))
+    finally:
+        if session:
+            session.stop()
+
+# start: NEW or LOAD skips the intro
+# the screens are coroutines, other tasks (network, bots, ...) can share the event loop without threads
+# telemetry: directory for the move telemetry, "" for the default, None: no telemetry
+# replay: only show the replay of this file, "" for the last finished game
+# fps, quality: the frame target of this session instead of the settings
+# scale: of the window contents (scale.py), None: from the display
+async def run(start: IntroPage.Return | None = None, bot_socket: str | None = None, telemetry: str | None = None,
+              replay: str | None = None, fps: int | None = None, quality: str | None = None, scale: float | None = None) :
     print("Starting the python application")
     
-    pygame.init()
+    # only the used modules, initialising the audio device can take a while
+    Scale.enable_high_dpi()
+    pygame.display.init()
+    pygame.font.init()
     pygame.display.set_caption(f"Connect Log2 V{Version.PROGRAM_VERSION}")
 
     dir_path = os.path.dirname(os.path.realpath(__file__))
     programIcon = pygame.image.load(os.path.join(dir_path, 'images', 'Tile1-small.png'))
     pygame.display.set_icon(programIcon)
 
-    screen_width = 420
-    screen_height = 640
-    screen: pygame.Surface = pygame.display.set_mode((screen_width, screen_height))
-    intro: IntroPage = IntroPage(screen)
-    rc = intro.show()
+    # resizable, the contents are scaled to the window (scale.py)
+    Scale.factor = max(Scale.MIN_FACTOR, scale) if scale else Scale.get_system_factor()
+    screen: pygame.Surface = pygame.display.set_mode(Scale.get_window_size(), pygame.RESIZABLE)
+    rc = start
+    slot: str | None = None # --load: the most recent save slot
+    if replay is not None:
+        from replay import Replay, ReplayViewer
+        if path := replay or Replay.get_latest():
+            # a path of the command line may be missing or not be a replay
+            try:
+                await ReplayViewer(screen, Replay.read(path)).display()
+            except (OSError, KeyError, ValueError, TypeError) as e:
+                print(f"Can't replay {path}: {e}")
+        else:
+            print("No finished game to replay")
+        rc = IntroPage.Return.QUIT
+    elif not rc:
+        intro: IntroPage = IntroPage(screen)
+        while True:
+            rc = await intro.show()
+            if rc != IntroPage.Return.LOAD:
+                break
+            # choose the save slot, <esc> goes back to the intro
+            from save_slots import SaveSlots, LoadScreen
+            load_screen = LoadScreen(screen, SaveSlots())
+            if slot := await load_screen.choose():
+                break
+            if load_screen.quit:
+                rc = IntroPage.Return.QUIT
+                break
     if rc == IntroPage.Return.NEW or rc == IntroPage.Return.LOAD:
+        from game_play import Gameplay # deferred: not needed to show the intro
         gameplay: Gameplay = Gameplay(screen)
-        gameplay.play(Gameplay.Start.NEW if rc == IntroPage.Return.NEW else Gameplay.Start.LOAD)
+        if fps or quality:
+            gameplay.set_frame_target(fps or gameplay.settings.target_fps, quality or gameplay.settings.quality)
+        if telemetry is not None:
+            from telemetry import TelemetryWriter
+            gameplay.set_telemetry(TelemetryWriter(telemetry or os.path.join(Config.get_user_datapath(), 'telemetry')))
+        bot_api = None
+        if bot_socket:
+            from bot_api import BotApi, AttachedGame
+            # the moves of a bot aren't animated, the board shows the result on the next frame
+            gameplay.set_animation_delay(0)
+            bot_api = BotApi(AttachedGame(gameplay), bot_socket)
+            await bot_api.start()
+        try:
+            await gameplay.play(Gameplay.Start.NEW if rc == IntroPage.Return.NEW else Gameplay.Start.LOAD, slot)
+        finally:
+            if bot_api:
+                await bot_api.stop()
+            if gameplay.telemetry:
+                gameplay.telemetry.close()
 
     print("Closing the application")
     pygame.quit()
@@ -0,0 +1,244 @@
+# benchmark suite, runs without a window on the SDL dummy video driver
+#   python benchmark.py                         run all benchmarks and print the results
+#   python benchmark.py --save baseline.json    also write the results as a baseline
+#   python benchmark.py --compare baseline.json flag results slower than the baseline (exit code 1 on a regression)
+#   python benchmark.py --filter refill         only the benchmarks with 'refill' in the name
+# the hiscore and save files are written in a temporary directory, not in the real data paths
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Self, Callable, List
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pygame
+
+from config import Config
+from board import Board
+from scale import Scale
+from grid import Grid
+from tiles import Tiles, TilePos
+from game_play import Gameplay
+from hiscore import HiScore
+from intro_about_help import Version
+
+@dataclass
+class Result:
+    name: str
+    times: List[float] # seconds per call
+
+    def to_json(self: Self):
+        times = sorted(self.times)
+        return { 'median_us': statistics.median(times) * 1e6,
+                 'min_us': times[0] * 1e6,
+                 'p95_us': times[min(len(times) - 1, len(times) * 95 // 100)] * 1e6,
+                 'runs': len(times) }
+
+class Benchmarks:
+    SCREEN_SIZE = (420, 640)
+    BOARD_SIZES = [(5, 6), (8, 10), (12, 16)] # columns, rows
+    CHAIN_LENGTHS = [2, 4, 8]
+
+    def __init__(self: Self, repeat: int, name_filter: str | None):
+        self.repeat = repeat
+        self.name_filter = name_filter
+        self.results: List[Result] = []
+        self.screen: pygame.Surface | None = None
+        # the coroutines (refill, make_move, ...) run on 1 event loop for all benchmarks
+        self.loop = asyncio.new_event_loop()
+
+    # time fn repeat times, setup (not timed) is called before every call
+    def measure(self: Self, name: str, fn: Callable, setup: Callable | None = None, repeat: int | None = None) -> None:
+        if self.name_filter and self.name_filter not in name:
+            return
+        # 1 call first that isn't timed: font loading, caches, ...
+        if setup:
+            setup()
+        fn()
+        times = []
+        for _ in range(repeat if repeat else self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        result = Result(name, times)
+        self.results.append(result)
+        js = result.to_json()
+        print(f"{name:<40}{js['median_us']:>12.1f} us  (min {js['min_us']:.1f}, p95 {js['p95_us']:.1f})")
+
+    def run(self: Self) -> None:
+        pygame.init()
+        self.screen = pygame.display.set_mode(Benchmarks.SCREEN_SIZE)
+        random.seed(2024)
+        self.grid_benchmarks()
+        self.move_benchmarks()
+        self.draw_benchmarks()
+        self.hiscore_benchmarks()
+        pygame.quit()
+        self.loop.close()
+        self.startup_benchmark()
+
+    @staticmethod
+    def fill(grid: Grid, numbers: Callable[[TilePos], int]) -> None:
+        for y in range(grid.NBR_ROWS):
+            for x in range(grid.NBR_COLUMNS):
+                grid.set_tile(TilePos(x, y), numbers(TilePos(x, y)))
+
+    def grid_benchmarks(self: Self) -> None:
+        for columns, rows in Benchmarks.BOARD_SIZES:
+            grid = Grid(Board(self.screen), columns, rows)
+            def make_holes():
+                Benchmarks.fill(grid, lambda p: random.randrange(1, 9))
+                for i in random.sample(range(columns * rows), columns):
+                    grid.remove_tile(TilePos(i % columns, i // columns))
+            self.measure(f"grid.refill {columns}x{rows}", lambda: self.loop.run_until_complete(grid.refill(1, 9, 0)), make_holes)
+
+            # no neighbours with the same number: the whole board is scanned
+            Benchmarks.fill(grid, lambda p: 1 + (p.x % 2) + 2 * (p.y % 2))
+            self.measure(f"grid.check_connections none {columns}x{rows}", grid.check_connections_possible, repeat = self.repeat * 10)
+            Benchmarks.fill(grid, lambda p: random.randrange(1, 9))
+            self.measure(f"grid.check_connections random {columns}x{rows}", grid.check_connections_possible, repeat = self.repeat * 10)
+
+    def move_benchmarks(self: Self) -> None:
+        gameplay = Gameplay(self.screen)
+        gameplay.set_animation_delay(0)
+        grid = gameplay.grid
+        # a snake through the board starting in the top left corner
+        snake = [TilePos(x if y % 2 == 0 else grid.MAX_X - x, y) for y in range(grid.NBR_ROWS) for x in range(grid.NBR_COLUMNS)]
+        for length in Benchmarks.CHAIN_LENGTHS:
+            def prepare_chain():
+                Benchmarks.fill(grid, lambda p: 1 + (p.x + p.y) % 4)
+                for p in snake[:length]:
+                    grid.set_tile(p, 3)
+                gameplay.marked_tiles = [TilePos(p.x, p.y) for p in snake[:length]]
+                gameplay.tile_range = gameplay.get_tile_range(1)
+            self.measure(f"gameplay.make_move chain {length}", lambda: self.loop.run_until_complete(gameplay.make_move()), prepare_chain)
+
+    def draw_benchmarks(self: Self) -> None:
+        board = Board(self.screen)
+        grid = Grid(board)
+        Benchmarks.fill(grid, lambda p: random.randrange(1, 12))
+        self.measure("board.draw", board.draw, repeat = self.repeat * 5)
+        board.set_marked_tiles([TilePos(0, y) for y in range(grid.NBR_ROWS)])
+        self.measure("board.draw marked chain", board.draw, repeat = self.repeat * 5)
+        self.measure("tiles.get_tile", lambda: [Tiles.get_tile(n) for n in range(1, 23)])
+        # a resize of the window: the tiles rendered at another scale and back (scale.py)
+        def rescale():
+            for factor in (2.0, 1.0):
+                Scale.factor = factor
+                Board.set_scale()
+                board.rescale()
+                board.draw()
+        self.measure("board.rescale 2x and back", rescale)
+
+    def hiscore_benchmarks(self: Self) -> None:
+        scores = [{ 'points': 1000 * i, 'tile': 10, 'user': 'benchmark', 'datetime': '2024-01-01 00:00:00' } for i in range(HiScore.MAX_SCORES)]
+        def write_scores():
+            Config.make_datapath()
+            with open(os.path.join(Config.get_datapath(), 'hiscore.json'), 'w') as f:
+                json.dump(scores, f)
+        write_scores()
+        self.measure("hiscore.load", lambda: HiScore('benchmark', self.screen))
+        hiscore = HiScore('benchmark', self.screen)
+        points = iter(range(10 ** 6, 10 ** 7))
+        # a new hiscore is saved and displayed, the posted key ends the display
+        def save():
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key = pygame.K_SPACE, mod = 0))
+            self.loop.run_until_complete(hiscore.add_score(next(points), 12))
+        self.measure("hiscore.save (add_score)", save)
+
+    # ConnectLog2.main in a new process up to the first interactive frame, via the intro and straight into a game
+    def startup_benchmark(self: Self) -> None:
+        script = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'ConnectLog2.py')
+        env = dict(os.environ, CONNECTLOG2_DATAPATH = Config.DATAPATH, CONNECTLOG2_USER_DATAPATH = Config.get_user_datapath())
+        for name, options in [("startup", []), ("startup --new", ['--new'])]:
+            if self.name_filter and self.name_filter not in name:
+                continue
+            first_frame, process = [], []
+            for _ in range(max(3, self.repeat // 10)):
+                start = time.perf_counter()
+                out = subprocess.run([sys.executable, script, '--exit-after-first-frame'] + options, env = env, capture_output = True, text = True).stdout
+                process.append(time.perf_counter() - start)
+                if m := re.search(r"First interactive frame \(\w+\) after (\d+) ms", out):
+                    first_frame.append(int(m.group(1)) / 1000)
+            for result in [Result(f"{name} first frame", first_frame), Result(f"{name} process", process)]:
+                if result.times:
+                    self.results.append(result)
+                    print(f"{result.name:<40}{result.to_json()['median_us']:>12.1f} us")
+
+    def to_json(self: Self):
+        return { 'meta': { 'version': Version.PROGRAM_VERSION,
+                           'python': platform.python_version(),
+                           'pygame': pygame.version.ver,
+                           'platform': platform.platform(),
+                           'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S") },
+                 'results': { r.name: r.to_json() for r in self.results } }
+
+# compare the medians with a baseline, returns the number of regressions
+def compare(current, baseline, threshold: float) -> int:
+    regressions = 0
+    print(f"\n{'benchmark':<40}{'baseline us':>12}{'current us':>12}{'ratio':>8}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base:
+            print(f"{name:<40}{'-':>12}{result['median_us']:>12.1f}    (new)")
+            continue
+        ratio = result['median_us'] / max(base['median_us'], 1e-9)
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "faster"
+        print(f"{name:<40}{base['median_us']:>12.1f}{result['median_us']:>12.1f}{ratio:>8.2f}  {flag}")
+    return regressions
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = "ConnectLog2 benchmarks (SDL dummy video driver)")
+    parser.add_argument("--repeat", type = int, default = 50, help = "calls per benchmark (default 50)")
+    parser.add_argument("--filter", help = "only run benchmarks with this text in the name")
+    parser.add_argument("--save", metavar = "PATH", help = "write the results as json")
+    parser.add_argument("--compare", metavar = "PATH", help = "compare with a baseline written by --save")
+    parser.add_argument("--threshold", type = float, default = 0.15, help = "relative slowdown flagged as regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    data_dir = tempfile.mkdtemp(prefix = "connectlog2-bench-")
+    Config.DATAPATH = os.path.join(data_dir, 'data')
+    Config.USER_DATAPATH = os.path.join(data_dir, 'user')
+    try:
+        benchmarks = Benchmarks(args.repeat, args.filter)
+        benchmarks.run()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors = True)
+
+    results = benchmarks.to_json()
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent = 2)
+        print(f"Results written to {args.save}")
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if (regressions := compare(results, baseline, args.threshold)):
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
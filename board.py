@@ -1,13 +1,20 @@
 # the board to be displayed, contains tile-sprites. uses a group to interface with pygame
+# the background with the lines between the marked tiles is a persistent layer: when the chain grows a segment is drawn,
+# when it shrinks only the rects of the removed segments are cleared and the segments that cross them are drawn again
+# the background spans the width of the window, the part next to the tiles of a wider window is drawn with it
+# the tiles and the lines are drawn at the scale of the window (scale.py), rescale() after set_scale()
 
 from typing import Self, Tuple, Dict
 
 import pygame
 
 from tiles import Tile, Tiles, TilePos, TileState
+from profiling import Profiler
+from scale import Scale
 
 class Board(object):
-    SEP = 5 # space between tiles
+    BASE_SEP = 5 # space between tiles at scale 1
+    SEP = BASE_SEP # at the current scale
 
     def __init__(self: Self, screen: pygame.Surface):
         self.__group = pygame.sprite.Group()
@@ -15,8 +22,22 @@ class Board(object):
         self.__number_rows : int = 0
         self.__number_columns : int = 0
         self.__tiles = {}
-        self.__marked_tiles = []
+        self.__marked_tiles = [] # a copy, the caller changes its list
         self.__background : pygame.Surface = None
+        self.__segments = [] # rects of the drawn lines, segment i is between marked tile i and i + 1
+        self.__line_width : int = 7 # of the lines between the marked tiles, 0: no lines (see frame_governor.py)
+
+    # the sizes of the tiles and the space between them at the current scale
+    @staticmethod
+    def set_scale() -> None:
+        Tiles.set_scale()
+        Board.SEP = Scale.px(Board.BASE_SEP)
+
+    # the tiles and the lines again at the current scale
+    def rescale(self: Self) -> None:
+        for pos, tile in list(self.__tiles.items()):
+            self.set_tile(pos, tile.number)
+        self.__background = None
 
     def set_number_rows(self: Self, rows: int) -> None:
         self.__number_rows = rows
@@ -32,23 +53,46 @@ class Board(object):
 
     def empty(self: Self) -> None:
         self.__group.empty()
+        self.__tiles = {}
 
     def set_tile(self: Self, pos: TilePos, number: int) -> None:
         tile = Tiles.get_tile(number)
         Tile.update(tile, pos = (pos.x * (Tile.WIDTH + Board.SEP), pos.y * (Tile.HEIGHT + self.SEP)))
+        if pos in self.__marked_tiles:
+            tile.mark(TileState.ON)
+        if old := self.__tiles.get(pos):
+            self.__group.remove(old)
         self.__tiles[pos] = tile
+        self.__group.add(tile)
 
     def remove_tile(self: Self, pos: TilePos):
-        del self.__tiles[pos]
+        self.__group.remove(self.__tiles.pop(pos))
 
     def highlight(self: Self, pos: TilePos, state: TileState) -> None:
         if t := self.__tiles[pos]:
             t.highlight(state)
 
-    def set_marked_tiles(self: Self, marked_tiles) -> None: 
-        self.__marked_tiles = marked_tiles
-        for p in self.__tiles:
-            self.__tiles[p].mark(TileState.ON if p in self.__marked_tiles else TileState.OFF)
+    # only the tiles and the lines that changed since the last call
+    def set_marked_tiles(self: Self, marked_tiles) -> None:
+        old = self.__marked_tiles
+        new = [TilePos(p.x, p.y) for p in marked_tiles]
+        same = 0 # the chains are the same up to here
+        while same < min(len(old), len(new)) and old[same] == new[same]:
+            same += 1
+        for p in set(old) - set(new):
+            if t := self.__tiles.get(p):
+                t.mark(TileState.OFF)
+        for p in new[same:]:
+            if t := self.__tiles.get(p):
+                t.mark(TileState.ON)
+        self.__marked_tiles = new
+        if self.__background is not None:
+            self.__update_lines(max(0, same - 1))
+
+    def set_line_width(self: Self, width: int) -> None:
+        if width != self.__line_width:
+            self.__line_width = width
+            self.__background = None # drawn again with the new width
 
     def get_tile_rect(self: Self, pos: TilePos) -> pygame.Rect:
         if t := self.__tiles.get(pos):
@@ -56,26 +100,39 @@ class Board(object):
         else: 
             return None
 
-    def __draw_background(self: Self) -> None:
-        self.__background = pygame.Surface((self.get_width(), self.get_height()))
-        self.__background.fill("grey")
-        if len(self.__marked_tiles) > 1:
-            centers = [(p.x * (Tile.WIDTH + Board.SEP) + Tile.WIDTH / 2, p.y * (Tile.HEIGHT + Board.SEP) + Tile.HEIGHT / 2) for p in self.__marked_tiles]
-            for c1, c2 in zip(centers, centers[1:]):
-                pygame.draw.line(self.__background, pygame.Color("black"), c1, c2, 7)
-        self.__screen.blit(self.__background, self.__background.get_rect())
-
-    def __put_tiles_in_group(self: Self) -> None:
-        self.empty()
-        for t in self.__tiles.values():
-            self.__add_tile_sprite(t)
-
-    def __add_tile_sprite(self: Self, t: pygame.sprite) -> None:
-        self.__group.add(t)
+    @staticmethod
+    def __get_center(p: TilePos) -> Tuple[float, float]:
+        return (p.x * (Tile.WIDTH + Board.SEP) + Tile.WIDTH / 2, p.y * (Tile.HEIGHT + Board.SEP) + Tile.HEIGHT / 2)
+
+    def __draw_segment(self: Self, i: int) -> pygame.Rect:
+        return pygame.draw.line(self.__background, pygame.Color("black"), Board.__get_center(self.__marked_tiles[i]),
+                                Board.__get_center(self.__marked_tiles[i + 1]), max(1, Scale.px(self.__line_width)))
+
+    # the segments from the first changed one: the removed ones are cleared, the new ones drawn
+    def __update_lines(self: Self, first: int) -> None:
+        count = max(0, len(self.__marked_tiles) - 1) if self.__line_width > 0 else 0
+        removed = self.__segments[first:]
+        del self.__segments[first:]
+        for rect in removed:
+            self.__background.fill("grey", rect)
+        for rect in removed:
+            for i in rect.collidelistall(self.__segments):
+                self.__draw_segment(i)
+        for i in range(first, count):
+            self.__segments.append(self.__draw_segment(i))
 
+    def __draw_background(self: Self) -> None:
+        size = (max(self.get_width(), self.__screen.get_width()), self.get_height())
+        if self.__background is None or self.__background.get_size() != size:
+            self.__background = pygame.Surface(size)
+            self.__background.fill("grey")
+            self.__segments = []
+            self.__update_lines(0)
+        self.__screen.blit(self.__background, (0, 0))
+
+    @Profiler.timed("Board.draw")
     def draw(self: Self) -> None:
         self.__draw_background()
-        self.__put_tiles_in_group()
         self.__group.draw(self.__screen)
 
 
@@ -0,0 +1,177 @@
+# bot api: lets programs play the game over a local socket, without the mouse and keyboard handling
+#   python bot_api.py --socket /tmp/cl2-bot.sock      headless: the rules of GameState, no window (fastest)
+#   python ConnectLog2.py --new --bot-socket /tmp/cl2-bot.sock
+#                                                     the game on screen: moves go through Gameplay and Grid,
+#                                                     the window is drawn at its frame rate, not after every move
+# a number instead of a path listens on that tcp port of localhost (no unix sockets in asyncio on windows)
+#
+# protocol: 1 json object per line, 1 answer line per request, in order (requests can be sent ahead)
+#   {"op": "state"}                      -> {"columns", "rows", "tile-numbers", "range", "score", "moves-possible"}
+#   {"op": "move", "chain": [[x, y], ...]} -> {"diff": [[x, y, number], ...], "range", "score", "moves-possible"}
+#   {"op": "new", ["seed": 123]}         -> like state, a new game (the seed only for headless games), a game on screen
+#                                           is finished first like at its end: hiscore, statistics, replay
+# an invalid request or move gets {"error": reason}
+
+from typing import Self, List, Tuple
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from game_state import GameState
+
+# the game of the bot without graphics
+class HeadlessGame:
+    # telemetry: TelemetryWriter (telemetry.py) to record the moves like Gameplay does
+    def __init__(self: Self, columns: int = GameState.COLUMNS, rows: int = GameState.ROWS, seed: int | None = None, telemetry = None):
+        self.state = GameState(columns, rows, seed)
+        self.telemetry = telemetry
+        self.__game_id: int = telemetry.new_game_id() if telemetry else 0
+        self.__last_move_time: float = time.perf_counter()
+
+    def get_state(self: Self):
+        state = self.state
+        return { 'columns': state.columns, 'rows': state.rows, 'tile-numbers': list(state.cells),
+                 'range': [state.low, state.high], 'score': state.score, 'moves-possible': state.has_moves() }
+
+    async def move(self: Self, chain: List[Tuple[int, int]]):
+        state = self.state
+        if not self.telemetry:
+            diff = state.apply_chain(chain)
+        else:
+            start = time.perf_counter()
+            before, low, high = bytes(state.cells), state.low, state.high
+            diff = state.apply_chain(chain)
+            end = time.perf_counter()
+            inputs = [before[state.index(int(x), int(y))] for x, y in chain]
+            self.telemetry.add_move(self.__game_id, state.moves, inputs, state.rules.merged_number(inputs), low, high,
+                                    state.low, state.high, (start - self.__last_move_time) * 1000, (end - start) * 1000, state.score)
+            self.__last_move_time = end
+        return { 'diff': diff, 'range': [state.low, state.high], 'score': state.score, 'moves-possible': state.has_moves() }
+
+    async def new(self: Self, seed: int | None = None):
+        self.state = GameState(self.state.columns, self.state.rows, seed)
+        if self.telemetry:
+            self.__game_id = self.telemetry.new_game_id()
+        return self.get_state()
+
+# the game on screen
+class AttachedGame:
+    def __init__(self: Self, gameplay):
+        self.gameplay = gameplay
+
+    def get_state(self: Self):
+        gameplay = self.gameplay
+        # the rules of GameState on a copy of the tiles are faster than those of the Grid
+        state = GameState.from_cells(gameplay.grid.NBR_COLUMNS, gameplay.grid.NBR_ROWS, gameplay.get_tile_numbers(), gameplay.rules)
+        return { 'columns': state.columns, 'rows': state.rows, 'tile-numbers': list(state.cells),
+                 'range': [gameplay.tile_range.low, gameplay.tile_range.high], 'score': state.score,
+                 'moves-possible': state.has_moves() }
+
+    async def move(self: Self, chain: List[Tuple[int, int]]):
+        gameplay = self.gameplay
+        before = gameplay.get_tile_numbers()
+        if error := await gameplay.make_chain_move(chain):
+            raise ValueError(error)
+        columns = gameplay.grid.NBR_COLUMNS
+        diff = [(i % columns, i // columns, n) for i, (b, n) in enumerate(zip(before, gameplay.get_tile_numbers())) if b != n]
+        state = self.get_state()
+        del state['columns'], state['rows'], state['tile-numbers']
+        return { 'diff': diff } | state
+
+    async def new(self: Self, seed: int | None = None):
+        await self.gameplay.new_game(show_hiscore = False)
+        return self.get_state()
+
+class BotApi:
+    MAX_LINE = 1 << 16
+
+    def __init__(self: Self, game: HeadlessGame | AttachedGame, address: str):
+        self.game = game
+        self.address = address
+        self.__server: asyncio.Server | None = None
+        self.__connections = set()
+
+    async def start(self: Self) -> None:
+        if self.address.isdigit():
+            self.__server = await asyncio.start_server(self.__handle_connection, '127.0.0.1', int(self.address), limit = BotApi.MAX_LINE)
+        else:
+            if os.path.exists(self.address):
+                os.remove(self.address) # left by an earlier run
+            self.__server = await asyncio.start_unix_server(self.__handle_connection, self.address, limit = BotApi.MAX_LINE)
+
+    async def stop(self: Self) -> None:
+        self.__server.close()
+        for writer in list(self.__connections):
+            writer.close()
+        await self.__server.wait_closed()
+        await asyncio.sleep(0)
+        if not self.address.isdigit() and os.path.exists(self.address):
+            os.remove(self.address)
+
+    async def serve_forever(self: Self) -> None:
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def __handle_connection(self: Self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.__connections.add(writer)
+        try:
+            while line := await reader.readline():
+                writer.write(json.dumps(await self.handle(line)).encode() + b"\n")
+                # only wait when the bot doesn't read its answers
+                if writer.transport.get_write_buffer_size() > BotApi.MAX_LINE:
+                    await writer.drain()
+        except (ConnectionError, ValueError): # ValueError: line too long
+            pass
+        finally:
+            self.__connections.discard(writer)
+            writer.close()
+
+    async def handle(self: Self, line: bytes | str):
+        try:
+            request = json.loads(line)
+            op = request['op']
+            if op == 'move':
+                return await self.game.move(request['chain'])
+            if op == 'state':
+                return self.game.get_state()
+            if op == 'new':
+                seed = request.get('seed')
+                return await self.game.new(None if seed is None else int(seed))
+            return { 'error': f"unknown op {op}" }
+        except KeyError as e:
+            return { 'error': f"missing {e}" }
+        except (ValueError, TypeError) as e:
+            return { 'error': str(e) }
+
+async def run(args) -> None:
+    telemetry = None
+    if args.telemetry:
+        from telemetry import TelemetryWriter
+        telemetry = TelemetryWriter(args.telemetry)
+    api = BotApi(HeadlessGame(args.columns, args.rows, args.seed, telemetry), args.socket)
+    await api.start()
+    print(f"Bot api on {args.socket}")
+    try:
+        await api.serve_forever()
+    finally:
+        await api.stop()
+        if telemetry:
+            telemetry.close()
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = "ConnectLog2 headless game for bots")
+    parser.add_argument("--socket", default = "connectlog2-bot.sock", help = "unix socket path or tcp port")
+    parser.add_argument("--columns", type = int, default = GameState.COLUMNS)
+    parser.add_argument("--rows", type = int, default = GameState.ROWS)
+    parser.add_argument("--seed", type = int)
+    parser.add_argument("--telemetry", metavar = "DIR", help = "record the moves in this directory (see telemetry.py)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,11 @@ import os
 import getpass
 
 class Config:
-    DATAPATH = 'c:/programdata/connectlog2'
+    # both paths can be redirected with environment variables, e.g. for benchmarks
+    DATAPATH = os.environ.get('CONNECTLOG2_DATAPATH', 'c:/programdata/connectlog2')
+    USER_DATAPATH: str | None = os.environ.get('CONNECTLOG2_USER_DATAPATH')
+    # shared leaderboard server (see leaderboard_server.py), None: only the local hiscore
+    LEADERBOARD_URL: str | None = os.environ.get('CONNECTLOG2_LEADERBOARD_URL')
 
     @staticmethod
     def make_user_datapath() -> None:
@@ -25,12 +29,18 @@ class Config:
             os.mkdir(Config.DATAPATH, 555)
     @staticmethod
     def get_user_datapath() -> str:
+        if Config.USER_DATAPATH:
+            return Config.USER_DATAPATH
         return os.path.join(os.environ['USERPROFILE'], 'appdata', 'roaming', 'connectlog2')
 
     @staticmethod
     def get_datapath() -> str:
         return Config.DATAPATH
 
+    @staticmethod
+    def get_leaderboard_url() -> str | None:
+        return Config.LEADERBOARD_URL
+
     @staticmethod
     def get_user() -> str:
         return getpass.getuser()
@@ -0,0 +1,115 @@
+# debug overlay: frame time percentiles, time spent per subsystem and input latency
+# the counters are always collected (a few perf_counter calls per frame), the overlay is only drawn when visible
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Self, Dict, Deque, List
+import json
+import time
+
+import pygame
+
+from fonts import Fonts
+
+class FrameStats:
+    WINDOW = 600 # samples kept per counter for the percentiles, about 10 seconds at 60 fps
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self: Self):
+        self.__samples: Dict[str, Deque[float]] = {}
+        self.__counts: Dict[str, int] = {}
+        self.__totals: Dict[str, float] = {}
+        self.__max: Dict[str, float] = {}
+
+    def add(self: Self, name: str, ms: float) -> None:
+        if (samples := self.__samples.get(name)) is None:
+            samples = self.__samples[name] = deque(maxlen = FrameStats.WINDOW)
+            self.__counts[name] = 0
+            self.__totals[name] = 0.0
+            self.__max[name] = 0.0
+        samples.append(ms)
+        self.__counts[name] += 1
+        self.__totals[name] += ms
+        if ms > self.__max[name]:
+            self.__max[name] = ms
+
+    # with stats.measure("name"): ... adds the time spent in the block
+    @contextmanager
+    def measure(self: Self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def get_names(self: Self) -> List[str]:
+        return list(self.__samples)
+
+    # nearest rank percentiles over the recent window
+    def get_percentiles(self: Self, name: str) -> Dict[int, float]:
+        samples = sorted(self.__samples.get(name, ()))
+        if not samples:
+            return { p: 0.0 for p in FrameStats.PERCENTILES }
+        return { p: samples[min(len(samples) - 1, (len(samples) * p) // 100)] for p in FrameStats.PERCENTILES }
+
+    def get_max(self: Self, name: str) -> float:
+        return self.__max.get(name, 0.0)
+
+    def get_count(self: Self, name: str) -> int:
+        return self.__counts.get(name, 0)
+
+    def to_json(self: Self):
+        js = {}
+        for name in self.__samples:
+            js[name] = { 'count': self.__counts[name],
+                         'mean_ms': self.__totals[name] / self.__counts[name],
+                         'max_ms': self.__max[name] }
+            for p, ms in self.get_percentiles(name).items():
+                js[name][f'p{p}_ms'] = ms
+        return js
+
+    def write(self: Self, path: str) -> None:
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.to_json(), f, indent = 2)
+        except Exception as e:
+            print(e)
+
+class DebugHud:
+    # counter names with the label shown on the overlay
+    COUNTERS = [("frame", "frame"), ("work", "work"), ("board.draw", "board"), ("status.draw", "status"),
+                ("events", "events"), ("make_move", "move"), ("drag.latency", "drag lat")]
+
+    def __init__(self: Self, stats: FrameStats):
+        self.stats: FrameStats = stats
+        self.visible: bool = False
+
+    def set_visible(self: Self, visible: bool) -> None:
+        self.visible = visible
+
+    def toggle(self: Self) -> None:
+        self.visible = not self.visible
+
+    def is_visible(self: Self) -> bool:
+        return self.visible
+
+    def draw(self: Self, surface: pygame.Surface) -> None:
+        if not self.visible:
+            return
+        font = Fonts.get(20)
+        rows = [["ms", "p50", "p95", "p99", "max"]]
+        for name, label in DebugHud.COUNTERS:
+            p = self.stats.get_percentiles(name)
+            rows.append([label] + [f"{ms:.1f}" for ms in (p[50], p[95], p[99], self.stats.get_max(name))])
+        # first column left aligned, the numbers right aligned on these x positions
+        right_x = (110, 155, 200, 245)
+        line_height = font.get_linesize()
+        overlay = pygame.Surface((255, line_height * len(rows) + 6), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 170))
+        for i, row in enumerate(rows):
+            top = 3 + i * line_height
+            overlay.blit(font.render(row[0], True, "white"), (5, top))
+            for x, cell in zip(right_x, row[1:]):
+                text: pygame.Surface = font.render(cell, True, "white")
+                overlay.blit(text, text.get_rect(topright = (x, top)))
+        surface.blit(overlay, (5, 5))
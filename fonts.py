@@ -0,0 +1,21 @@
+# fonts are loaded once per size, loading the default font on every draw is slow
+
+from typing import Dict
+
+import pygame
+
+from scale import Scale
+
+class Fonts:
+    __fonts: Dict[int, pygame.font.Font] = {}
+
+    @staticmethod
+    def get(size: int) -> pygame.font.Font:
+        if (font := Fonts.__fonts.get(size)) is None:
+            font = Fonts.__fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    # size at scale 1, for the scaled assets (scale.py)
+    @staticmethod
+    def get_scaled(size: int) -> pygame.font.Font:
+        return Fonts.get(Scale.px(size))
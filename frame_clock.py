@@ -0,0 +1,28 @@
+# frame pacing for the cooperative (asyncio) screen loops
+# instead of blocking in pygame.time.Clock.tick(), the rest of the frame is awaited so other tasks on the
+# same event loop (network, bots, ...) run in between the frames. This is also what a browser build (pygbag) needs.
+
+import asyncio
+import time
+from typing import Self
+
+class FrameClock:
+    def __init__(self: Self):
+        self.__next_frame: float = time.perf_counter()
+
+    # wait until the next frame is due, fps 0: no frame cap, only yield to the other tasks
+    async def tick(self: Self, fps: int) -> None:
+        if fps <= 0:
+            await asyncio.sleep(0)
+            return
+        now = time.perf_counter()
+        self.__next_frame += 1 / fps
+        if self.__next_frame < now:
+            # too late already: don't try to catch up with a burst of frames
+            self.__next_frame = now
+        await asyncio.sleep(self.__next_frame - now)
+
+    # non blocking replacement of pygame.time.delay() for the animations
+    @staticmethod
+    async def wait(delay_ms: int) -> None:
+        await asyncio.sleep(delay_ms / 1000)
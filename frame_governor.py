@@ -0,0 +1,63 @@
+# keeps the game at the target frame rate by lowering the quality when the frames take too long
+# and raising it again when there is room: the connection lines, the animation steps and the highlight
+# the work of a frame is measured without the waits (the frame pacing and the pauses of the animations)
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Self, Deque, List
+
+@dataclass(frozen = True)
+class QualityLevel:
+    name: str
+    line_width: int          # of the lines between the marked tiles, 0: no lines
+    animation: float         # part of the animation delay between the steps of a move, 0: only the result
+    keyboard_highlight: bool # only highlight the active tile when it's moved with the keyboard
+
+class FrameGovernor:
+    LEVELS: List[QualityLevel] = [QualityLevel('minimal', 0, 0.0, True),
+                                  QualityLevel('low', 3, 0.33, False),
+                                  QualityLevel('medium', 7, 0.66, False),
+                                  QualityLevel('full', 7, 1.0, False)]
+    DOWN_FRAMES = 30       # lower the quality when DOWN_SLOW of the last DOWN_FRAMES frames are over the budget
+    DOWN_SLOW = 8
+    UP_FRAMES = 180        # raise the quality when all of the last UP_FRAMES frames take less than UP_HEADROOM of the budget
+    UP_HEADROOM = 0.5
+
+    # target_fps 0: no frame cap, quality: 'auto' or the name of a fixed level
+    def __init__(self: Self, target_fps: int, quality: str = 'auto'):
+        self.__frames: Deque[float] = deque(maxlen = FrameGovernor.UP_FRAMES)
+        self.set_target(target_fps, quality)
+
+    def set_target(self: Self, target_fps: int, quality: str = 'auto') -> None:
+        self.target_fps = target_fps
+        self.budget_ms = 1000 / target_fps if target_fps > 0 else float('inf') # 0: no frame cap
+        self.auto = quality == 'auto'
+        names = [level.name for level in FrameGovernor.LEVELS]
+        self.level = len(names) - 1 if self.auto else names.index(quality)
+        self.__frames.clear()
+
+    def get_level(self: Self) -> QualityLevel:
+        return FrameGovernor.LEVELS[self.level]
+
+    # the work of a frame, returns whether the level changed
+    def add_frame(self: Self, work_ms: float) -> bool:
+        if not self.auto:
+            return False
+        frames = self.__frames
+        frames.append(work_ms)
+        if self.level > 0 and len(frames) >= FrameGovernor.DOWN_FRAMES:
+            recent = list(frames)[-FrameGovernor.DOWN_FRAMES:]
+            if sum(ms > self.budget_ms for ms in recent) >= FrameGovernor.DOWN_SLOW:
+                self.level -= 1
+                frames.clear()
+                return True
+        if self.level < len(FrameGovernor.LEVELS) - 1 and len(frames) == FrameGovernor.UP_FRAMES:
+            if max(frames) < self.budget_ms * FrameGovernor.UP_HEADROOM:
+                self.level += 1
+                frames.clear()
+                return True
+        return False
+
+    # the delay between the steps of a move at the current level
+    def get_animation_delay(self: Self, delay_ms: int) -> int:
+        return int(delay_ms * self.get_level().animation)
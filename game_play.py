@@ -1,12 +1,10 @@
 # the actual handling of the game.
 
-from dataclasses import dataclass
-from itertools import filterfalse
-from turtle import width
-from typing import Self, Tuple
+from typing import Self, Tuple, List
 from enum import Enum
 from copy import deepcopy
 import math
+import os
 import time
 from functools import reduce
 
@@ -18,25 +16,61 @@ from board import Board
 from mouse import MouseEventChecker
 from hiscore import HiScore
 from config import Config
-
-# range of numbers from which the new tile number can be chosen
-@dataclass
-class TileRange:
-    low: int = 0
-    high: int = 0
+from debug_hud import FrameStats, DebugHud
+from statistics_screen import StatisticsScreen
+from profiling import Profiler, StartupTimer
+from frame_clock import FrameClock
+from game_state import GameState, TileRange
+from rules import Rules, DEFAULT_RULES
+from move_history import MoveDelta, MoveHistory
+from replay import Replay, ReplayViewer
+from save_slots import SaveSlots
+from settings import Settings
+from frame_governor import FrameGovernor
+from scale import Scale, WindowResize
 
 class Gameplay:
-    NEW_TILE_RANGE_SIZE = 8
+    NEW_TILE_RANGE_SIZE = GameState.NEW_TILE_RANGE_SIZE
     class Start(Enum):
         NEW = 1
         LOAD = 2
 
 
-    def __init__(self, screen: pygame.Surface):
+    # rules: the variant (rules.py), the default is the game
+    def __init__(self, screen: pygame.Surface, rules: Rules = DEFAULT_RULES):
         # the actual game window
         self.screen = screen
+        self.rules: Rules = rules
         self.__animation_delay_ms = 300
 
+        # frame timing, shown on the debug hud (F3) and written as json at exit when a path is set
+        self.frame_stats: FrameStats = FrameStats()
+        self.debug_hud: DebugHud = DebugHud(self.frame_stats)
+        self.debug_stats_path: str | None = None
+        self.__drag_event_time: float | None = None
+        # called at the end of every frame with the work of the frame in ms, see set_frame_hook()
+        self.frame_hook = None
+
+        self.clock = FrameClock()
+        # target frame rate and quality, the governor lowers the quality when the frames take too long
+        self.settings: Settings = Settings.read()
+        self.governor: FrameGovernor = FrameGovernor(self.settings.target_fps, self.settings.quality)
+        self.__keyboard_used: bool = False
+        self.statistics: StatisticsScreen = StatisticsScreen(screen)
+        # TelemetryWriter (telemetry.py, needs numpy) to record the moves, see set_telemetry()
+        self.telemetry = None
+        self.slots: SaveSlots = SaveSlots()
+        # the save slot of the game, None: not saved yet
+        self.slot: str | None = None
+        # the hiscore of the user while play() runs
+        self.hiscore: HiScore | None = None
+        # the tiles at the scale of the window, a resized window is scaled when the resizing stopped
+        self.resize: WindowResize = WindowResize()
+        Board.set_scale()
+        self.__new_game()
+
+    # (re)initialise everything of a single game, also used to restart
+    def __new_game(self: Self) -> None:
         # flag to end the game
         self.running = True
         # status need for confirmation
@@ -47,58 +81,85 @@ class Gameplay:
         self.board: Board = Board(self.screen)
         
         self.tile_range: TileRange = self.get_tile_range(1)
-        self.grid = Grid(self.board)
+        self.grid = Grid(self.board, rules = self.rules)
+        self.__apply_quality()
         self.active_tile_pos = TilePos(0, 0)
         self.marked_tiles = []
 
         # put status under the board, filling up the space
         self.board_height = self.board.get_height()
         self.board_width = self.board.get_width()
-        self.status = StatusPane((0, self.board_height), (screen.get_width(), screen.get_height() - self.board_height))
+        self.status = StatusPane((0, self.board_height), (self.screen.get_width(), self.screen.get_height() - self.board_height))
 
-        self.clock = pygame.time.Clock()
         self.mouse_checker: MouseEventChecker = MouseEventChecker(self.status)
+        self.history: MoveHistory = MoveHistory()
+
+        self.__game_id: int = self.telemetry.new_game_id() if self.telemetry else 0
+        self.__move_number: int = 0
+        self.__last_move_time: float = time.perf_counter()
+        self.__game_start: float = time.perf_counter()
 
-    # the actual game loop
-    def play(self: Self, start):
+    # the actual game loop, a coroutine: every frame the other tasks of the event loop get their turn
+    # LOAD: continue the game of the save slot (the most recent slot when None)
+    async def play(self: Self, start, slot: str | None = None):
 
         hiscore: HiScore = HiScore(Config.get_user(), self.screen)
+        self.hiscore = hiscore
 
         save_game : bool = False
-        if start == Gameplay.Start.LOAD:
-            self.grid.read()
-        else:
-            self.grid.remove_file()
+        if start == Gameplay.Start.LOAD and (slot := slot or self.slots.get_latest()):
+            self.slot = slot
+            self.__move_number = self.slots.read(slot, self.grid)
 
-        self.grid.refill(self.tile_range.low, self.tile_range.high, 0)
-        self.score = self.calculate_score()
-        self.handle_highest_number()
-        self.status.set_score(self.calculate_score())
+        await self.__fill_new_game()
+        last_flip = time.perf_counter()
 
         while self.running:
+            frame_start = time.perf_counter()
+            self.grid.waited_ms = 0.0
+            if size := self.resize.get_size():
+                self.__resize(size)
 
             if not self.grid.check_connections_possible():
                 self.status.set_message("No more moves, quit or next game? <q/n>")
                 self.no_moves = True
-            if self.active_tile_pos and self.grid.get_tile(self.active_tile_pos):
+            highlight = self.__show_highlight()
+            if highlight:
                 self.board.highlight(self.active_tile_pos, TileState.ON)
         
-            self.grid.display_grid()
-            self.status.draw(self.screen)
+            with self.frame_stats.measure("board.draw"):
+                self.grid.display_grid()
+            with self.frame_stats.measure("status.draw"):
+                self.status.draw(self.screen)
+            self.debug_hud.draw(self.screen)
         
             # flip() the display to put your work on screen
             pygame.display.flip()
+            StartupTimer.first_frame("game")
+            now = time.perf_counter()
+            self.frame_stats.add("frame", (now - last_flip) * 1000)
+            last_flip = now
+            if self.__drag_event_time:
+                self.frame_stats.add("drag.latency", (now - self.__drag_event_time) * 1000)
+                self.__drag_event_time = None
         
-            if self.active_tile_pos and self.grid.get_tile(self.active_tile_pos):
+            if highlight:
                 self.board.highlight(self.active_tile_pos, TileState.OFF)
 
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            events_time = time.perf_counter()
+            # the handling of the events ends before a move (with its animation) or another screen is awaited
+            events_end: float | None = None
+            for event in events:
+                if self.resize.check(event):
+                    continue
                 if event.type == pygame.QUIT:
                     self.status.set_message("quit, safe for later, continue? <q/s/c>")
                     self.quit = True
                     break
 
                 if event.type == pygame.KEYUP:
+                    self.__keyboard_used = True
                     # quit the game, todo: ask confirmation in status
                     if event.key == pygame.K_q and event.mod & pygame.KMOD_CTRL != 0:
                         self.status.set_message("quit, safe for later, continue? <q/s/c>")
@@ -110,7 +171,28 @@ class Gameplay:
                         self.reset = True;
                         break
                     elif event.key == pygame.K_s and event.mod & pygame.KMOD_CTRL != 0:
-                        self.quit = hiscore.display()
+                        events_end = time.perf_counter()
+                        self.quit = await hiscore.display()
+                        break
+                    elif event.key == pygame.K_t and event.mod & pygame.KMOD_CTRL != 0:
+                        events_end = time.perf_counter()
+                        self.quit = await self.statistics.display()
+                        break
+                    elif event.key == pygame.K_r and event.mod & pygame.KMOD_CTRL != 0:
+                        events_end = time.perf_counter()
+                        self.quit = await self.show_last_replay()
+                        break
+                    elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL != 0:
+                        self.undo()
+                        break
+                    elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL != 0:
+                        self.redo()
+                        break
+                    elif event.key == pygame.K_f and event.mod & pygame.KMOD_CTRL != 0:
+                        self.next_target_fps()
+                        break
+                    elif event.key == pygame.K_F3:
+                        self.show_debug_hud(not self.debug_hud.is_visible())
                         break
 
                     # navigation keys (a-s-d-w, useful on qwerty and arrows, useful on full keyboards)
@@ -134,7 +216,8 @@ class Gameplay:
                         break
                     # <Enter> handle the marked tiles
                     elif event.key == pygame.K_RETURN:
-                        self.make_move()
+                        events_end = time.perf_counter()
+                        await self.make_move()
                         break
                     # <Esc>: reset the marked tiles
                     elif event.key == pygame.K_ESCAPE:
@@ -143,12 +226,8 @@ class Gameplay:
 
                     elif (event.key == pygame.K_y and self.reset) or (event.key == pygame.K_n and self.no_moves):
                         self.reset = self.no_moves = False
-                        hiscore.add_score(self.calculate_score(), self.grid.get_highest_number())
-                        self.__init__()
-                        self.grid.refill(self.tile_range.low, self.tile_range.high, 0)
-                        self.score = self.calculate_score()
-                        self.handle_highest_number()
-                        self.status.set_score(self.calculate_score())
+                        events_end = time.perf_counter()
+                        await self.new_game()
                         break
                     elif event.key == pygame.K_q:
                         if self.quit:
@@ -174,24 +253,30 @@ class Gameplay:
 
                 else:
                     click: MouseEventChecker.Click = self.mouse_checker.check(event)
+                    if click in (MouseEventChecker.Click.SINGLE, MouseEventChecker.Click.DOUBLE, MouseEventChecker.Click.DRAG_START):
+                        self.__keyboard_used = False
                     if click == MouseEventChecker.Click.SINGLE:
-                        self.active_tile_pos = self.board_position_to_grid_pos(self.mouse_checker.get_clicked_pos())
-                        if self.active_tile_pos:
+                        # a click next to the tiles keeps the active tile, the keys need one
+                        if pos := self.board_position_to_grid_pos(self.mouse_checker.get_clicked_pos()):
+                            self.active_tile_pos = pos
                             self.mark_highlighted_tile()
                         break
                     elif click == MouseEventChecker.Click.DOUBLE:
                         # take clicked tile into account but don't unmark it
-                        self.active_tile_pos = self.board_position_to_grid_pos(self.mouse_checker.get_clicked_pos())
-                        if self.active_tile_pos:
+                        if pos := self.board_position_to_grid_pos(self.mouse_checker.get_clicked_pos()):
+                            self.active_tile_pos = pos
                             self.mark_highlighted_tile_last_on()
-                        self.make_move()
+                        events_end = time.perf_counter()
+                        await self.make_move()
                         break
                     elif click == MouseEventChecker.Click.DRAG_START:
-                        self.active_tile_pos = self.board_position_to_grid_pos(self.mouse_checker.get_clicked_pos())
-                        if self.active_tile_pos:
+                        if pos := self.board_position_to_grid_pos(self.mouse_checker.get_clicked_pos()):
+                            self.active_tile_pos = pos
                             self.mark_highlighted_tile_first_on()
                             break
                     elif click == MouseEventChecker.Click.DRAG:
+                        # event-to-present latency is measured on the next flip
+                        self.__drag_event_time = events_time
                         previous_active = self.active_tile_pos
                         board_pos = self.mouse_checker.get_clicked_pos()
                         if board_pos:
@@ -207,21 +292,125 @@ class Gameplay:
                     elif click == MouseEventChecker.Click.RIGHT_BUTTON:
                         self.reset_marked_tiles()
                         break
-
-            self.clock.tick(60)
-
+                    elif click == MouseEventChecker.Click.BACK:
+                        self.undo()
+                        break
+                    elif click == MouseEventChecker.Click.FORWARD:
+                        self.redo()
+                        break
+            self.frame_stats.add("events", ((events_end or time.perf_counter()) - events_time) * 1000)
+
+            # the work of the frame, without the waits of the animations
+            work_ms = (time.perf_counter() - frame_start) * 1000 - self.grid.waited_ms
+            self.frame_stats.add("work", work_ms)
+            if self.governor.add_frame(work_ms):
+                self.__apply_quality()
+            if self.frame_hook:
+                self.frame_hook(work_ms)
+            await self.clock.tick(self.governor.target_fps)
+
+        if self.debug_stats_path:
+            self.write_frame_stats(self.debug_stats_path)
         if save_game:
-            self.grid.write()
+            self.slot = self.slots.write(self.slot, self.grid, self.__move_number)
+            self.statistics.add_time(time.perf_counter() - self.__game_start)
         else:
-            hiscore.add_score(self.calculate_score(), self.grid.get_highest_number())
-            self.grid.remove_file()
+            await self.__game_finished(hiscore)
+        await hiscore.close()
+
+    # show_hiscore: whether a new hiscore is shown until a key is pressed
+    async def __game_finished(self: Self, hiscore: HiScore, show_hiscore: bool = True) -> None:
+        if self.slot:
+            self.slots.remove(self.slot)
+            self.slot = None
+        if len(self.history):
+            Replay.record(self.grid.NBR_COLUMNS, self.grid.NBR_ROWS, bytes(self.get_tile_numbers()), self.history.get_moves()).save()
+        self.statistics.add_game(self.calculate_score(), self.grid.get_highest_number(), time.perf_counter() - self.__game_start)
+        await hiscore.add_score(self.calculate_score(), self.grid.get_highest_number(), show_hiscore)
+
+    async def __fill_new_game(self: Self) -> None:
+        await self.grid.refill(self.tile_range.low, self.tile_range.high, 0)
+        self.score = self.calculate_score()
+        await self.handle_highest_number()
+        self.status.set_score(self.calculate_score())
 
+    # finish the game like at the end (hiscore, statistics, replay, the save slot is removed) and start a new one
+    # without asking, the bot api doesn't wait on the hiscore screen
+    async def new_game(self: Self, show_hiscore: bool = True) -> None:
+        await self.__game_finished(self.hiscore, show_hiscore)
+        await self.restart()
+
+    async def restart(self: Self) -> None:
+        self.__new_game()
+        await self.__fill_new_game()
+
+    # <Ctrl-R>: watch the replay of the last finished game, return whether the user wants to quit
+    async def show_last_replay(self: Self) -> bool:
+        if not (path := Replay.get_latest()):
+            self.status.set_message("no finished game to replay")
+            return False
+        try:
+            replay = Replay.read(path)
+        except (KeyError, ValueError, TypeError) as e:
+            print(e)
+            return False
+        return await ReplayViewer(self.screen, replay).display()
+
+    # debug hud (also toggled with F3): frame time percentiles and time per subsystem
+    def show_debug_hud(self: Self, visible: bool = True) -> None:
+        self.debug_hud.set_visible(visible)
+        if visible and not self.debug_stats_path:
+            self.debug_stats_path = os.path.join(Config.get_user_datapath(), 'frame_stats.json')
+
+    def write_frame_stats(self: Self, path: str) -> None:
+        self.frame_stats.write(path)
+
+    def set_telemetry(self: Self, telemetry) -> None:
+        self.telemetry = telemetry
+        self.__game_id = telemetry.new_game_id()
+
+    # hook(work_ms) after every frame, e.g. to post the events of the next frame (stress.py)
+    def set_frame_hook(self: Self, hook) -> None:
+        self.frame_hook = hook
+
+    # wait between the steps of a move, 0 for no animation (benchmarks)
+    def set_animation_delay(self: Self, delay_ms: int) -> None:
+        self.__animation_delay_ms = delay_ms
+
+    # the delay at the quality of the governor
+    def __get_animation_delay(self: Self) -> int:
+        return self.governor.get_animation_delay(self.__animation_delay_ms)
+
+    # quality: 'auto' or a fixed level (see Settings), only for this session
+    def set_frame_target(self: Self, target_fps: int, quality: str = 'auto') -> None:
+        self.governor.set_target(target_fps, quality)
+        self.__apply_quality()
+
+    # <Ctrl-F>: the next target frame rate of the settings, kept for the next sessions
+    def next_target_fps(self: Self) -> None:
+        fps = Settings.TARGET_FPS
+        self.settings.target_fps = fps[(fps.index(self.governor.target_fps) + 1) % len(fps)] if self.governor.target_fps in fps else fps[0]
+        self.settings.write()
+        self.set_frame_target(self.settings.target_fps, self.settings.quality)
+        self.status.set_message(f"target {self.settings.target_fps} frames per second")
+
+    def __apply_quality(self: Self) -> None:
+        self.board.set_line_width(self.governor.get_level().line_width)
+        self.grid.fps = self.governor.target_fps
+
+    # at the lowest quality, the active tile is only highlighted when it's moved with the keyboard
+    def __show_highlight(self: Self) -> bool:
+        if not (self.active_tile_pos and self.grid.get_tile(self.active_tile_pos)):
+            return False
+        return self.__keyboard_used or not self.governor.get_level().keyboard_highlight
 
     def __actually_mark_when_possible(self: Self, t: GridTile) -> None:
             last_pos = self.marked_tiles[-1]
-            if self.active_tile_pos.is_neighbour(last_pos):
+            # the neighbours and the numbers that can follow are in the tables of the rules
+            tables = self.grid.tables
+            if tables.is_neighbour(self.grid.get_index(last_pos), self.grid.get_index(self.active_tile_pos)):
                 last_t = self.grid.get_tile(last_pos)
-                if t.number == last_t.number or (len(self.marked_tiles) > 1 and t.number == last_t.number + 1):
+                if tables.can_follow(last_t.number, t.number, len(self.marked_tiles)):
                     self.marked_tiles.append(deepcopy(self.active_tile_pos))
                     self.board.set_marked_tiles(self.marked_tiles)
                     self.__show_sum()
@@ -296,40 +485,103 @@ class Gameplay:
             self.__actually_mark_when_possible(t)
 
     # <Enter> or double click left mouse button: make the move: handle the marked tiles to make a new tile on the position of the last marked tile
-    def make_move(self: Self) -> None:
+    @Profiler.timed("Gameplay.make_move")
+    async def make_move(self: Self) -> None:
         if not self.marked_tiles:
             return
-        sum = 0
-        # remove all the marked tiles and calculate new tile
-        # round up to next log2 by adding 1 if the 2 ** log2(sum) != sum
+        start = time.perf_counter()
+        numbers = [self.grid.get_tile(pos).number for pos in self.marked_tiles] if self.telemetry else None
+        tile_range = self.tile_range
+        cells, rng = bytes(self.get_tile_numbers()), self.grid.rng
+        chain = bytes(pos.y * self.grid.NBR_COLUMNS + pos.x for pos in self.marked_tiles)
+        with self.frame_stats.measure("make_move"):
+            await self.__make_move()
+        end = time.perf_counter()
+        self.history.add(MoveDelta.create(cells, bytes(self.get_tile_numbers()), tile_range, self.tile_range, rng, self.grid.rng, chain))
+        self.__move_number += 1
+        if self.telemetry:
+            self.telemetry.add_move(self.__game_id, self.__move_number, numbers, self.rules.merged_number(numbers),
+                                    tile_range.low, tile_range.high, self.tile_range.low, self.tile_range.high,
+                                    (start - self.__last_move_time) * 1000, (end - start) * 1000, self.calculate_score())
+        self.__last_move_time = end
+
+    async def __make_move(self: Self) -> None:
+        # remove all the marked tiles and calculate new tile (the rules are in GameState)
+        numbers = []
         for pos in self.marked_tiles:
-            t = self.grid.get_tile(pos)
+            numbers.append(self.grid.get_tile(pos).number)
             self.grid.remove_tile(pos)
-            sum += 2 ** t.number
-        nbr = int(math.log2(sum))
-        if 2 ** nbr != sum:
-            nbr += 1
+        nbr = self.rules.merged_number(numbers)
         # put new number on the position of the last marked number
         pos = self.marked_tiles[-1]
         self.marked_tiles.clear()
+        self.board.set_marked_tiles(self.marked_tiles)
         self.grid.set_tile(pos, nbr)
-        self.grid.animation_wait(self.__animation_delay_ms)
+        await self.grid.animation_wait(self.__get_animation_delay())
 
         # let the grid refill the board by dropping tiles and adding new ones.
-        self.grid.refill(self.tile_range.low, self.tile_range.high, self.__animation_delay_ms)
-        self.grid.animation_wait(self.__animation_delay_ms)
-        self.handle_highest_number()
+        await self.grid.refill(self.tile_range.low, self.tile_range.high, self.__get_animation_delay())
+        await self.grid.animation_wait(self.__get_animation_delay())
+        await self.handle_highest_number()
 
         self.status.set_score(self.calculate_score())
         self.status.set_message("")
 
+    # a move from the bot api (bot_api.py) instead of marking with keys or mouse, None or what's wrong with the chain
+    async def make_chain_move(self: Self, chain: List[Tuple[int, int]]) -> str | None:
+        chain = [(int(x), int(y)) for x, y in chain]
+        state = GameState.from_cells(self.grid.NBR_COLUMNS, self.grid.NBR_ROWS, self.get_tile_numbers(), self.rules)
+        if error := state.check_chain(chain):
+            return error
+        self.marked_tiles = [TilePos(x, y) for x, y in chain]
+        self.board.set_marked_tiles(self.marked_tiles)
+        await self.make_move()
+        return None
+
+    # <Ctrl-Z> or mouse back button: take back the last move, return whether there was one
+    def undo(self: Self) -> bool:
+        if not (delta := self.history.undo()):
+            self.status.set_message("nothing to undo")
+            return False
+        self.__set_cells(delta.indices, delta.before, delta.range_before, delta.rng_before)
+        self.__move_number -= 1
+        return True
+
+    # <Ctrl-Y> or mouse forward button: make the undone move again, with the same new tiles
+    def redo(self: Self) -> bool:
+        if not (delta := self.history.redo()):
+            self.status.set_message("nothing to redo")
+            return False
+        self.__set_cells(delta.indices, delta.after, delta.range_after, delta.rng_after)
+        self.__move_number += 1
+        return True
+
+    # only the changed cells get a new tile
+    def __set_cells(self: Self, indices: bytes, numbers: bytes, tile_range: TileRange, rng: int) -> None:
+        self.reset_marked_tiles()
+        columns = self.grid.NBR_COLUMNS
+        for i, number in zip(indices, numbers):
+            pos = TilePos(i % columns, i // columns)
+            if number:
+                self.grid.set_tile(pos, number)
+            else:
+                self.grid.remove_tile(pos)
+        self.tile_range = tile_range
+        self.grid.rng = rng
+        self.no_moves = False
+        self.status.set_highest_tile(self.grid.get_highest_number())
+        self.status.set_score(self.calculate_score())
+
+    def get_tile_numbers(self: Self) -> List[int]:
+        return [t.number if t else 0 for t in self.grid]
+
     # <Esc>: reset, let the user start a new string of marked tiles
     def reset_marked_tiles(self: Self) -> None:
         self.marked_tiles.clear()
         self.board.set_marked_tiles(self.marked_tiles)
         self.status.set_message("")
 
-    def handle_highest_number(self: Self) -> None:
+    async def handle_highest_number(self: Self) -> None:
         high = self.grid.get_highest_number()
         self.status.set_highest_tile(high)
         new_tile_range: TileRange = self.get_new_tiles_range_based_on_highest_number(high)
@@ -337,24 +589,33 @@ class Gameplay:
             return
         self.tile_range = new_tile_range
         self.grid.remove_low_tiles(self.tile_range.low)
-        self.grid.animation_wait(self.__animation_delay_ms)
-        self.grid.refill(self.tile_range.low, self.tile_range.high, self.__animation_delay_ms)
+        await self.grid.animation_wait(self.__get_animation_delay())
+        await self.grid.refill(self.tile_range.low, self.tile_range.high, self.__get_animation_delay())
 
-    @staticmethod
-    def get_tile_range(low: int) -> TileRange:
-        return TileRange(low, low + Gameplay.NEW_TILE_RANGE_SIZE)
+    def get_tile_range(self: Self, low: int) -> TileRange:
+        return self.rules.get_tile_range(low)
 
     def get_new_tiles_range_based_on_highest_number(self: Self, number: int) -> TileRange:
-        low = max(1, (number - 8) // 2)
-        return self.get_tile_range(low)
+        return self.rules.get_tile_range_for_highest(number)
 
     def calculate_score(self: Self) -> int:
         # the score is the sum of 2 to the power of the tile-number
         return reduce(lambda tot, n: tot + 2**n, (t.number for t in self.grid if t), 0)
 
+    # the tiles and the status at the scale of the new window size, the assets are only rendered again when the scale changed
+    def __resize(self: Self, size: Tuple[int, int]) -> None:
+        if (factor := Scale.fit(size)) != Scale.factor:
+            Scale.factor = factor
+            Board.set_scale()
+            self.board.rescale()
+        self.board_height = self.board.get_height()
+        self.board_width = self.board.get_width()
+        self.status.set_rect((0, self.board_height), (self.screen.get_width(), self.screen.get_height() - self.board_height))
+
+    # the metrics of the tiles are those of the current scale (Board.set_scale)
     def board_position_to_grid_pos(self: Self, b_pos: Tuple[int, int]) -> TilePos | None: # None: not positioned on a tile
         # remark: the position could also have been found by iterating the tiles. This should be a bit faster and I felt like trying this, but it is less flexible to use in other games
-        if b_pos[0] >= self.board_width or b_pos[0] >= self.board_height:
+        if b_pos[0] >= self.board_width or b_pos[1] >= self.board_height:
             return None
         x1 = b_pos[0] % (Tile.WIDTH + Board.SEP)
         y1 = b_pos[1] % (Tile.HEIGHT + Board.SEP)
@@ -0,0 +1,197 @@
+# game server: many games (sessions) in 1 process, played by clients over a local socket
+#   python game_server.py --port 8766            (tcp on localhost)
+#   python game_server.py --unix /tmp/cl2.sock   (unix socket)
+# a session is only a GameState (a few hundred bytes), sessions that aren't used for a while are
+# written to the sessions directory and read back when they're used again
+#
+# protocol: 1 json object per line, 1 answer line per request, in order
+#   {"op": "new", ["columns": 5, "rows": 6, "seed": 123]}  -> {"session": id, "columns", "rows", "tile-numbers", "range", "score"}
+#   {"op": "move", "session": id, "chain": [[x, y], ...]}  -> {"diff": [[x, y, number], ...], "range", "score", "moves-possible"}
+#   {"op": "state", "session": id}                          -> like new
+#   {"op": "close", "session": id}                          -> {"score": score}, the session is removed
+# an invalid request or move gets {"error": reason}
+
+from typing import Self, Dict
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import time
+
+from config import Config
+from game_state import GameState
+
+class SessionStore:
+    IDLE_S = 300.0 # sessions not used for this long are moved to disk
+
+    def __init__(self: Self, path: str, idle_s: float = IDLE_S):
+        self.path = path
+        self.idle_s = idle_s
+        self.__sessions: Dict[str, GameState] = {}
+        self.__last_used: Dict[str, float] = {}
+        os.makedirs(path, exist_ok = True)
+
+    def __len__(self: Self) -> int:
+        return len(self.__sessions)
+
+    def __get_filename(self: Self, session_id: str) -> str:
+        return os.path.join(self.path, session_id + '.json')
+
+    def new(self: Self, state: GameState) -> str:
+        session_id = secrets.token_hex(8)
+        self.__sessions[session_id] = state
+        self.__last_used[session_id] = time.monotonic()
+        return session_id
+
+    def get(self: Self, session_id: str) -> GameState:
+        if (state := self.__sessions.get(session_id)) is None:
+            # only hex ids, a client can't choose another file
+            if not (len(session_id) == 16 and all(c in '0123456789abcdef' for c in session_id)):
+                raise KeyError(session_id)
+            try:
+                with open(self.__get_filename(session_id), 'r') as f:
+                    state = GameState.from_json(json.load(f))
+            except FileNotFoundError:
+                raise KeyError(session_id)
+            os.remove(self.__get_filename(session_id))
+            self.__sessions[session_id] = state
+        self.__last_used[session_id] = time.monotonic()
+        return state
+
+    def remove(self: Self, session_id: str) -> None:
+        self.get(session_id)
+        del self.__sessions[session_id]
+        del self.__last_used[session_id]
+
+    def evict_idle(self: Self) -> int:
+        limit = time.monotonic() - self.idle_s
+        idle = [session_id for session_id, used in self.__last_used.items() if used < limit]
+        for session_id in idle:
+            self.__write(session_id)
+        return len(idle)
+
+    # all sessions to disk, at shutdown
+    def evict_all(self: Self) -> None:
+        for session_id in list(self.__sessions):
+            self.__write(session_id)
+
+    def __write(self: Self, session_id: str) -> None:
+        try:
+            with open(self.__get_filename(session_id), 'w') as f:
+                json.dump(self.__sessions[session_id].to_json(), f)
+        except Exception as e:
+            print(e)
+            return # kept in memory
+        del self.__sessions[session_id]
+        del self.__last_used[session_id]
+
+class GameServer:
+    MAX_SIZE = 16 # columns and rows, the cells are bytes
+    MAX_LINE = 1 << 16
+
+    def __init__(self: Self, sessions: SessionStore):
+        self.sessions = sessions
+        self.__server: asyncio.Server | None = None
+        self.__evict_task: asyncio.Task | None = None
+        self.__connections = set()
+
+    async def start(self: Self, host: str = '127.0.0.1', port: int = 8766, unix_path: str | None = None) -> None:
+        if unix_path:
+            self.__server = await asyncio.start_unix_server(self.__handle_connection, unix_path, limit = GameServer.MAX_LINE)
+        else:
+            self.__server = await asyncio.start_server(self.__handle_connection, host, port, limit = GameServer.MAX_LINE)
+        self.__evict_task = asyncio.get_running_loop().create_task(self.__evict())
+
+    def get_port(self: Self) -> int:
+        return self.__server.sockets[0].getsockname()[1]
+
+    async def stop(self: Self) -> None:
+        self.__evict_task.cancel()
+        self.__server.close()
+        for writer in list(self.__connections):
+            writer.close()
+        await self.__server.wait_closed()
+        await asyncio.sleep(0)
+        self.sessions.evict_all()
+
+    async def serve_forever(self: Self) -> None:
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def __evict(self: Self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.sessions.idle_s / 2))
+            self.sessions.evict_idle()
+
+    async def __handle_connection(self: Self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.__connections.add(writer)
+        try:
+            while line := await reader.readline():
+                writer.write(json.dumps(self.handle(line)).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError): # ValueError: line too long
+            pass
+        finally:
+            self.__connections.discard(writer)
+            writer.close()
+
+    # 1 request line to the answer, also used without a socket
+    def handle(self: Self, line: bytes | str):
+        try:
+            request = json.loads(line)
+            op = request['op']
+            if op == 'new':
+                columns = int(request.get('columns', GameState.COLUMNS))
+                rows = int(request.get('rows', GameState.ROWS))
+                if not (2 <= columns <= GameServer.MAX_SIZE and 2 <= rows <= GameServer.MAX_SIZE):
+                    return { 'error': f"the size must be 2 to {GameServer.MAX_SIZE} columns and rows" }
+                seed = request.get('seed')
+                state = GameState(columns, rows, None if seed is None else int(seed))
+                return self.__full_state(self.sessions.new(state), state)
+            session_id = str(request['session'])
+            if op == 'move':
+                state = self.sessions.get(session_id)
+                diff = state.apply_chain(request['chain'])
+                return { 'diff': diff, 'range': [state.low, state.high], 'score': state.score, 'moves-possible': state.has_moves() }
+            if op == 'state':
+                return self.__full_state(session_id, self.sessions.get(session_id))
+            if op == 'close':
+                score = self.sessions.get(session_id).score
+                self.sessions.remove(session_id)
+                return { 'score': score }
+            return { 'error': f"unknown op {op}" }
+        except KeyError as e:
+            return { 'error': f"missing or unknown {e}" }
+        except (ValueError, TypeError) as e:
+            return { 'error': str(e) }
+
+    @staticmethod
+    def __full_state(session_id: str, state: GameState):
+        return { 'session': session_id, 'columns': state.columns, 'rows': state.rows, 'tile-numbers': list(state.cells),
+                 'range': [state.low, state.high], 'score': state.score, 'moves-possible': state.has_moves() }
+
+async def run(args) -> None:
+    server = GameServer(SessionStore(args.sessions, args.idle))
+    await server.start(args.host, args.port, args.unix)
+    print(f"Game server on {args.unix or f'{args.host}:{server.get_port()}'}, sessions in {args.sessions}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = "ConnectLog2 game server")
+    parser.add_argument("--host", default = '127.0.0.1')
+    parser.add_argument("--port", type = int, default = 8766)
+    parser.add_argument("--unix", help = "listen on this unix socket instead of tcp")
+    parser.add_argument("--sessions", default = os.path.join(Config.get_datapath(), 'sessions'), help = "directory for the idle sessions")
+    parser.add_argument("--idle", type = float, default = SessionStore.IDLE_S, help = "seconds before an unused session is moved to disk")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
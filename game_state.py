@@ -0,0 +1,187 @@
+# the rules of the game without graphics: a compact state of 1 game, used by the game server and the bots
+# - the tile numbers (log2 of the values) are kept in a bytearray, row by row, 0 for an empty cell
+# - the random numbers come from a splitmix64 generator of which only the 64 bit state is kept,
+#   so a game can be stored and continued with the same new tiles
+# Gameplay and Grid use the same rules (tile range, merged number) for the game on screen
+# the rules of the game and of variants (neighbours, chains, rounding) and their tables are in rules.py
+
+from dataclasses import asdict
+from typing import Self, List, Tuple, Iterable
+import random
+
+from rules import TileRange, Rules, DEFAULT_RULES, RuleTables
+from spawn import SpawnPolicies
+
+class Rng:
+    MASK = (1 << 64) - 1
+
+    @staticmethod
+    def new_seed() -> int:
+        return random.getrandbits(64)
+
+    # splitmix64: returns the new state and a 64 bit random number
+    @staticmethod
+    def next(state: int) -> Tuple[int, int]:
+        state = (state + 0x9E3779B97F4A7C15) & Rng.MASK
+        z = ((state ^ (state >> 30)) * 0xBF58476D1CE4E5B9) & Rng.MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & Rng.MASK
+        return state, z ^ (z >> 31)
+
+class GameState:
+    NEW_TILE_RANGE_SIZE = DEFAULT_RULES.range_size
+    COLUMNS = 5
+    ROWS = 6
+    # value of a cell: 2 ** number, 0 for an empty cell (score without a power per cell)
+    VALUES = (0,) + tuple(2 ** n for n in range(1, 256))
+    __slots__ = ('columns', 'rows', 'cells', 'low', 'high', 'score', 'rng', 'moves', 'rules', 'tables')
+
+    # cells: a buffer of columns * rows bytes to keep the tiles in, e.g. a part of shared memory (see rl_env.py)
+    def __init__(self: Self, columns: int = COLUMNS, rows: int = ROWS, seed: int | None = None, start: bool = True,
+                 cells: bytearray | memoryview | None = None, rules: Rules = DEFAULT_RULES):
+        self.columns: int = columns
+        self.rows: int = rows
+        self.rules: Rules = rules
+        self.tables: RuleTables = rules.get_tables(columns, rows)
+        self.cells: bytearray | memoryview = bytearray(columns * rows) if cells is None else cells
+        self.reset(seed, start)
+
+    # a new game in the same cells buffer
+    def reset(self: Self, seed: int | None = None, start: bool = True) -> None:
+        self.cells[:] = bytes(len(self.cells))
+        tile_range = self.rules.get_tile_range(1)
+        self.low: int = tile_range.low
+        self.high: int = tile_range.high
+        self.score: int = 0
+        self.rng: int = (Rng.new_seed() if seed is None else seed) & Rng.MASK
+        self.moves: int = 0 # number of moves made
+        if start:
+            self.fill()
+            self.handle_highest_number()
+            self.score = self.calculate_score()
+
+    # the tile ranges of the default rules, those of the game on screen
+    @staticmethod
+    def get_tile_range(low: int) -> TileRange:
+        return DEFAULT_RULES.get_tile_range(low)
+
+    # the new tiles get higher numbers when the highest tile grows
+    @staticmethod
+    def get_tile_range_for_highest(highest: int) -> TileRange:
+        return DEFAULT_RULES.get_tile_range_for_highest(highest)
+
+    # the number of the tile that replaces the connected tiles: the sum rounded up to the next power of 2
+    @staticmethod
+    def merged_number(numbers: Iterable[int]) -> int:
+        return DEFAULT_RULES.merged_number(numbers)
+
+    def index(self: Self, x: int, y: int) -> int:
+        return y * self.columns + x
+
+    def get(self: Self, x: int, y: int) -> int:
+        return self.cells[y * self.columns + x]
+
+    def get_highest_number(self: Self) -> int:
+        return max(max(self.cells), 1)
+
+    def calculate_score(self: Self) -> int:
+        return sum(map(GameState.VALUES.__getitem__, self.cells))
+
+    def randrange(self: Self, low: int, high: int) -> int:
+        self.rng, r = Rng.next(self.rng)
+        return low + r % (high - low)
+
+    # let the tiles fall down into the empty cells below them
+    def drop(self: Self) -> None:
+        cells, columns = self.cells, self.columns
+        for x in range(columns):
+            target = (self.rows - 1) * columns + x
+            for i in range(target, -1, -columns):
+                if cells[i]:
+                    if i != target:
+                        cells[target] = cells[i]
+                        cells[i] = 0
+                    target -= columns
+
+    # new tiles in the empty cells, from the bottom row up like Grid.refill, the numbers from the spawn policy of the rules
+    def fill(self: Self) -> None:
+        cells, columns = self.cells, self.columns
+        empty = [i for y in range(self.rows - 1, -1, -1) for i in range(y * columns, (y + 1) * columns) if not cells[i]]
+        numbers = SpawnPolicies.get(self.rules).choose(self.tables, cells, empty, self.low, self.high, self.randrange,
+                                                       lambda: self.tables.has_moves(cells))
+        for i, n in zip(empty, numbers):
+            cells[i] = n
+
+    def refill(self: Self) -> None:
+        self.drop()
+        self.fill()
+
+    def handle_highest_number(self: Self) -> None:
+        tile_range = self.rules.get_tile_range_for_highest(self.get_highest_number())
+        if (tile_range.low, tile_range.high) == (self.low, self.high):
+            return
+        self.low, self.high = tile_range.low, tile_range.high
+        cells = self.cells
+        for i, n in enumerate(cells):
+            if n < self.low:
+                cells[i] = 0
+        self.refill()
+
+    # a connection is possible when 2 neighbours have the same number
+    def has_moves(self: Self) -> bool:
+        return self.tables.has_moves(self.cells)
+
+    # the same rules as marking tiles in Gameplay: neighbours, the first 2 equal, then the same or 1 higher
+    def check_chain(self: Self, chain: List[Tuple[int, int]]) -> str | None: # None: valid, else the reason
+        return self.tables.check_chain(self.cells, chain)
+
+    # make the move, returns the changed cells as (x, y, number)
+    def apply_chain(self: Self, chain: List[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        chain = [(int(x), int(y)) for x, y in chain]
+        if error := self.check_chain(chain):
+            raise ValueError(error)
+        before = bytes(self.cells)
+        number = self.rules.merged_number(self.get(x, y) for x, y in chain)
+        for x, y in chain:
+            self.cells[self.index(x, y)] = 0
+        x, y = chain[-1]
+        self.cells[self.index(x, y)] = number
+        self.refill()
+        self.handle_highest_number()
+        self.score = self.calculate_score()
+        self.moves += 1
+        return [(i % self.columns, i // self.columns, n) for i, (b, n) in enumerate(zip(before, self.cells)) if b != n]
+
+    # e.g. to look ahead, rng: another state of the random generator for the new tiles
+    def copy(self: Self, rng: int | None = None) -> 'GameState':
+        state = GameState(self.columns, self.rows, self.rng if rng is None else rng, start = False, cells = bytearray(self.cells), rules = self.rules)
+        state.low, state.high, state.score, state.moves = self.low, self.high, self.score, self.moves
+        return state
+
+    # a state of the tiles of another game (e.g. the Grid), to check a chain
+    @staticmethod
+    def from_cells(columns: int, rows: int, cells: Iterable[int], rules: Rules = DEFAULT_RULES) -> 'GameState':
+        state = GameState(columns, rows, 0, start = False, rules = rules)
+        state.cells[:] = bytes(cells)
+        tile_range = rules.get_tile_range_for_highest(state.get_highest_number())
+        state.low, state.high = tile_range.low, tile_range.high
+        state.score = state.calculate_score()
+        return state
+
+    def to_json(self: Self):
+        js = { 'columns': self.columns, 'rows': self.rows, 'tile-numbers': list(self.cells),
+               'range': [self.low, self.high], 'rng': self.rng, 'moves': self.moves }
+        if self.rules != DEFAULT_RULES:
+            js['rules'] = asdict(self.rules)
+        return js
+
+    @staticmethod
+    def from_json(js) -> 'GameState':
+        rules = Rules(**js['rules']) if 'rules' in js else DEFAULT_RULES
+        state = GameState(js['columns'], js['rows'], js['rng'], start = False, rules = rules)
+        if len(js['tile-numbers']) != state.columns * state.rows:
+            raise ValueError("number of tiles doesn't match the size")
+        state.cells[:] = bytes(js['tile-numbers'])
+        state.low, state.high = js['range']
+        state.moves = js['moves']
+        state.score = state.calculate_score()
+        return state
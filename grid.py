@@ -3,15 +3,20 @@
 from dataclasses import dataclass
 import pygame
 from typing import Dict, Self
-import random
 from functools import reduce
 import json
 import os
+import time
 
 
 from board import Board
 from tiles import TilePos, Tiles
 from config import Config
+from profiling import Profiler
+from frame_clock import FrameClock
+from game_state import Rng
+from rules import Rules, DEFAULT_RULES
+from spawn import SpawnPolicies
 
 
 #to do: use Grid_Tile here and let board handle tile.Tile to separate model (gameplay, grid) from view (board, tiles, status_pane)
@@ -33,12 +38,31 @@ class Grid(object):
     TOTAL_TILES = (MAX_X + 1) * (MAX_Y + 1)
 
 
-    def __init__(self, board: Board):
+    # the default size is the one of the game, other sizes are used by the benchmarks
+    # rules: the neighbours and the spawn policy of the variant (rules.py, spawn.py), the possible connections are counted with its tables
+    def __init__(self, board: Board, columns: int = NBR_COLUMNS, rows: int = NBR_ROWS, rules: Rules = DEFAULT_RULES):
+        if (columns, rows) != (Grid.NBR_COLUMNS, Grid.NBR_ROWS):
+            self.NBR_COLUMNS = columns
+            self.NBR_ROWS = rows
+            self.MAX_X = columns - 1
+            self.MAX_Y = rows - 1
+            self.TOTAL_TILES = columns * rows
         self.board: Board = board
-        self.board.set_number_rows(Grid.NBR_ROWS)
-        self.board.set_number_columns(Grid.NBR_COLUMNS)
+        self.board.set_number_rows(self.NBR_ROWS)
+        self.board.set_number_columns(self.NBR_COLUMNS)
         self.__tiles: PositionedTiles = PositionedTiles()
-        
+        # the numbers of the tiles row by row, 0: no tile, for the tables of the rules
+        self.__numbers = bytearray(self.TOTAL_TILES)
+        self.tables = rules.get_tables(self.NBR_COLUMNS, self.NBR_ROWS)
+        self.rules: Rules = rules
+        # the number of pairs of neighbours with the same number, kept by set_tile and remove_tile: a move is possible
+        self.__pairs: int = 0
+        # state of the random generator of the new tiles, restored by undo (move_history.py)
+        self.rng: int = Rng.new_seed()
+        # time waited by the animations, not part of the work of a frame (frame_governor.py)
+        self.waited_ms: float = 0.0
+        self.fps: int = 60
+
         for i, pos in enumerate(self.__iterate_tiles_pos()):
             self.__tiles[pos] = None # random: actually playing
 
@@ -51,7 +75,8 @@ class Grid(object):
                 self.set_tile(pos, js['tile-numbers'][i])
 
 
-    def refill(self: Self, in_min: int, in_max: int, delay_ms: int) -> None:
+    @Profiler.timed("Grid.refill")
+    async def refill(self: Self, in_min: int, in_max: int, delay_ms: int) -> None:
         # first drop all tiles in the grid
         for y in range(self.MAX_Y,self.MIN_Y, -1):
             for x in range(self.MIN_X, self.MAX_X + 1):
@@ -59,31 +84,30 @@ class Grid(object):
                 if not self.get_tile(p):
                     self.drop_tile(p)
 
-        self.animation_wait(delay_ms)
+        await self.animation_wait(delay_ms)
 
-        # then fill up the empty spaces
-        for y in range(self.MAX_Y,self. MIN_Y - 1, -1):
-            for x in range(self.MIN_X, self.MAX_X + 1):
-                p = TilePos(x, y)
-                if not self.get_tile(p):
-                    self.set_tile(p, random.randrange(in_min, in_max)) # actual game: random
-                    # self.set_tile(p, 1 + y*self.MAX_Y + x) # test fill all numbers sequentially, no moves possible
+        # then fill up the empty spaces, the numbers from the spawn policy of the rules (spawn.py)
+        empty = [self.get_index(TilePos(x, y)) for y in range(self.MAX_Y, self.MIN_Y - 1, -1)
+                 for x in range(self.MIN_X, self.MAX_X + 1) if not self.get_tile(TilePos(x, y))]
+        numbers = SpawnPolicies.get(self.rules).choose(self.tables, self.__numbers, empty, in_min, in_max, self.randrange,
+                                                       lambda: self.__pairs > 0)
+        for i, number in zip(empty, numbers):
+            self.set_tile(TilePos(i % self.NBR_COLUMNS, i // self.NBR_COLUMNS), number)
+
+    def randrange(self: Self, low: int, high: int) -> int:
+        self.rng, r = Rng.next(self.rng)
+        return low + r % (high - low)
 
     def check_connections_possible_for_pos(self: Self, pos: TilePos) -> bool:
-        for n in self.__iterate_neighbour_tiles(pos):
-            tile_n = self.get_tile(n)
-            tile_pos = self.get_tile(pos)
-            if tile_n and tile_pos:
-                if tile_n.number == tile_pos.number:
-                    return True
-        return False
+        return self.is_tilepos_in_grid(pos) and self.tables.can_start(self.__numbers, self.get_index(pos))
 
 
+    @Profiler.timed("Grid.check_connections_possible")
     def check_connections_possible(self: Self) -> bool:
-        for p in self.__iterate_tiles_pos():
-            if self.check_connections_possible_for_pos(p):
-                return True
-        return False
+        return self.__pairs > 0
+
+    def get_index(self: Self, pos: TilePos) -> int:
+        return pos.y * self.NBR_COLUMNS + pos.x
 
     def get_highest_number(self: Self) -> int:
         return reduce(lambda x, y: max(x, y), (t.number for t in self if t), 1)
@@ -94,11 +118,18 @@ class Grid(object):
 
     def set_tile(self: Self, pos: TilePos, number: int) -> None:
     # def set_tile(self, new_pos, new_tile: Tile) -> None:
+        i = self.get_index(pos)
         self.__tiles[pos] = GridTile(number)
+        self.__pairs -= self.tables.count_pairs_at(self.__numbers, i)
+        self.__numbers[i] = number
+        self.__pairs += self.tables.count_pairs_at(self.__numbers, i)
         self.board.set_tile(pos, number)
 
     def remove_tile(self: Self, pos: TilePos) -> None:
+        i = self.get_index(pos)
         self.__tiles[pos] = None;
+        self.__pairs -= self.tables.count_pairs_at(self.__numbers, i)
+        self.__numbers[i] = 0
         self.board.remove_tile(pos)
 
     # drop a higher tile to the given position
@@ -120,22 +151,25 @@ class Grid(object):
     def display_grid(self: Self) -> None:
         self.board.draw()
 
-    def animation_wait(self: Self, delay_ms: int):
+    # show the intermediate board of a move, no delay: nothing to show, the game loop draws the result
+    # the delay is waited in frames (fps), the window stays responsive and the other tasks keep their turns
+    async def animation_wait(self: Self, delay_ms: int):
+        if delay_ms <= 0:
+            return
         self.display_grid()
         pygame.display.flip()
-        pygame.time.delay(delay_ms)
+        start = time.perf_counter()
+        end = start + delay_ms / 1000
+        clock = FrameClock()
+        while time.perf_counter() < end:
+            pygame.event.pump()
+            await clock.tick(self.fps)
+        self.waited_ms += (time.perf_counter() - start) * 1000
 
     def __iterate_tiles_pos(self: Self):
         for i in range(self.TOTAL_TILES):
             yield TilePos(i % (self.MAX_X + 1), i // (self.MAX_X + 1))
 
-    def __iterate_neighbour_tiles(self: Self, pos: TilePos):
-        for x in range(pos.x - 1, pos.x + 2):
-            for y in range(pos.y - 1, pos.y + 2):
-                n = TilePos(x, y)
-                if n != pos and self.is_tilepos_in_grid(n):
-                    yield n
-
     def is_tilepos_in_grid(self: Self, pos: TilePos) -> bool:
         return (self.MIN_X <= pos.x <= self.MAX_X and
                 self.MIN_Y <= pos.y <= self.MAX_Y)
@@ -152,24 +186,27 @@ class Grid(object):
         Config.make_user_datapath()
         return os.path.join(Config.get_user_datapath(), 'grid.json')
 
-    def read(self: Self) -> None:
-        p = self.__get_filename()
+    # path: a save slot (save_slots.py), default grid.json, returns the json (with the extra of write) or None
+    def read(self: Self, path: str | None = None):
+        p = path or self.__get_filename()
         try:
             with open(p, 'r') as f:
                 js = json.load(f)
                 self.from_json(js)
+                return js
         except (KeyError, ValueError):
-            self.__init__(self.board)
+            self.__init__(self.board, self.NBR_COLUMNS, self.NBR_ROWS, self.rules)
             os.remove(p)
         except FileNotFoundError:
             pass # no file found, no board should be read in.
+        return None
 
-
-    def write(self: Self) -> None:
-        p = self.__get_filename()
+    # extra: more to keep with the board, e.g. the number of moves
+    def write(self: Self, path: str | None = None, extra = None) -> None:
+        p = path or self.__get_filename()
         try:
             with open(p, 'w') as f:
-                json.dump(self.to_json(), f)
+                json.dump(self.to_json() | (extra or {}), f)
         except Exception as e:
             print(e)
 
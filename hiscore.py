@@ -6,10 +6,12 @@ import json
 from datetime import datetime
 import os
 
-# import replit # testing for maybe running the game on replit.com
-
 import pygame
 from config import Config
+from fonts import Fonts
+from frame_clock import FrameClock
+from leaderboard_client import LeaderboardClient
+from profiling import Profiler
 
 @dataclass
 class Score:
@@ -18,9 +20,6 @@ class Score:
     user: str
     datetime: str
 
-#     ost = replit.ObjectStorage()
-#     b = ost.get_default_bucket()
-
     def to_json(self: Self):
         return { 'points': self.points, 'tile': self.highest_tile, 'user': self.user, 'datetime': self.datetime }
 
@@ -38,6 +37,12 @@ class HiScore:
         self.__read()
         self.user = user
         self.screen = screen
+        # shared leaderboard next to the local hiscore, when configured
+        self.leaderboard: LeaderboardClient | None = None
+        if url := Config.get_leaderboard_url():
+            Config.make_user_datapath()
+            self.leaderboard = LeaderboardClient(url, Config.get_user_datapath())
+            self.leaderboard.start()
 
     @staticmethod
     def __get_filename() -> str:
@@ -61,6 +66,7 @@ class HiScore:
             pass # file will be created, __scores can't be filled in
 
 
+    @Profiler.timed("HiScore.write")
     def __write(self: Self) -> None:
         p = self.__get_filename()
         try:
@@ -69,45 +75,77 @@ class HiScore:
         except Exception as e:
             print(e)
 
-    #return whether the score is part of the hiscore
-    def add_score(self: Self, in_points: int, in_tile: int) -> bool:
+    #return whether the score is part of the hiscore, show: display the hiscore with the new score until a key is pressed
+    async def add_score(self: Self, in_points: int, in_tile: int, show: bool = True) -> bool:
+        now = datetime.utcnow()
+        str_now = current_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        score = Score(points = in_points, highest_tile = in_tile, user = self.user, datetime = str_now)
+        # every score goes to the shared leaderboard, it decides itself whether it's a hiscore
+        if self.leaderboard:
+            self.leaderboard.submit(score.to_json())
+
         self.__scores.sort(key=lambda s: s.points, reverse = True)
 
         if len(self.__scores) >= HiScore.MAX_SCORES:
             if in_points <= self.__scores[-1].points:
                 return False
-        now = datetime.utcnow()
-        str_now = current_time = now.strftime("%Y-%m-%d %H:%M:%S")
-        score = Score(points = in_points, highest_tile = in_tile, user = self.user, datetime = str_now)
 
         self.__scores.append(score)
         self.__scores.sort(key=lambda s: s.points, reverse = True)
         self.__scores = self.__scores[0: HiScore.MAX_SCORES]
         self.__write()
-        self.display(score)
+        if show:
+            await self.display(score)
         return True
 
-    def display(self: Self, new_score: Score | None = None) -> bool:
+    # the leaderboard uploads what it still can, the rest is uploaded in a next session
+    async def close(self: Self) -> None:
+        if self.leaderboard:
+            await self.leaderboard.close()
+
+    # return whether the user wants to quit
+    # with a shared leaderboard, G switches between the local and the global top 10
+    async def display(self: Self, new_score: Score | None = None) -> bool:
         print("Hiscore top 10")
         for i, s in enumerate(self.__scores):
             print(f'{i+1:2} - score: {s.points:15n}, tile: {s.highest_tile:2}, time: {s.datetime}, user: {s.user}')
+        show_global = False
+        self.__draw("Hiscore Top 10:", self.__scores, new_score)
+        clock = FrameClock()
+        waiting = True
+        while waiting:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return True
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_g and self.leaderboard:
+                    show_global = not show_global
+                    if show_global:
+                        scores = [Score(int(j['points']), int(j['tile']), j['user'], j['datetime']) for j in self.leaderboard.get_top()]
+                        self.__draw("Global Top 10:" if self.leaderboard.online else "Global Top 10 (offline):", scores, new_score)
+                    else:
+                        self.__draw("Hiscore Top 10:", self.__scores, new_score)
+                elif event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
+                    return False
+            await clock.tick(30)
+
+    def __draw(self: Self, title: str, scores, new_score: Score | None) -> None:
         self.screen.fill("yellow")
-        font = pygame.font.Font(None, 30)
-        text: pygame.Surface = font.render("Hiscore Top 10:", True, "black")
+        font = Fonts.get(30)
+        text: pygame.Surface = font.render(title, True, "black")
         text_rect: pygame.Rect = text.get_rect()
         text_rect.top = 5
         text_rect.left = 5
         self.screen.blit(text, text_rect)
         top = 22
-        for i, s in enumerate(self.__scores):
-            font = pygame.font.Font(None, 24)
+        for i, s in enumerate(scores):
+            font = Fonts.get(24)
             text: pygame.Surface = font.render(f'{i+1:2} - score: {s.points:15n}, tile: {s.highest_tile:2}', True, "red" if new_score and new_score == s else "darkblue")
             text_rect: pygame.Rect = text.get_rect()
             top += 24
             text_rect.top = top
             text_rect.left = 5
             self.screen.blit(text, text_rect)
-            font = pygame.font.Font(None, 22)
+            font = Fonts.get(22)
             text: pygame.Surface = font.render(f'        time: {s.datetime}, user: {s.user}', True, "blue")
             text_rect: pygame.Rect = text.get_rect()
             top += 26
@@ -116,31 +154,19 @@ class HiScore:
             self.screen.blit(text, text_rect)
 
         top += 30
-        font = pygame.font.Font(None, 26)
+        font = Fonts.get(26)
         text: pygame.Surface = font.render("Time is UTC, not local time", True, "grey")
         text_rect: pygame.Rect = text.get_rect()
         text_rect.top = top
         text_rect.left = 5
         self.screen.blit(text, text_rect)
         top += 30
-        font = pygame.font.Font(None, 26)
-        text: pygame.Surface = font.render("Press a key or mouse button to continue...", True, "grey")
+        font = Fonts.get(26)
+        continue_text = "G: local/global, other key to continue..." if self.leaderboard else "Press a key or mouse button to continue..."
+        text: pygame.Surface = font.render(continue_text, True, "grey")
         text_rect: pygame.Rect = text.get_rect()
         text_rect.top = top
         text_rect.left = 5
         self.screen.blit(text, text_rect)
 
         pygame.display.flip()
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return True
-                if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                    return False
-
-
-
-
-
-
@@ -1,11 +1,16 @@
 # about and help info
 # also version for internal use (?)
 from typing import Self
+import time
 import pygame
 from tiles import Tiles, Tile, TileState
 from enum import Enum
 
-from grid import Grid
+from save_slots import SaveSlots
+from profiling import StartupTimer
+from fonts import Fonts
+from frame_clock import FrameClock
+from scale import Scale, WindowResize
 class Version:
     PROGRAM_VERSION = 1.1
 
@@ -19,24 +24,28 @@ class IntroPage:
     def __init__(self: Self, image: pygame.Surface):
         self.image = image
         self.bg_color = "grey"
+        self.resize: WindowResize = WindowResize()
 
-    def show(self: Self) -> bool:
-        self.__display()
-        return self.__handle_input()
+    async def show(self: Self) -> bool:
+        await self.__display()
+        return await self.__handle_input()
 
     # remark: temporary code
-    def __display(self: Self) -> None:
+    # at the scale of the window (scale.py), animate: mark the tiles 1 by 1, else at once (after a resize)
+    async def __display(self: Self, animate: bool = True) -> None:
+        Tiles.set_scale()
+        px = Scale.px
         self.image.fill(pygame.Color("paleturquoise"))
 
-        font = pygame.font.Font(None, 30)
+        font = Fonts.get_scaled(30)
         text: pygame.Surface = font.render(f"Connect Log2 V{Version.PROGRAM_VERSION}", True, "darkblue")
         text_rect: pygame.Rect = text.get_rect()
-        text_rect.centery = 70
+        text_rect.centery = px(70)
         text_rect.centerx = self.image.get_rect().center[0]
         self.image.blit(text, text_rect)
 
-        height = self.image.get_rect().center[1] - 40
-        centerx = self.image.get_rect().center[0] - 40
+        height = self.image.get_rect().center[1] - px(40)
+        centerx = self.image.get_rect().center[0] - px(40)
         bg_height = 100
         background = pygame.Surface((self.image.get_rect().width, self.image.get_rect().height))
         bg_rect = background.get_rect()
@@ -44,11 +53,11 @@ class IntroPage:
         background.set_colorkey(self.bg_color)
 
         tile1 = Tiles.get_tile(1)
-        Tile.update(tile1, pos = (centerx - 85, height - 40))
+        Tile.update(tile1, pos = (centerx - px(85), height - px(40)))
         tile2 = Tiles.get_tile(1)
-        Tile.update(tile2, pos = (centerx, height - 40))
+        Tile.update(tile2, pos = (centerx, height - px(40)))
         tile3 = Tiles.get_tile(2)
-        Tile.update(tile3, pos = (centerx + 85, height - 40))
+        Tile.update(tile3, pos = (centerx + px(85), height - px(40)))
         group = pygame.sprite.Group()
         group.add(tile1)
         group.add(tile2)
@@ -56,50 +65,68 @@ class IntroPage:
         group.draw(background)
         self.image.blit(background, background.get_rect())
 
-        font = pygame.font.Font(None, 24)
-        option_text: str = "New game, Load saved game, Help <N/L/H>" if Grid.is_file_present() else "New game, Help <N/H>"
+        font = Fonts.get_scaled(24)
+        option_text: str = "New game, Load saved game, Help <N/L/H>" if SaveSlots().has_slots() else "New game, Help <N/H>"
         text: pygame.Surface = font.render(option_text, True, "darkblue")
         text_rect: pygame.Rect = text.get_rect()
-        text_rect.centery = self.image.get_rect().height - 70
+        text_rect.centery = self.image.get_rect().height - px(70)
         text_rect.centerx = self.image.get_rect().center[0]
         self.image.blit(text, text_rect)
 
-        font = pygame.font.Font(None, 18)
+        font = Fonts.get_scaled(18)
         option_text: str = "Made by Stefaan Verstraeten"
         text: pygame.Surface = font.render(option_text, True, "grey56")
         text_rect: pygame.Rect = text.get_rect()
-        text_rect.centery = self.image.get_rect().height - 30
+        text_rect.centery = self.image.get_rect().height - px(30)
         text_rect.centerx = self.image.get_rect().center[0]
         self.image.blit(text, text_rect)
         pygame.display.flip()
-        pygame.time.delay(300)
+        # input is already accepted during the animation
+        StartupTimer.first_frame("intro")
+        if animate and await self.__wait(300):
+            return
 
         tile1.mark(TileState.ON)
         group.draw(background)
         self.image.blit(background, background.get_rect())
-        pygame.display.update(pygame.Rect(0, height - 50, self.image.get_rect().width, height + 50))
+        pygame.display.update(pygame.Rect(0, height - px(50), self.image.get_rect().width, height + px(50)))
         pygame.display.flip()
-        pygame.time.delay(300)
+        if animate and await self.__wait(300):
+            return
 
         tile2.mark(TileState.ON)
-        pygame.draw.line(background, pygame.Color("black"), (centerx - 55, height), (centerx + 30, height), 7)
+        pygame.draw.line(background, pygame.Color("black"), (centerx - px(55), height), (centerx + px(30), height), px(7))
         group.draw(background)
         self.image.blit(background, background.get_rect())
-        pygame.display.update(pygame.Rect(0, height - 50, self.image.get_rect().width, height + 50))
+        pygame.display.update(pygame.Rect(0, height - px(50), self.image.get_rect().width, height + px(50)))
         #pygame.display.update()
-        pygame.time.delay(300)
+        if animate and await self.__wait(300):
+            return
 
         tile3.mark(TileState.ON)
-        pygame.draw.line(background, pygame.Color("black"), (centerx + 30, height), (centerx + 115, height), 7)
+        pygame.draw.line(background, pygame.Color("black"), (centerx + px(30), height), (centerx + px(115), height), px(7))
         group.draw(background)
         self.image.blit(background, background.get_rect())
-        pygame.display.update(pygame.Rect(0, height - 50, self.image.get_rect().width, height + 50))
+        pygame.display.update(pygame.Rect(0, height - px(50), self.image.get_rect().width, height + px(50)))
+
+    # wait for the animation, returns True (stop animating) as soon as the user pressed a key, quits or resizes the window
+    # (__handle_input then draws the intro at the new size), perf_counter: the sdl timer isn't initialised (pygame.time)
+    @staticmethod
+    async def __wait(delay_ms: int) -> bool:
+        end = time.perf_counter() + delay_ms / 1000
+        while time.perf_counter() < end:
+            if pygame.event.peek((pygame.KEYDOWN, pygame.QUIT, pygame.VIDEORESIZE)):
+                return True
+            await FrameClock.wait(10)
+        return False
 
     # remark: temporary code
-    def __handle_input(self: Self) -> bool:
+    async def __handle_input(self: Self) -> bool:
+        clock = FrameClock()
         waiting = True
         while waiting:
             for event in pygame.event.get():
+                self.resize.check(event)
                 if event.type == pygame.QUIT:
                     return self.Return.QUIT
                 if event.type == pygame.KEYDOWN:
@@ -110,6 +137,10 @@ class IntroPage:
                     elif event.key == pygame.K_h:
                         return self.Return.HELP
                     return True
+            if size := self.resize.get_size():
+                Scale.factor = Scale.fit(size)
+                await self.__display(animate = False)
+            await clock.tick(30)
 
 
 class HelpPage:
@@ -0,0 +1,244 @@
+# client for the shared leaderboard (see leaderboard_server.py), used by HiScore
+# - submitted scores go to a queue file first, so scores made without connectivity aren't lost
+# - a task on the game's event loop uploads the queue in batches over a small pool of keep-alive connections
+# - the top N is cached in a file and refreshed with conditional requests (ETag / If-None-Match)
+# submit() only appends to the queue file, the game loop never waits for the network
+# a batch can be uploaded twice (e.g. cut off before the answer), the server ignores scores it already has
+# the scores are the json dicts of Score.to_json()
+#
+# http api:
+#   POST /scores    body: [score, ...]  -> 200 {"accepted": n}
+#   GET  /top?n=10                      -> 200 [score, ...] with an ETag header, 304 when not changed
+
+from typing import Self, List, Dict, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import json
+import os
+
+class HttpError(Exception):
+    pass
+
+# minimal http/1.1 client on asyncio streams, connections are kept open and reused
+class HttpConnectionPool:
+    def __init__(self: Self, url: str, size: int = 2, timeout_s: float = 5.0):
+        parts = urlsplit(url)
+        self.host: str = parts.hostname or 'localhost'
+        self.ssl: bool = parts.scheme == 'https'
+        self.port: int = parts.port or (443 if self.ssl else 80)
+        self.base_path: str = parts.path.rstrip('/')
+        self.timeout_s = timeout_s
+        self.__idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.__slots = asyncio.Semaphore(size)
+
+    async def request(self: Self, method: str, path: str, body: bytes | None = None,
+                      headers: Dict[str, str] | None = None) -> Tuple[int, Dict[str, str], bytes]:
+        async with self.__slots:
+            reused = bool(self.__idle)
+            try:
+                return await asyncio.wait_for(self.__request(method, path, body, headers), self.timeout_s)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                # the server may have closed the idle keep-alive connections: retry once on a new one
+                if not reused:
+                    raise HttpError(str(e)) from e
+                self.close()
+            try:
+                return await asyncio.wait_for(self.__request(method, path, body, headers), self.timeout_s)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                raise HttpError(str(e)) from e
+
+    async def __request(self: Self, method: str, path: str, body: bytes | None, headers: Dict[str, str] | None):
+        reader, writer = self.__idle.pop() if self.__idle else await asyncio.open_connection(self.host, self.port, ssl = self.ssl)
+        try:
+            lines = [f"{method} {self.base_path}{path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(body) if body else 0}"]
+            if body:
+                lines.append("Content-Type: application/json")
+            lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b''))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("connection closed by the server")
+            # "HTTP/1.1 200 OK", anything else isn't a server to talk to
+            parts = status_line.split()
+            if len(parts) < 2 or not parts[1].isdigit():
+                raise HttpError(f"bad status line: {status_line[:80]!r}")
+            status = int(parts[1])
+            response_headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                key, _, value = line.decode('latin-1').partition(':')
+                response_headers[key.strip().lower()] = value.strip()
+            response_body = await reader.readexactly(int(response_headers.get('content-length', 0)))
+        except BaseException:
+            writer.close()
+            raise
+        if response_headers.get('connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self.__idle.append((reader, writer))
+        return status, response_headers, response_body
+
+    def close(self: Self) -> None:
+        for _, writer in self.__idle:
+            writer.close()
+        self.__idle = []
+
+# scores waiting for upload, 1 json object per line, kept on disk until the server accepted them
+class ScoreQueue:
+    def __init__(self: Self, path: str):
+        self.path = path
+        self.__scores: List[Dict] = []
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        self.__scores.append(json.loads(line))
+                    except ValueError:
+                        pass # half written line of a crash, the other scores are still good
+        except FileNotFoundError:
+            pass
+
+    def __len__(self: Self) -> int:
+        return len(self.__scores)
+
+    # append only: cheap enough to do from the game loop (no fsync, the os writes it out)
+    def append(self: Self, score: Dict) -> None:
+        self.__scores.append(score)
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(score) + "\n")
+        except Exception as e:
+            print(e)
+
+    def peek(self: Self, n: int) -> List[Dict]:
+        return self.__scores[:n]
+
+    # remove the first n scores (uploaded), the file is replaced atomically
+    def drop(self: Self, n: int) -> None:
+        self.__scores = self.__scores[n:]
+        try:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                f.writelines(json.dumps(s) + "\n" for s in self.__scores)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(e)
+
+class LeaderboardClient:
+    BATCH_SIZE = 50
+    TOP_N = 10
+    REFRESH_S = 60.0 # refresh of the cached top N
+    MAX_BACKOFF_S = 300.0 # longest wait between retries when the server can't be reached
+
+    def __init__(self: Self, url: str, datapath: str):
+        self.url = url
+        self.queue = ScoreQueue(os.path.join(datapath, 'leaderboard_queue.jsonl'))
+        self.__cache_path = os.path.join(datapath, 'leaderboard_cache.json')
+        self.__etag: str | None = None
+        self.__top: List[Dict] = []
+        self.__read_cache()
+        self.__pool: HttpConnectionPool | None = None
+        self.__task: asyncio.Task | None = None
+        self.__wake: asyncio.Event | None = None
+        self.online: bool = False
+
+    def __read_cache(self: Self) -> None:
+        try:
+            with open(self.__cache_path, 'r') as f:
+                js = json.load(f)
+                self.__etag = js['etag']
+                self.__top = js['scores']
+        except FileNotFoundError:
+            pass
+        except (KeyError, ValueError, TypeError):
+            self.__etag, self.__top = None, []
+
+    def __write_cache(self: Self) -> None:
+        try:
+            with open(self.__cache_path, 'w') as f:
+                json.dump({ 'etag': self.__etag, 'scores': self.__top }, f)
+        except Exception as e:
+            print(e)
+
+    # the background task is started on the running event loop when the client is first used from a coroutine
+    def start(self: Self) -> None:
+        if self.__task and not self.__task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return # no event loop (yet): the queue is uploaded once the client is used from the game
+        self.__pool = HttpConnectionPool(self.url)
+        self.__wake = asyncio.Event()
+        self.__task = loop.create_task(self.__run())
+
+    def submit(self: Self, score: Dict) -> None:
+        self.queue.append(score)
+        self.start()
+        if self.__wake:
+            self.__wake.set()
+
+    # cached top N (possibly from an earlier session), best first
+    def get_top(self: Self) -> List[Dict]:
+        return self.__top
+
+    async def __run(self: Self) -> None:
+        backoff = 1.0
+        next_refresh = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await self.flush()
+                if loop.time() >= next_refresh:
+                    await self.refresh_top()
+                    next_refresh = loop.time() + LeaderboardClient.REFRESH_S
+                self.online = True
+                backoff = 1.0
+                timeout = LeaderboardClient.REFRESH_S
+            except (OSError, HttpError, asyncio.TimeoutError, ValueError):
+                self.online = False
+                timeout = backoff
+                backoff = min(backoff * 2, LeaderboardClient.MAX_BACKOFF_S)
+            self.__wake.clear()
+            try:
+                await asyncio.wait_for(self.__wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # upload the queue in batches, a batch is only removed from the queue when the server accepted it
+    async def flush(self: Self) -> None:
+        while batch := self.queue.peek(LeaderboardClient.BATCH_SIZE):
+            status, _, _ = await self.__pool.request("POST", "/scores", json.dumps(batch).encode())
+            if status != 200:
+                raise HttpError(f"upload of scores failed: {status}")
+            self.queue.drop(len(batch))
+
+    async def refresh_top(self: Self) -> None:
+        headers = { 'If-None-Match': self.__etag } if self.__etag else {}
+        status, response_headers, body = await self.__pool.request("GET", f"/top?n={LeaderboardClient.TOP_N}", headers = headers)
+        if status == 304:
+            return
+        if status != 200:
+            raise HttpError(f"top {LeaderboardClient.TOP_N} failed: {status}")
+        self.__top = json.loads(body)
+        self.__etag = response_headers.get('etag')
+        self.__write_cache()
+
+    # try to upload what is left in the queue, the rest is uploaded in a next session
+    async def close(self: Self, timeout_s: float = 2.0) -> None:
+        if not self.__task:
+            return
+        # the upload of the task has ended before the last one starts
+        self.__task.cancel()
+        try:
+            await self.__task
+        except asyncio.CancelledError:
+            pass
+        if len(self.queue):
+            try:
+                await asyncio.wait_for(self.flush(), timeout_s)
+            except (OSError, HttpError, asyncio.TimeoutError):
+                pass
+        self.__pool.close()
+        self.__task = None
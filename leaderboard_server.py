@@ -0,0 +1,315 @@
+# leaderboard server for the shared hiscores (see leaderboard_client.py)
+#   python leaderboard_server.py --port 8765 --log leaderboard.jsonl
+# then start the game with --leaderboard http://localhost:8765
+# - the scores are kept in memory in ranked indexes: global, per user and per highest tile
+# - every accepted score is appended to the log file, the indexes are rebuilt from it at start
+# - a score that is already known (same user, time, points and tile) is ignored, so a client can resend a batch
+#
+# http api:
+#   POST /scores    body: [score, ...]                     -> 200 {"accepted": n}
+#   GET  /top?n=10[&offset=0][&user=name | &tile=12]       -> 200 [score, ...] with an ETag header, 304 when not changed
+#   GET  /rank?points=1234[&user=name | &tile=12]          -> 200 {"rank": r, "total": n}, r: 1 + the number of better scores
+
+from typing import Self, List, Dict, Tuple, Iterator
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import asyncio
+import json
+import math
+import random
+
+class _Node:
+    __slots__ = ('key', 'score', 'next', 'width')
+
+    def __init__(self: Self, key: Tuple, score: Dict | None, levels: int):
+        self.key = key
+        self.score = score
+        self.next: List[_Node] = [None] * levels
+        # width[level]: number of positions to the next node on that level, for the rank lookups
+        self.width: List[int] = [1] * levels
+
+# indexable skip list of the scores, best first:
+# insert, rank and the start of a top N in O(log n), then O(N) for the N scores
+class RankedScores:
+    # sorts after every score key
+    END_KEY = (math.inf,)
+
+    def __init__(self: Self, max_levels: int = 24):
+        self.max_levels = max_levels
+        self.__end = _Node(RankedScores.END_KEY, None, 0)
+        self.__head = _Node((), None, max_levels)
+        self.__head.next = [self.__end] * max_levels
+        self.__size = 0
+
+    def __len__(self: Self) -> int:
+        return self.__size
+
+    # best first: most points, then the oldest
+    @staticmethod
+    def key(score: Dict) -> Tuple:
+        return (-score['points'], score['datetime'], score['user'], score['tile'])
+
+    def insert(self: Self, score: Dict) -> None:
+        key = RankedScores.key(score)
+        levels = min(self.max_levels, 1 - int(math.log2(1.0 - random.random())))
+        chain: List[_Node] = [self.__head] * self.max_levels
+        steps_at_level = [0] * self.max_levels
+        node = self.__head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        new_node = _Node(key, score, levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.max_levels):
+            chain[level].width[level] += 1
+        self.__size += 1
+
+    # number of scores with more points
+    def count_better(self: Self, points: int) -> int:
+        key = (-points,)
+        count = 0
+        node = self.__head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].key < key:
+                count += node.width[level]
+                node = node.next[level]
+        return count
+
+    # scores from position offset on (0: the best)
+    def iter_from(self: Self, offset: int = 0) -> Iterator[Dict]:
+        if offset >= self.__size:
+            return
+        node = self.__head
+        position = offset + 1
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= position:
+                position -= node.width[level]
+                node = node.next[level]
+        while node is not self.__end:
+            yield node.score
+            node = node.next[0]
+
+    def get_top(self: Self, n: int, offset: int = 0) -> List[Dict]:
+        top = []
+        for score in self.iter_from(offset):
+            if len(top) >= n:
+                break
+            top.append(score)
+        return top
+
+class Leaderboard:
+    def __init__(self: Self):
+        self.scores = RankedScores(24)
+        self.by_user: Dict[str, RankedScores] = {}
+        self.by_tile: Dict[int, RankedScores] = {}
+        self.__known = set()
+
+    def __len__(self: Self) -> int:
+        return len(self.scores)
+
+    @staticmethod
+    def normalize(s: Dict) -> Dict:
+        return { 'points': int(s['points']), 'tile': int(s['tile']), 'user': str(s['user']), 'datetime': str(s['datetime']) }
+
+    def is_known(self: Self, score: Dict) -> bool:
+        return RankedScores.key(score) in self.__known
+
+    # False for a score that is already known
+    def add(self: Self, score: Dict) -> bool:
+        if (key := RankedScores.key(score)) in self.__known:
+            return False
+        self.__known.add(key)
+        self.scores.insert(score)
+        if (user_scores := self.by_user.get(score['user'])) is None:
+            user_scores = self.by_user[score['user']] = RankedScores(12)
+        user_scores.insert(score)
+        if (tile_scores := self.by_tile.get(score['tile'])) is None:
+            tile_scores = self.by_tile[score['tile']] = RankedScores(20)
+        tile_scores.insert(score)
+        return True
+
+    # the index for a query, an empty one for an unknown user or tile
+    def get_index(self: Self, user: str | None = None, tile: int | None = None) -> RankedScores:
+        if user is not None:
+            return self.by_user.get(user) or RankedScores(1)
+        if tile is not None:
+            return self.by_tile.get(tile) or RankedScores(1)
+        return self.scores
+
+# append only log of the accepted scores, 1 json object per line
+class ScoreLog:
+    def __init__(self: Self, path: str):
+        self.path = path
+        self.__file = None
+
+    def replay(self: Self) -> Iterator[Dict]:
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        yield Leaderboard.normalize(json.loads(line))
+                    except (KeyError, ValueError, TypeError):
+                        pass # half written line of a crash
+        except FileNotFoundError:
+            pass
+
+    # 1 write per batch, no fsync: a crash of the machine can lose the last batches, the clients resend what wasn't answered
+    def append(self: Self, scores: List[Dict]) -> None:
+        if self.__file is None:
+            self.__file = open(self.path, 'a')
+        self.__file.write(''.join(json.dumps(s) + "\n" for s in scores))
+        self.__file.flush()
+
+    def close(self: Self) -> None:
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+
+class LeaderboardServer:
+    MAX_BODY = 1 << 20
+    MAX_TOP = 100
+
+    def __init__(self: Self, host: str = '127.0.0.1', port: int = 8765, log_path: str | None = None):
+        self.host = host
+        self.port = port
+        self.leaderboard = Leaderboard()
+        self.__log: ScoreLog | None = None
+        if log_path:
+            self.__log = ScoreLog(log_path)
+            for score in self.__log.replay():
+                self.leaderboard.add(score)
+        self.__version: int = 0 # changes with every accepted score, used as ETag
+        self.__server: asyncio.Server | None = None
+        self.__connections = set()
+
+    async def start(self: Self) -> None:
+        self.__server = await asyncio.start_server(self.__handle_connection, self.host, self.port)
+        # port 0: the os chooses a free port
+        self.port = self.__server.sockets[0].getsockname()[1]
+
+    async def stop(self: Self) -> None:
+        self.__server.close()
+        # the keep-alive connections end when their reader sees the end of the stream
+        for writer in list(self.__connections):
+            writer.close()
+        await self.__server.wait_closed()
+        await asyncio.sleep(0)
+        if self.__log:
+            self.__log.close()
+
+    async def serve_forever(self: Self) -> None:
+        await self.start()
+        print(f"Leaderboard on http://{self.host}:{self.port}, {len(self.leaderboard)} scores")
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    # the whole batch is checked first: a bad score rejects it before any score is added, the log stays the state
+    # the new scores are logged before they are added: an OSError of the log leaves the indexes as they were
+    def add_scores(self: Self, scores: List[Dict]) -> int:
+        normalized = [Leaderboard.normalize(score) for score in scores]
+        # the same score twice in the batch is added once, the key is the whole score
+        accepted = list({ RankedScores.key(score): score for score in normalized if not self.leaderboard.is_known(score) }.values())
+        if accepted:
+            if self.__log:
+                self.__log.append(accepted)
+            for score in accepted:
+                self.leaderboard.add(score)
+            self.__version += 1
+        return len(accepted)
+
+    def get_top(self: Self, n: int, offset: int = 0, user: str | None = None, tile: int | None = None) -> List[Dict]:
+        return self.leaderboard.get_index(user, tile).get_top(n, offset)
+
+    def get_rank(self: Self, points: int, user: str | None = None, tile: int | None = None) -> Tuple[int, int]:
+        index = self.leaderboard.get_index(user, tile)
+        return index.count_better(points) + 1, len(index)
+
+    async def __handle_connection(self: Self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.__connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > LeaderboardServer.MAX_BODY:
+                    await self.__respond(writer, 413, b'', close = True)
+                    break
+                body = await reader.readexactly(length)
+                status, response_headers, response = self.__route(method, target, headers, body)
+                close = headers.get('connection', '').lower() == 'close'
+                await self.__respond(writer, status, response, response_headers, close)
+                if close:
+                    break
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.__connections.discard(writer)
+            writer.close()
+
+    def __route(self: Self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        url = urlsplit(target)
+        query = { k: v[0] for k, v in parse_qs(url.query).items() }
+        try:
+            if method == 'POST' and url.path == '/scores':
+                accepted = self.add_scores(json.loads(body))
+                return 200, {}, json.dumps({ 'accepted': accepted }).encode()
+            if method == 'GET' and url.path in ('/top', '/rank'):
+                user = query.get('user')
+                tile = int(query['tile']) if 'tile' in query else None
+                if url.path == '/rank':
+                    rank, total = self.get_rank(int(query['points']), user, tile)
+                    return 200, {}, json.dumps({ 'rank': rank, 'total': total }).encode()
+                etag = f'"{self.__version}"'
+                if headers.get('if-none-match') == etag:
+                    return 304, { 'ETag': etag }, b''
+                n = min(int(query.get('n', '10')), LeaderboardServer.MAX_TOP)
+                offset = max(0, int(query.get('offset', '0')))
+                return 200, { 'ETag': etag }, json.dumps(self.get_top(n, offset, user, tile)).encode()
+        except (KeyError, ValueError, TypeError):
+            return 400, {}, b''
+        except OSError as e:
+            print(e) # the score log couldn't be written, the client sends the batch again
+            return 500, {}, b''
+        return 404, {}, b''
+
+    @staticmethod
+    async def __respond(writer: asyncio.StreamWriter, status: int, body: bytes, headers: Dict[str, str] | None = None, close: bool = False) -> None:
+        reasons = { 200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                    500: 'Internal Server Error' }
+        lines = [f"HTTP/1.1 {status} {reasons.get(status, '')}", f"Content-Length: {len(body)}"]
+        if body:
+            lines.append("Content-Type: application/json")
+        if close:
+            lines.append("Connection: close")
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = "ConnectLog2 leaderboard server")
+    parser.add_argument("--host", default = '127.0.0.1')
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--log", help = "append only score log, the scores are read back at start (default: in memory only)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(LeaderboardServer(args.host, args.port, args.log).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
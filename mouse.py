@@ -17,10 +17,16 @@ class MouseEventChecker:
         DRAG = 5
         DRAG_STOP = 6
         RIGHT_BUTTON = 7
+        BACK = 8     # side button X1
+        FORWARD = 9  # side button X2
+    # created once: pygame.time.set_timer() keeps a reference to the event, the events of every new game would stay in memory
+    SINGLE_CLICK_TIMER = pygame.event.Event(pygame.USEREVENT + 10)
+    DOUBLE_CLICK_TIMER = pygame.event.Event(pygame.USEREVENT + 11)
+
     def __init__(self: Self, status: StatusPane):
         self.status : StatusPane = status
-        self.single_click_timer : pygame.event.Event = pygame.event.Event(pygame.USEREVENT + 10)
-        self.double_click_timer : pygame.event.Event = pygame.event.Event(pygame.USEREVENT + 11)
+        self.single_click_timer : pygame.event.Event = MouseEventChecker.SINGLE_CLICK_TIMER
+        self.double_click_timer : pygame.event.Event = MouseEventChecker.DOUBLE_CLICK_TIMER
         self.timer1: bool = False
         self.timer2: bool = False
         self.mouse_active: bool = False
@@ -29,20 +35,23 @@ class MouseEventChecker:
 
 
     def check(self: Self, event: pygame.event.Event) -> Click | None:
+        # the position and button of the event itself, not the current mouse state: posted events (stress.py) work too
         if event.type == pygame.MOUSEMOTION:
-            pos = pygame.mouse.get_pos()
             if self.drag:
-                self.mouse_pos = pygame.mouse.get_pos()
+                self.mouse_pos = event.pos
                 return self.Click.DRAG
 
         if event.type == pygame.MOUSEBUTTONDOWN:
-            presses = pygame.mouse.get_pressed()
-            if not self.mouse_active and presses[0]:
+            if event.button == pygame.BUTTON_X1:
+                return self.Click.BACK
+            if event.button == pygame.BUTTON_X2:
+                return self.Click.FORWARD
+            if not self.mouse_active and event.button == pygame.BUTTON_LEFT:
                 self.mouse_active = True
                 self.timer1 = True
                 pygame.time.set_timer(self.single_click_timer, 200)
-                self.mouse_pos = pygame.mouse.get_pos()
-            if presses[2]:
+                self.mouse_pos = event.pos
+            if event.button == pygame.BUTTON_RIGHT:
                 return self.Click.RIGHT_BUTTON
         if event.type == pygame.MOUSEBUTTONUP:
             # return self.Click.SINGLE # for now as the timer doesn't seem to work
@@ -73,7 +82,7 @@ class MouseEventChecker:
             self.mouse_active = False
             return self.Click.SINGLE
         elif event == pygame.MOUSEMOTION and self.drag:
-            self.mouse_pos = pygame.mouse.get_pos()
+            self.mouse_pos = event.pos
             return self.Click.DRAG
 
         return None
@@ -0,0 +1,67 @@
+# undo/redo of the moves of the game on screen
+# a move is kept as a delta: only the cells it changed (before and after, the new tiles of the refill included),
+# the tile range and the state of the random generator of the grid before and after the move
+# a move takes about 100 bytes, undo and redo set only the changed cells: the other tiles keep their sprites
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Self, List
+
+from game_state import TileRange
+
+@dataclass(frozen = True)
+class MoveDelta:
+    indices: bytes # index of the cell: y * columns + x
+    before: bytes  # numbers, 0 for an empty cell
+    after: bytes
+    range_before: TileRange
+    range_after: TileRange
+    rng_before: int
+    rng_after: int
+    chain: bytes = b'' # indices of the connected tiles, in order (shown by the replay viewer)
+
+    @staticmethod
+    def create(before: bytes, after: bytes, range_before: TileRange, range_after: TileRange, rng_before: int, rng_after: int,
+               chain: bytes = b'') -> 'MoveDelta':
+        indices = bytes(i for i in range(len(before)) if before[i] != after[i])
+        return MoveDelta(indices, bytes(before[i] for i in indices), bytes(after[i] for i in indices),
+                         range_before, range_after, rng_before, rng_after, chain)
+
+class MoveHistory:
+    MAX_MOVES = 100_000 # the oldest moves are forgotten
+
+    def __init__(self: Self, max_moves: int = MAX_MOVES):
+        self.__undo: deque[MoveDelta] = deque(maxlen = max_moves)
+        self.__redo: List[MoveDelta] = []
+
+    # a new move: the undone moves can't be redone anymore
+    def add(self: Self, delta: MoveDelta) -> None:
+        self.__undo.append(delta)
+        self.__redo.clear()
+
+    def undo(self: Self) -> MoveDelta | None:
+        if not self.__undo:
+            return None
+        delta = self.__undo.pop()
+        self.__redo.append(delta)
+        return delta
+
+    def redo(self: Self) -> MoveDelta | None:
+        if not self.__redo:
+            return None
+        delta = self.__redo.pop()
+        self.__undo.append(delta)
+        return delta
+
+    # the moves of the game, oldest first (without the undone moves)
+    def get_moves(self: Self) -> List[MoveDelta]:
+        return list(self.__undo)
+
+    def can_undo(self: Self) -> bool:
+        return bool(self.__undo)
+
+    def can_redo(self: Self) -> bool:
+        return bool(self.__redo)
+
+    def __len__(self: Self) -> int:
+        return len(self.__undo)
@@ -0,0 +1,107 @@
+# simulated players for headless games (GameState), used by the parameter sweeps and tests of the rules
+# choose() returns the chain to play or None when no move is possible
+# LookaheadPlayer evaluates the position after every candidate move, with a PositionCache (position_cache.py)
+# the evaluations are kept on disk and reused by other games, sessions and processes
+
+from typing import Self, List, Tuple
+import random
+
+from game_state import GameState
+
+Chain = List[Tuple[int, int]]
+
+class RandomPlayer:
+    def __init__(self: Self, seed: int | None = None):
+        self.random = random.Random(seed)
+
+    # a random pair of equal neighbours
+    def choose(self: Self, state: GameState) -> Chain | None:
+        pairs = Players.get_pairs(state)
+        return list(self.random.choice(pairs)) if pairs else None
+
+class GreedyPlayer:
+    # deterministic, the seed of Players.create isn't used
+    def __init__(self: Self, seed: int | None = None):
+        pass
+
+    # from every pair of equal neighbours the chain is extended as long as possible (1 higher first),
+    # the chain that makes the highest new tile wins, then the longest
+    def choose(self: Self, state: GameState) -> Chain | None:
+        best: Chain | None = None
+        best_key = None
+        for pair in Players.get_pairs(state):
+            chain = Players.extend(state, list(pair))
+            key = (state.rules.merged_number(state.get(x, y) for x, y in chain), len(chain))
+            if best_key is None or key > best_key:
+                best, best_key = chain, key
+        return best
+
+class LookaheadPlayer:
+    MOBILITY = 0.25 # value of a pair of equal neighbours after the move
+    LOOKAHEAD_RNG = 0 # the new tiles of the lookahead don't depend on the game: an evaluation is the same for every game
+
+    # deterministic like GreedyPlayer, the seed isn't used
+    def __init__(self: Self, seed: int | None = None, cache = None):
+        self.cache = cache
+
+    # the candidates are the pairs of equal neighbours and their greedy extensions
+    def choose(self: Self, state: GameState) -> Chain | None:
+        if self.cache is not None and (evaluation := self.cache.get(state)) and evaluation.move:
+            return evaluation.move
+        best: Chain | None = None
+        best_value = None
+        candidates = set()
+        for pair in Players.get_pairs(state):
+            candidates.add(pair)
+            candidates.add(tuple(Players.extend(state, list(pair))))
+        for chain in candidates:
+            after = state.copy(LookaheadPlayer.LOOKAHEAD_RNG)
+            after.apply_chain(list(chain))
+            value = LookaheadPlayer.evaluate(after)
+            if best_value is None or value > best_value:
+                best, best_value = list(chain), value
+        if self.cache is not None and best:
+            from position_cache import Evaluation
+            self.cache.put(state, Evaluation(best_value, 1, best))
+        return best
+
+    @staticmethod
+    def evaluate(state: GameState) -> float:
+        pairs = len(state.tables.get_pairs(state.cells))
+        return state.score.bit_length() + LookaheadPlayer.MOBILITY * pairs if pairs else -1000.0
+
+class Players:
+    NAMES = { 'random': RandomPlayer, 'greedy': GreedyPlayer, 'lookahead': LookaheadPlayer }
+
+    @staticmethod
+    def create(name: str, seed: int | None = None):
+        return Players.NAMES[name](seed)
+
+    # all pairs of equal neighbours, every pair once (the tables of the rules, rules.py)
+    @staticmethod
+    def get_pairs(state: GameState) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        columns = state.columns
+        return [((i % columns, i // columns), (j % columns, j // columns)) for i, j in state.tables.get_pairs(state.cells)]
+
+    # add the neighbour that can follow the last tile, 1 higher first, as long as there is one
+    @staticmethod
+    def extend(state: GameState, chain: Chain) -> Chain:
+        tables, cells, columns = state.tables, state.cells, state.columns
+        used = { y * columns + x for x, y in chain }
+        last = chain[-1][1] * columns + chain[-1][0]
+        while True:
+            same = higher = None
+            n = cells[last]
+            for i in tables.neighbours[last]:
+                if i in used or not tables.can_follow(n, cells[i], len(chain)):
+                    continue
+                if cells[i] > n:
+                    if higher is None:
+                        higher = i
+                elif same is None:
+                    same = i
+            if higher is None and same is None:
+                return chain
+            last = higher if higher is not None else same
+            used.add(last)
+            chain.append((last % columns, last // columns))
@@ -0,0 +1,129 @@
+# evaluated positions on disk (sqlite), shared by sessions and processes, for search players and hints
+# - the key is a hash of the exact board with the tile range and the variant of the rules (rules.py). a board and its
+#   mirror image (left-right) have different keys: the refill draws the new tiles column by column in a fixed order,
+#   so the new tiles of a mirrored position aren't the mirror image and neither is its value
+# - the number of positions is bounded: when there are more than max_entries, the least recently used are removed
+# - writes are batched in transactions (commit_every), the database is in wal mode so other processes can read meanwhile
+# - get_metrics(): lookups, hit rate and lookup latency
+#   python position_cache.py PATH      shows the number of positions and the size of the database
+
+from dataclasses import dataclass
+from typing import Self, List, Tuple
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+from game_state import GameState, Rules, DEFAULT_RULES
+
+@dataclass
+class Evaluation:
+    value: float
+    depth: int = 0
+    move: List[Tuple[int, int]] | None = None # best chain
+
+class PositionCache:
+    KEY_VERSION = 2 # keys of version 1 were shared by a board and its mirror image, they aren't found anymore
+    MAX_ENTRIES = 1_000_000
+    COMMIT_EVERY = 1000
+    EVICT_FRACTION = 0.1 # of max_entries, removed at once
+
+    def __init__(self: Self, path: str, max_entries: int = MAX_ENTRIES, commit_every: int = COMMIT_EVERY):
+        self.path = path
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.__db = sqlite3.connect(path, timeout = 30)
+        self.__db.execute("PRAGMA journal_mode = WAL")
+        self.__db.execute("PRAGMA synchronous = NORMAL")
+        self.__db.execute("CREATE TABLE IF NOT EXISTS positions (key INTEGER PRIMARY KEY, value REAL, depth INTEGER, move BLOB, used INTEGER)")
+        self.__db.execute("CREATE INDEX IF NOT EXISTS positions_used ON positions (used)")
+        self.__db.commit()
+        # recently used: a counter that continues after the highest in the database
+        self.__clock = self.__db.execute("SELECT COALESCE(MAX(used), 0) FROM positions").fetchone()[0]
+        self.__count = self.__db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        self.__pending = 0 # writes since the last commit
+        self.__used = {} # key: clock of the hits since the last commit
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_ns = 0
+        self.max_lookup_ns = 0
+
+    @staticmethod
+    def get_key(cells: bytes, columns: int, rows: int, low: int, high: int, rules: Rules = DEFAULT_RULES) -> int:
+        variant = b'' if rules.has_default_moves() else f"{rules.neighbours} {rules.chain} {rules.rounding}".encode()
+        if rules.spawn != DEFAULT_RULES.spawn: # other new tiles: another value of the position
+            variant += f" spawn {rules.spawn}".encode()
+        digest = hashlib.blake2b(bytes([PositionCache.KEY_VERSION, columns, rows, low, high]) + bytes(cells) + variant, digest_size = 8).digest()
+        return int.from_bytes(digest, 'little', signed = True)
+
+    def get(self: Self, state: GameState) -> Evaluation | None:
+        start = time.perf_counter_ns()
+        key = PositionCache.get_key(state.cells, state.columns, state.rows, state.low, state.high, state.rules)
+        row = self.__db.execute("SELECT value, depth, move FROM positions WHERE key = ?", (key,)).fetchone()
+        self.lookups += 1
+        evaluation = None
+        if row:
+            self.hits += 1
+            self.__clock += 1
+            self.__used[key] = self.__clock
+            value, depth, move = row
+            move = [(move[i], move[i + 1]) for i in range(0, len(move), 2)] if move else None
+            evaluation = Evaluation(value, depth, move)
+        ns = time.perf_counter_ns() - start
+        self.lookup_ns += ns
+        self.max_lookup_ns = max(self.max_lookup_ns, ns)
+        return evaluation
+
+    # a deeper evaluation replaces a stored one, a less deep one doesn't
+    def put(self: Self, state: GameState, evaluation: Evaluation) -> None:
+        key = PositionCache.get_key(state.cells, state.columns, state.rows, state.low, state.high, state.rules)
+        move = evaluation.move
+        blob = bytes(n for x, y in move for n in (x, y)) if move else None
+        self.__clock += 1
+        cursor = self.__db.execute("INSERT INTO positions VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE "
+                                   "SET value = excluded.value, depth = excluded.depth, move = excluded.move, used = excluded.used "
+                                   "WHERE excluded.depth >= positions.depth",
+                                   (key, evaluation.value, evaluation.depth, blob, self.__clock))
+        if cursor.rowcount:
+            self.__count += 1 # updates are counted too, evict() counts exactly
+        self.__pending += 1
+        if self.__pending >= self.commit_every:
+            self.commit()
+
+    def commit(self: Self) -> None:
+        if self.__used:
+            self.__db.executemany("UPDATE positions SET used = ? WHERE key = ?", [(used, key) for key, used in self.__used.items()])
+            self.__used = {}
+        if self.__count > self.max_entries:
+            self.evict()
+        self.__db.commit()
+        self.__pending = 0
+
+    # remove the least recently used positions, down to (1 - EVICT_FRACTION) * max_entries
+    def evict(self: Self) -> None:
+        self.__count = self.__db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        remove = self.__count - int(self.max_entries * (1 - PositionCache.EVICT_FRACTION))
+        if remove > 0:
+            self.__db.execute("DELETE FROM positions WHERE key IN (SELECT key FROM positions ORDER BY used LIMIT ?)", (remove,))
+            self.__count -= remove
+
+    def __len__(self: Self) -> int:
+        return self.__db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def get_metrics(self: Self):
+        return { 'lookups': self.lookups, 'hits': self.hits, 'hit-rate': self.hits / self.lookups if self.lookups else 0.0,
+                 'mean-lookup-us': self.lookup_ns / self.lookups / 1000 if self.lookups else 0.0,
+                 'max-lookup-us': self.max_lookup_ns / 1000, 'positions': self.__count }
+
+    def close(self: Self) -> None:
+        self.commit()
+        self.__db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python position_cache.py PATH")
+        sys.exit(1)
+    cache = PositionCache(sys.argv[1])
+    print(f"{len(cache):n} positions, {os.path.getsize(sys.argv[1]):n} bytes")
+    cache.close()
@@ -0,0 +1,196 @@
+# profiling hooks: per-subsystem timers and a per-session cProfile or sampling report
+# the timers cost one flag check when profiling is disabled, so the hot functions can stay decorated
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Self, Dict, Callable
+from collections import Counter
+import functools
+import inspect
+import io
+import os
+import sys
+import threading
+import time
+
+from config import Config
+
+@dataclass
+class TimerStats:
+    count: int = 0
+    total: float = 0.0 # seconds
+    max: float = 0.0
+
+    def add(self: Self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+class Profiler:
+    enabled: bool = False
+    timers: Dict[str, TimerStats] = {}
+
+    @staticmethod
+    def add(name: str, seconds: float) -> None:
+        if (stats := Profiler.timers.get(name)) is None:
+            stats = Profiler.timers[name] = TimerStats()
+        stats.add(seconds)
+
+    # decorator: @Profiler.timed("Grid.refill"), for coroutines the time includes the awaited animation waits
+    @staticmethod
+    def timed(name: str) -> Callable:
+        def decorator(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not Profiler.enabled:
+                        return await func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        Profiler.add(name, time.perf_counter() - start)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not Profiler.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    Profiler.add(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def reset() -> None:
+        Profiler.timers = {}
+
+    @staticmethod
+    def timers_report() -> str:
+        lines = [f"{'timer':<32}{'count':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+        for name, s in sorted(Profiler.timers.items(), key = lambda item: item[1].total, reverse = True):
+            lines.append(f"{name:<32}{s.count:>8}{s.total * 1000:>12.1f}{s.total * 1000 / s.count:>10.3f}{s.max * 1000:>10.2f}")
+        return "\n".join(lines)
+
+# statistical profiler: a thread that looks at the stack of the profiled thread at a fixed interval
+# less overhead than cProfile on the many small calls of the drawing code, so closer to real timing
+class SamplingProfiler:
+    INTERVAL_S = 0.005
+
+    def __init__(self: Self, thread_id: int | None = None):
+        self.thread_id: int = thread_id if thread_id is not None else threading.get_ident()
+        self.own: Counter = Counter() # samples where the function itself was running
+        self.inclusive: Counter = Counter() # samples where the function was on the stack
+        self.samples: int = 0
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    def start(self: Self) -> None:
+        self.__thread = threading.Thread(target = self.__run, name = "sampling-profiler", daemon = True)
+        self.__thread.start()
+
+    def stop(self: Self) -> None:
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+
+    def __run(self: Self) -> None:
+        while not self.__stop.wait(SamplingProfiler.INTERVAL_S):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[self.__key(frame)] += 1
+            seen = set()
+            while frame:
+                key = self.__key(frame)
+                if key not in seen:
+                    seen.add(key)
+                    self.inclusive[key] += 1
+                frame = frame.f_back
+
+    @staticmethod
+    def __key(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+    def report(self: Self, limit: int = 40) -> str:
+        lines = [f"{self.samples} samples every {SamplingProfiler.INTERVAL_S * 1000:.0f} ms",
+                 f"{'own %':>8}{'incl %':>8}  function"]
+        total = max(1, self.samples)
+        for key, n in self.inclusive.most_common(limit):
+            lines.append(f"{100 * self.own[key] / total:>8.1f}{100 * n / total:>8.1f}  {key}")
+        return "\n".join(lines)
+
+# time from the start of the program (import of this module) to the first frame on screen, reported once
+class StartupTimer:
+    START = time.perf_counter()
+    exit_after_first_frame: bool = False # used by the startup benchmark
+    first_frame_ms: float | None = None
+
+    @staticmethod
+    def first_frame(what: str) -> None:
+        if StartupTimer.first_frame_ms is not None:
+            return
+        StartupTimer.first_frame_ms = (time.perf_counter() - StartupTimer.START) * 1000
+        print(f"First interactive frame ({what}) after {StartupTimer.first_frame_ms:.0f} ms")
+        if StartupTimer.exit_after_first_frame:
+            raise SystemExit(0)
+
+# a profiling session of the whole program, started from the command line (--profile)
+class ProfileSession:
+    MODES = ("cprofile", "sample")
+
+    def __init__(self: Self, mode: str, path: str | None = None):
+        self.mode = mode
+        self.path = path if path else ProfileSession.get_default_filename()
+        self.__profiler = None
+        self.__start = 0.0
+
+    @staticmethod
+    def get_default_filename() -> str:
+        Config.make_user_datapath()
+        return os.path.join(Config.get_user_datapath(), f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+
+    def start(self: Self) -> None:
+        Profiler.reset()
+        Profiler.enabled = True
+        self.__start = time.perf_counter()
+        if self.mode == "cprofile":
+            import cProfile # only needed when profiling
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+        else:
+            self.__profiler = SamplingProfiler()
+            self.__profiler.start()
+
+    def stop(self: Self) -> None:
+        duration = time.perf_counter() - self.__start
+        if self.mode == "cprofile":
+            self.__profiler.disable()
+        else:
+            self.__profiler.stop()
+        Profiler.enabled = False
+        self.__write(duration)
+
+    def __write(self: Self, duration: float) -> None:
+        if self.mode == "cprofile":
+            import pstats
+            stream = io.StringIO()
+            pstats.Stats(self.__profiler, stream = stream).sort_stats("cumulative").print_stats(40)
+            details = stream.getvalue()
+        else:
+            details = self.__profiler.report()
+        try:
+            with open(self.path, 'w') as f:
+                f.write(f"ConnectLog2 profile, {self.mode}, {datetime.now():%Y-%m-%d %H:%M:%S}, session {duration:.1f} s\n\n")
+                f.write(Profiler.timers_report())
+                f.write("\n\n")
+                f.write(details)
+            print(f"Profile written to {self.path}")
+        except Exception as e:
+            print(e)
@@ -0,0 +1,153 @@
+# headless rendering of replays (replay.py) to png sequences, animated gifs and thumbnails, without a window
+#   python render_replays.py --out renders                         all replays of the user, a thumbnail per game
+#   python render_replays.py games/*.json --format png --every 5   a png per 5 moves, in a directory per game
+#   python render_replays.py game.json --format gif --from 100 --to 160 --fps 6 --scale 0.5
+# gif needs Pillow (pip install pillow), png and thumbnail only pygame
+# the frames are drawn with Board and StatusPane like the game, on a surface of the size of the game window
+# the tile images are rendered once into an atlas (Tiles.save_atlas), the workers load it instead of rendering every tile
+# the replays are spread over a process pool, 1 replay per task
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Self, List, Tuple
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from board import Board
+from replay import Replay
+from statuspane import StatusPane
+from tiles import Tiles
+
+class ReplayRenderer:
+    SCREEN_SIZE = (420, 640) # the game window
+
+    def __init__(self: Self, replay: Replay, scale: float = 1.0):
+        self.replay = replay
+        self.scale = scale
+        self.surface = pygame.Surface(ReplayRenderer.SCREEN_SIZE)
+        self.board: Board = Board(self.surface)
+        self.board.set_number_rows(replay.rows)
+        self.board.set_number_columns(replay.columns)
+        height = self.board.get_height()
+        self.status = StatusPane((0, height), (self.surface.get_width(), self.surface.get_height() - height))
+        self.__cells = bytearray(replay.columns * replay.rows) # on the board
+        self.__move = -1
+
+    # the frame after the given number of moves, consecutive moves only apply their delta
+    def render(self: Self, move: int) -> pygame.Surface:
+        if move == self.__move + 1 and move > 0:
+            cells = bytearray(self.__cells)
+            delta = self.replay.moves[move - 1]
+            Replay.apply(cells, delta.indices, delta.after)
+        else:
+            cells = self.replay.get_cells(move)
+        self.__move = move
+        Replay.set_board(self.board, self.__cells, cells, self.replay.columns)
+        self.board.set_marked_tiles(self.replay.get_chain(move))
+        self.status.set_message(f"move {move} of {len(self.replay)}")
+        self.status.set_score(sum(2 ** n for n in self.__cells if n))
+        self.status.set_highest_tile(max(self.__cells, default = 0))
+        self.surface.fill("black")
+        self.board.draw()
+        self.status.draw(self.surface)
+        if self.scale == 1.0:
+            return self.surface
+        size = (round(self.surface.get_width() * self.scale), round(self.surface.get_height() * self.scale))
+        return pygame.transform.smoothscale(self.surface, size)
+
+def _init_worker(atlas_path: str) -> None:
+    pygame.display.init()
+    pygame.font.init()
+    Tiles.load_atlas(atlas_path)
+
+# 1 replay, returns (path, frames, error)
+def _render(path: str, out: str, format: str, first: int, last: int | None, every: int, fps: int, scale: float) -> Tuple[str, int, str | None]:
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        replay = Replay.read(path)
+        renderer = ReplayRenderer(replay, scale)
+        if format == 'thumbnail':
+            pygame.image.save(renderer.render(len(replay)), os.path.join(out, name + '.png'))
+            return path, 1, None
+        moves = list(range(max(0, first), min(len(replay), len(replay) if last is None else last) + 1, max(1, every)))
+        if format == 'png':
+            os.makedirs(os.path.join(out, name), exist_ok = True)
+            for move in moves:
+                pygame.image.save(renderer.render(move), os.path.join(out, name, f'frame-{move:06d}.png'))
+        else:
+            from PIL import Image
+            frames = []
+            for move in moves:
+                frame = renderer.render(move)
+                frames.append(Image.frombytes('RGB', frame.get_size(), pygame.image.tobytes(frame, 'RGB')))
+            if frames:
+                frames[0].save(os.path.join(out, name + '.gif'), save_all = True, append_images = frames[1:],
+                               duration = round(1000 / fps), loop = 0)
+        return path, len(moves), None
+    except Exception as e:
+        return path, 0, f"{type(e).__name__}: {e}"
+
+def get_replay_files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths or [Replay.get_path()]:
+        files += sorted(glob.glob(os.path.join(path, '*.json'))) if os.path.isdir(path) else [path]
+    return files
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = "render ConnectLog2 replays to images without a window")
+    parser.add_argument("replays", nargs = "*", help = "replay files or directories (default: the replays of the user)")
+    parser.add_argument("--out", default = "renders", help = "output directory (default: renders)")
+    parser.add_argument("--format", choices = ['thumbnail', 'png', 'gif'], default = 'thumbnail',
+                        help = "thumbnail: the final board, png: a png per frame, gif: an animated gif (needs Pillow)")
+    parser.add_argument("--from", dest = "first", type = int, default = 0, help = "first move (default 0: the start)")
+    parser.add_argument("--to", dest = "last", type = int, help = "last move (default: the end)")
+    parser.add_argument("--every", type = int, default = 1, help = "a frame per this many moves")
+    parser.add_argument("--fps", type = int, default = 4, help = "frames per second of a gif")
+    parser.add_argument("--scale", type = float, help = "size of the images (default 1, thumbnails 0.5)")
+    parser.add_argument("--workers", type = int, help = "processes (default: number of cpus)")
+    args = parser.parse_args(argv)
+
+    if args.format == 'gif':
+        try:
+            import PIL
+        except ImportError:
+            print("gif needs Pillow: pip install pillow")
+            return 1
+    files = get_replay_files(args.replays)
+    if not files:
+        print("No replays found")
+        return 1
+    scale = args.scale or (0.5 if args.format == 'thumbnail' else 1.0)
+    os.makedirs(args.out, exist_ok = True)
+
+    start = time.perf_counter()
+    pygame.display.init()
+    pygame.font.init()
+    errors = 0
+    frames = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        atlas_path = os.path.join(tmp, 'atlas.png')
+        Tiles.save_atlas(atlas_path)
+        with ProcessPoolExecutor(max_workers = args.workers, initializer = _init_worker, initargs = (atlas_path,)) as pool:
+            futures = [pool.submit(_render, f, args.out, args.format, args.first, args.last, args.every, args.fps, scale) for f in files]
+            for future in futures:
+                path, n, error = future.result()
+                frames += n
+                if error:
+                    errors += 1
+                    print(f"{path}: {error}")
+    pygame.quit()
+    seconds = time.perf_counter() - start
+    print(f"{len(files) - errors} of {len(files)} replays, {frames} frames in {seconds:.1f} s ({frames / seconds:.0f} frames/s) to {args.out}")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# replays of finished games and the screen to watch them
+# a replay is the board at the start and the moves as deltas (move_history.py): the changed cells with the new tiles
+# of the refill, so nothing is played again and the random generator isn't needed
+# every KEYFRAME_MOVES moves the whole board is kept (when loaded, not in the file): going to any move
+# takes a keyframe and at most KEYFRAME_MOVES - 1 deltas, also move 5,000 of a long game
+# the replays are in the user datapath (replays/<time>.json), only the last MAX_FILES are kept
+# viewer: <space> play/pause, <left>/<right> step, <page up>/<page down> 10 moves, <home>/<end>,
+#         <+>/<-> speed, click or drag on the bar to go to a move, <esc> back
+
+from datetime import datetime
+from typing import Self, List
+import glob
+import json
+import os
+import time
+
+import pygame
+
+from board import Board
+from config import Config
+from fonts import Fonts
+from frame_clock import FrameClock
+from game_state import TileRange
+from move_history import MoveDelta
+from tiles import TilePos
+
+class Replay:
+    KEYFRAME_MOVES = 64
+    MAX_FILES = 100
+
+    def __init__(self: Self, columns: int, rows: int, start: bytes, start_range: TileRange, moves: List[MoveDelta],
+                 keyframe_moves: int = KEYFRAME_MOVES):
+        self.columns = columns
+        self.rows = rows
+        self.start_range = start_range
+        self.moves = moves
+        self.keyframe_moves = keyframe_moves
+        # the cells after 0, K, 2K, ... moves
+        self.keyframes: List[bytes] = []
+        cells = bytearray(start)
+        for i in range(len(moves) + 1):
+            if i % keyframe_moves == 0:
+                self.keyframes.append(bytes(cells))
+            if i < len(moves):
+                Replay.apply(cells, moves[i].indices, moves[i].after)
+
+    def __len__(self: Self) -> int:
+        return len(self.moves)
+
+    @staticmethod
+    def apply(cells: bytearray, indices: bytes, numbers: bytes) -> None:
+        for i, number in zip(indices, numbers):
+            cells[i] = number
+
+    # the cells after the given number of moves
+    def get_cells(self: Self, move: int) -> bytearray:
+        keyframe = move // self.keyframe_moves
+        cells = bytearray(self.keyframes[keyframe])
+        for delta in self.moves[keyframe * self.keyframe_moves:move]:
+            Replay.apply(cells, delta.indices, delta.after)
+        return cells
+
+    # put the cells on the board, only the cells that differ from shown (the cells on the board, updated)
+    @staticmethod
+    def set_board(board: Board, shown: bytearray, cells: bytes, columns: int) -> None:
+        for i, number in enumerate(cells):
+            if number != shown[i]:
+                pos = TilePos(i % columns, i // columns)
+                if number:
+                    board.set_tile(pos, number)
+                else:
+                    board.remove_tile(pos)
+                shown[i] = number
+
+    # the connected tiles of the move after the given number of moves
+    def get_chain(self: Self, move: int) -> List[TilePos]:
+        chain = self.moves[move].chain if move < len(self.moves) else b''
+        return [TilePos(i % self.columns, i // self.columns) for i in chain]
+
+    def get_tile_range(self: Self, move: int) -> TileRange:
+        return self.moves[move - 1].range_after if move else self.start_range
+
+    # the replay of a game from its final cells and moves: the start is found by undoing the moves
+    @staticmethod
+    def record(columns: int, rows: int, cells: bytes, moves: List[MoveDelta]) -> 'Replay':
+        start = bytearray(cells)
+        for delta in reversed(moves):
+            Replay.apply(start, delta.indices, delta.before)
+        start_range = moves[0].range_before if moves else TileRange()
+        return Replay(columns, rows, bytes(start), start_range, moves)
+
+    # the state of the random generator isn't kept, a replay doesn't draw new tiles
+    def to_json(self: Self):
+        return { 'columns': self.columns, 'rows': self.rows, 'start': list(self.keyframes[0]),
+                 'range': [self.start_range.low, self.start_range.high],
+                 'moves': [[d.indices.hex(), d.before.hex(), d.after.hex(), d.chain.hex(), d.range_after.low, d.range_after.high]
+                           for d in self.moves] }
+
+    @staticmethod
+    def from_json(js) -> 'Replay':
+        tile_range = TileRange(*js['range'])
+        moves = []
+        for indices, before, after, chain, low, high in js['moves']:
+            moves.append(MoveDelta(bytes.fromhex(indices), bytes.fromhex(before), bytes.fromhex(after),
+                                   tile_range, TileRange(low, high), 0, 0, bytes.fromhex(chain)))
+            tile_range = moves[-1].range_after
+        if len(js['start']) != js['columns'] * js['rows']:
+            raise ValueError("number of tiles doesn't match the size")
+        return Replay(js['columns'], js['rows'], bytes(js['start']), TileRange(*js['range']), moves)
+
+    @staticmethod
+    def get_path() -> str:
+        return os.path.join(Config.get_user_datapath(), 'replays')
+
+    # the most recent replay, None when there is none
+    @staticmethod
+    def get_latest() -> str | None:
+        files = sorted(glob.glob(os.path.join(Replay.get_path(), '*.json')))
+        return files[-1] if files else None
+
+    @staticmethod
+    def read(path: str) -> 'Replay':
+        with open(path, 'r') as f:
+            return Replay.from_json(json.load(f))
+
+    # write as a new file, the oldest files above MAX_FILES are removed
+    def save(self: Self) -> None:
+        try:
+            os.makedirs(Replay.get_path(), exist_ok = True)
+            path = os.path.join(Replay.get_path(), datetime.now().strftime('%Y%m%d-%H%M%S-%f') + '.json')
+            with open(path, 'w') as f:
+                json.dump(self.to_json(), f)
+            for old in sorted(glob.glob(os.path.join(Replay.get_path(), '*.json')))[:-Replay.MAX_FILES]:
+                os.remove(old)
+        except Exception as e:
+            print(e)
+
+class ReplayViewer:
+    SPEEDS = [1, 2, 4, 8, 16, 32, 64] # moves per second
+    BAR_HEIGHT = 14
+
+    def __init__(self: Self, screen: pygame.Surface, replay: Replay):
+        self.screen = screen
+        self.replay = replay
+        Board.set_scale()
+        self.board: Board = Board(screen)
+        self.board.set_number_rows(replay.rows)
+        self.board.set_number_columns(replay.columns)
+        self.bar = pygame.Rect(5, self.board.get_height() + 8, screen.get_width() - 10, ReplayViewer.BAR_HEIGHT)
+        self.move = 0
+        self.playing = False
+        self.speed = 2
+        self.__cells = bytearray(replay.columns * replay.rows) # on the board
+        self.__show(replay.get_cells(0))
+
+    # go to the position after the given number of moves
+    def seek(self: Self, move: int) -> None:
+        move = max(0, min(len(self.replay), move))
+        if move == self.move + 1:
+            cells = bytearray(self.__cells)
+            delta = self.replay.moves[self.move]
+            Replay.apply(cells, delta.indices, delta.after)
+        else:
+            cells = self.replay.get_cells(move)
+        self.move = move
+        self.__show(cells)
+
+    # only the changed cells get a new tile, the tiles of the next move are marked
+    def __show(self: Self, cells: bytearray) -> None:
+        Replay.set_board(self.board, self.__cells, cells, self.replay.columns)
+        self.board.set_marked_tiles(self.replay.get_chain(self.move))
+
+    def __seek_to_x(self: Self, x: int) -> None:
+        self.playing = False
+        self.seek(round((x - self.bar.left) * len(self.replay) / self.bar.width))
+
+    # return whether the user wants to quit
+    async def display(self: Self) -> bool:
+        clock = FrameClock()
+        last = time.perf_counter()
+        due = 0.0 # moves to make while playing
+        scrubbing = False
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return True
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_ESCAPE, pygame.K_q):
+                        return False
+                    elif event.key == pygame.K_SPACE:
+                        if self.move == len(self.replay):
+                            self.seek(0)
+                        self.playing = not self.playing
+                        due = 0.0
+                    elif event.key in (pygame.K_RIGHT, pygame.K_LEFT, pygame.K_PAGEUP, pygame.K_PAGEDOWN, pygame.K_HOME, pygame.K_END):
+                        self.playing = False
+                        steps = { pygame.K_RIGHT: 1, pygame.K_LEFT: -1, pygame.K_PAGEDOWN: 10, pygame.K_PAGEUP: -10,
+                                  pygame.K_HOME: -len(self.replay), pygame.K_END: len(self.replay) }
+                        self.seek(self.move + steps[event.key])
+                    elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                        self.speed = min(len(ReplayViewer.SPEEDS) - 1, self.speed + 1)
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        self.speed = max(0, self.speed - 1)
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == pygame.BUTTON_LEFT and self.bar.collidepoint(event.pos):
+                    scrubbing = True
+                    self.__seek_to_x(event.pos[0])
+                elif event.type == pygame.MOUSEMOTION and scrubbing:
+                    self.__seek_to_x(event.pos[0])
+                elif event.type == pygame.MOUSEBUTTONUP:
+                    scrubbing = False
+            now = time.perf_counter()
+            if self.playing:
+                due += (now - last) * ReplayViewer.SPEEDS[self.speed]
+                if due >= 1:
+                    steps = int(due)
+                    due -= steps
+                    self.seek(self.move + steps)
+                    self.playing = self.move < len(self.replay)
+            last = now
+            self.__draw()
+            await clock.tick(30)
+
+    def __draw(self: Self) -> None:
+        self.screen.fill("paleturquoise")
+        self.board.draw()
+        total = len(self.replay)
+        pygame.draw.rect(self.screen, "grey", self.bar)
+        done = self.bar.width * self.move // max(1, total)
+        pygame.draw.rect(self.screen, "darkblue", (self.bar.left, self.bar.top, done, self.bar.height))
+        score = sum(2 ** n for n in self.__cells if n)
+        highest = max(self.__cells, default = 0)
+        top = self.bar.bottom + 4
+        state = "playing" if self.playing else "paused"
+        top = self.__text(f"Move {self.move:n} of {total:n}, {state} ({ReplayViewer.SPEEDS[self.speed]}/s)", 26, "darkblue", top)
+        top = self.__text(f"Score: {score:n}, highest tile: 2^{highest}", 26, "thistle4", top + 2)
+        self.__text("space play, arrows step, +/- speed, esc back", 22, "grey30", top + 4)
+        pygame.display.flip()
+
+    # returns the bottom of the text
+    def __text(self: Self, text: str, size: int, color: str, top: int) -> int:
+        rendered: pygame.Surface = Fonts.get(size).render(text, True, color)
+        rect: pygame.Rect = rendered.get_rect()
+        rect.top = top
+        rect.left = 5
+        self.screen.blit(rendered, rect)
+        return rect.bottom
@@ -0,0 +1,210 @@
+# reinforcement learning environments (gym style reset/step) on the rules of GameState, needs numpy
+# - the observation is a numpy view (rows, columns) of uint8 tile numbers onto the cells of the game,
+#   it isn't copied: the same array shows the board after every step and reset
+# - an action is a chain [(x, y), ...] like the bot api, or an int for a chain of 2 tiles:
+#   (y * columns + x) * 8 + direction, see DIRECTIONS
+# - action_mask() tells which of these 2 tile actions are legal, chain_mask(chain) which tiles can extend a chain
+#   (the rules of marking tiles in Gameplay)
+# - rules: the variant (rules.py), the masks come from its tables, with 4 neighbours the diagonal actions are never legal
+# - the reward is the increase of the score
+# VectorEnv steps many games per call, in this process or in worker processes that share the boards in shared memory
+
+from multiprocessing import shared_memory
+from typing import Self, Dict, List, Tuple
+import multiprocessing
+
+import numpy as np
+
+from game_state import GameState
+from rules import Rules, DEFAULT_RULES, RuleTables
+
+Action = int | List[Tuple[int, int]]
+
+class ConnectLog2Env:
+    DIRECTIONS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+    # per tables of the rules: the neighbour index per cell and direction, whether it is a neighbour and the follow table
+    __masks: Dict[RuleTables, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def __init__(self: Self, columns: int = GameState.COLUMNS, rows: int = GameState.ROWS, seed: int | None = None,
+                 rules: Rules = DEFAULT_RULES):
+        self.state = GameState(columns, rows, seed, rules = rules)
+        self.obs: np.ndarray = np.frombuffer(self.state.cells, dtype = np.uint8).reshape(rows, columns)
+        self.n_actions = rows * columns * len(ConnectLog2Env.DIRECTIONS)
+
+    def reset(self: Self, seed: int | None = None):
+        self.state.reset(seed)
+        return self.obs, { 'score': self.state.score }
+
+    def step(self: Self, action: Action):
+        reward, terminated, error = ConnectLog2Env.apply(self.state, action)
+        info = { 'score': self.state.score, 'moves': self.state.moves }
+        if error:
+            info['error'] = error
+        return self.obs, reward, terminated, False, info
+
+    # an invalid action doesn't change the game and gets no reward
+    @staticmethod
+    def apply(state: GameState, action: Action) -> Tuple[int, bool, str | None]:
+        score = state.score
+        try:
+            state.apply_chain(ConnectLog2Env.to_chain(action, state.columns) if isinstance(action, (int, np.integer)) else action)
+            error = None
+        except (ValueError, TypeError) as e:
+            error = str(e)
+        return state.score - score, not state.has_moves(), error
+
+    @staticmethod
+    def to_chain(action: int, columns: int) -> List[Tuple[int, int]]:
+        cell, direction = divmod(int(action), len(ConnectLog2Env.DIRECTIONS))
+        x, y = cell % columns, cell // columns
+        dx, dy = ConnectLog2Env.DIRECTIONS[direction]
+        return [(x, y), (x + dx, y + dy)]
+
+    def action_mask(self: Self) -> np.ndarray:
+        return ConnectLog2Env.get_action_mask(self.obs, self.state.rules).reshape(-1)
+
+    @staticmethod
+    def __get_masks(tables: RuleTables) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if (masks := ConnectLog2Env.__masks.get(tables)) is None:
+            columns, rows = tables.columns, tables.rows
+            targets = np.zeros((columns * rows, len(ConnectLog2Env.DIRECTIONS)), dtype = np.intp)
+            valid = np.zeros(targets.shape, dtype = bool)
+            for i in range(columns * rows):
+                x, y = i % columns, i // columns
+                for d, (dx, dy) in enumerate(ConnectLog2Env.DIRECTIONS):
+                    j = (y + dy) * columns + x + dx
+                    if 0 <= x + dx < columns and 0 <= y + dy < rows and tables.is_neighbour(i, j):
+                        targets[i, d], valid[i, d] = j, True
+            size = RuleTables.MAX_NUMBER
+            follow = np.frombuffer(tables.get_follow_table(1), dtype = np.uint8).reshape(size, size).astype(bool)
+            masks = ConnectLog2Env.__masks[tables] = (targets, valid, follow)
+        return masks
+
+    # legal 2 tile actions for boards (..., rows, columns): (..., rows, columns, 8),
+    # the neighbour in the direction can be the second tile of a chain (the tables of the rules)
+    @staticmethod
+    def get_action_mask(cells: np.ndarray, rules: Rules = DEFAULT_RULES) -> np.ndarray:
+        rows, columns = cells.shape[-2:]
+        targets, valid, follow = ConnectLog2Env.__get_masks(rules.get_tables(columns, rows))
+        flat = cells.reshape(cells.shape[:-2] + (rows * columns,))
+        mask = follow[flat[..., :, None], flat[..., targets]] & valid
+        return mask.reshape(cells.shape + (len(ConnectLog2Env.DIRECTIONS),))
+
+    # the tiles (rows, columns) that can be added to the chain, for an empty chain the tiles that can start one
+    def chain_mask(self: Self, chain: List[Tuple[int, int]]) -> np.ndarray:
+        if not chain:
+            return ConnectLog2Env.get_action_mask(self.obs, self.state.rules).any(axis = -1)
+        tables, cells, columns = self.state.tables, self.state.cells, self.state.columns
+        mask = np.zeros(self.obs.shape, dtype = bool)
+        used = { y * columns + x for x, y in chain }
+        last = chain[-1][1] * columns + chain[-1][0]
+        for i in tables.neighbours[last]:
+            if i not in used and tables.can_follow(cells[last], cells[i], len(chain)):
+                mask[i // columns, i % columns] = True
+        return mask
+
+# steps all games, a finished game is reset right away (its last score in info['final-score'])
+class VectorEnv:
+    def __init__(self: Self, num_envs: int, columns: int = GameState.COLUMNS, rows: int = GameState.ROWS,
+                 seed: int | None = None, workers: int = 0, rules: Rules = DEFAULT_RULES):
+        self.num_envs = num_envs
+        self.columns = columns
+        self.rows = rows
+        self.rules = rules
+        self.n_actions = rows * columns * len(ConnectLog2Env.DIRECTIONS)
+        size = columns * rows
+        seeds = [None if seed is None else seed + i for i in range(num_envs)]
+        self.__shm: shared_memory.SharedMemory | None = None
+        self.__workers = []
+        if workers:
+            self.__shm = shared_memory.SharedMemory(create = True, size = num_envs * size)
+            buffer = self.__shm.buf
+            # every worker has a contiguous part of the games
+            bounds = [num_envs * w // workers for w in range(workers + 1)]
+            for w in range(workers):
+                connection, worker_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(target = _worker, daemon = True,
+                                                  args = (worker_connection, self.__shm.name, bounds[w], bounds[w + 1], columns, rows, seeds, rules))
+                process.start()
+                self.__workers.append((process, connection, bounds[w], bounds[w + 1]))
+            self.__states: List[GameState] = []
+            for _, connection, _, _ in self.__workers:
+                connection.recv() # started
+        else:
+            buffer = bytearray(num_envs * size)
+            cells = memoryview(buffer)
+            self.__states = [GameState(columns, rows, seeds[i], cells = cells[i * size:(i + 1) * size], rules = rules) for i in range(num_envs)]
+        self.obs: np.ndarray = np.ndarray((num_envs, rows, columns), dtype = np.uint8, buffer = buffer)
+
+    def reset(self: Self, seed: int | None = None):
+        seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        if self.__workers:
+            for _, connection, start, stop in self.__workers:
+                connection.send(('reset', seeds[start:stop]))
+            scores = np.concatenate([connection.recv() for _, connection, _, _ in self.__workers])
+        else:
+            scores = _reset(self.__states, seeds)
+        return self.obs, { 'score': scores }
+
+    def step(self: Self, actions: List[Action]):
+        if self.__workers:
+            for _, connection, start, stop in self.__workers:
+                connection.send(('step', actions[start:stop]))
+            results = [connection.recv() for _, connection, _, _ in self.__workers]
+            rewards, terminated, scores, final_scores = (np.concatenate([r[i] for r in results]) for i in range(4))
+        else:
+            rewards, terminated, scores, final_scores = _step(self.__states, actions)
+        return self.obs, rewards, terminated, np.zeros(self.num_envs, dtype = bool), { 'score': scores, 'final-score': final_scores }
+
+    def action_masks(self: Self) -> np.ndarray:
+        return ConnectLog2Env.get_action_mask(self.obs, self.rules).reshape(self.num_envs, -1)
+
+    def close(self: Self) -> None:
+        for process, connection, _, _ in self.__workers:
+            connection.send(('close', None))
+            process.join()
+        self.__workers = []
+        self.__states = []
+        if self.__shm:
+            self.obs = None # the view must be gone before the shared memory can be closed
+            self.__shm.close()
+            self.__shm.unlink()
+            self.__shm = None
+
+def _step(states: List[GameState], actions: List[Action]):
+    n = len(states)
+    rewards = np.zeros(n, dtype = np.float64)
+    terminated = np.zeros(n, dtype = bool)
+    scores = np.zeros(n, dtype = np.float64)
+    final_scores = np.zeros(n, dtype = np.float64)
+    for i, (state, action) in enumerate(zip(states, actions)):
+        rewards[i], terminated[i], _ = ConnectLog2Env.apply(state, action)
+        if terminated[i]:
+            final_scores[i] = state.score
+            state.reset()
+        scores[i] = state.score
+    return rewards, terminated, scores, final_scores
+
+def _reset(states: List[GameState], seeds: List[int | None]) -> np.ndarray:
+    for state, seed in zip(states, seeds):
+        state.reset(seed)
+    return np.array([state.score for state in states], dtype = np.float64)
+
+# the games start to stop of a VectorEnv in a worker process, the cells in the shared memory
+def _worker(connection, shm_name: str, start: int, stop: int, columns: int, rows: int, seeds, rules: Rules) -> None:
+    shm = shared_memory.SharedMemory(name = shm_name)
+    size = columns * rows
+    cells = memoryview(shm.buf)
+    states = [GameState(columns, rows, seeds[i], cells = cells[i * size:(i + 1) * size], rules = rules) for i in range(start, stop)]
+    connection.send(True)
+    while True:
+        command, argument = connection.recv()
+        if command == 'step':
+            connection.send(_step(states, argument))
+        elif command == 'reset':
+            connection.send(_reset(states, argument))
+        else:
+            break
+    del states
+    cells.release()
+    shm.close()
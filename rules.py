@@ -0,0 +1,143 @@
+# the rules of a game variant, and their tables compiled once per board size
+# - the tile range: which new tiles come, it grows with the highest tile
+# - neighbours: 8 (also diagonal, the game) or 4
+# - chain: 'same-or-higher' (the first 2 tiles equal, then the same or 1 higher, the game) or 'same' (all equal)
+# - rounding: the merged tile is the sum rounded 'up' (the game) or 'down' to a power of 2
+# - spawn: the policy of the new tiles, 'uniform' (the game), 'weighted' or 'guarantee' (see spawn.py)
+# the tables (RuleTables.get) are per cell index (row by row): the neighbours, the pairs of neighbours and for every
+# previous and next number whether the next can follow in a chain. GameState, Grid, Gameplay and the players use them,
+# so a variant is as fast as the default rules
+
+from dataclasses import dataclass
+from typing import Self, Dict, Iterable, List, Tuple
+
+# range of numbers from which the new tile number can be chosen
+@dataclass
+class TileRange:
+    low: int = 0
+    high: int = 0
+
+# the numbers that make the game easier or harder and the move rules, the defaults are those of the game on screen
+@dataclass(frozen = True)
+class Rules:
+    NEIGHBOURS = (8, 4)
+    CHAINS = ('same-or-higher', 'same')
+    ROUNDINGS = ('up', 'down')
+    SPAWNS = ('uniform', 'weighted', 'guarantee')
+
+    range_size: int = 8 # number of different new tile numbers
+    # the lowest new tile number grows with the highest tile: max(1, (highest - range_offset) // range_divisor)
+    range_offset: int = 8
+    range_divisor: int = 2
+    neighbours: int = 8
+    chain: str = 'same-or-higher'
+    rounding: str = 'up'
+    spawn: str = 'uniform'
+
+    def __post_init__(self: Self):
+        if self.neighbours not in Rules.NEIGHBOURS or self.chain not in Rules.CHAINS or self.rounding not in Rules.ROUNDINGS or self.spawn not in Rules.SPAWNS:
+            raise ValueError(f"invalid rules {self}")
+
+    def get_tile_range(self: Self, low: int) -> TileRange:
+        return TileRange(low, low + self.range_size)
+
+    def get_tile_range_for_highest(self: Self, highest: int) -> TileRange:
+        return self.get_tile_range(max(1, (highest - self.range_offset) // self.range_divisor))
+
+    # the number of the tile that replaces the connected tiles
+    def merged_number(self: Self, numbers: Iterable[int]) -> int:
+        total = sum(2 ** n for n in numbers)
+        return (total - 1).bit_length() if self.rounding == 'up' else total.bit_length() - 1
+
+    # whether the rules of the moves are those of the game (the tile range doesn't change the moves)
+    def has_default_moves(self: Self) -> bool:
+        return (self.neighbours, self.chain, self.rounding) == (Rules.NEIGHBOURS[0], Rules.CHAINS[0], Rules.ROUNDINGS[0])
+
+    def get_tables(self: Self, columns: int, rows: int) -> 'RuleTables':
+        return RuleTables.get(self, columns, rows)
+
+DEFAULT_RULES = Rules()
+
+class RuleTables:
+    MAX_NUMBER = 256 # numbers are bytes
+    __tables: Dict[Tuple[int, int, int, str], 'RuleTables'] = {}
+
+    # the tables don't depend on the tile range: variants with another range share them
+    @staticmethod
+    def get(rules: Rules, columns: int, rows: int) -> 'RuleTables':
+        key = (columns, rows, rules.neighbours, rules.chain)
+        if (tables := RuleTables.__tables.get(key)) is None:
+            tables = RuleTables.__tables[key] = RuleTables(rules, columns, rows)
+        return tables
+
+    def __init__(self: Self, rules: Rules, columns: int, rows: int):
+        self.columns = columns
+        self.rows = rows
+        # the order of the neighbours and of the pairs is that of the players before the tables: the same games
+        steps = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0) and (rules.neighbours == 8 or dx == 0 or dy == 0)]
+        self.neighbours: List[Tuple[int, ...]] = []
+        for i in range(columns * rows):
+            x, y = i % columns, i // columns
+            self.neighbours.append(tuple((y + dy) * columns + x + dx for dx, dy in steps if 0 <= x + dx < columns and 0 <= y + dy < rows))
+        self.__neighbour_sets = [frozenset(n) for n in self.neighbours]
+        # every pair of neighbours once
+        forward = [(dx, dy) for dx, dy in ((1, 0), (-1, 1), (0, 1), (1, 1)) if (dx, dy) in steps]
+        pairs = [(y * columns + x, (y + dy) * columns + x + dx) for y in range(rows) for x in range(columns)
+                 for dx, dy in forward if 0 <= x + dx < columns and y + dy < rows]
+        self.pairs: List[Tuple[int, int]] = pairs
+        self.__first = [i for i, _ in pairs]
+        self.__second = [j for _, j in pairs]
+        # [previous * MAX_NUMBER + next]: 1 when next can follow previous, the second tile of a chain and the tiles after it
+        size = RuleTables.MAX_NUMBER
+        self.__follow_second = bytes(int(n == p) for p in range(size) for n in range(size))
+        higher = rules.chain == 'same-or-higher'
+        self.__follow_later = bytes(int(n == p or (higher and n == p + 1)) for p in range(size) for n in range(size))
+
+    def is_neighbour(self: Self, i: int, j: int) -> bool:
+        return j in self.__neighbour_sets[i]
+
+    # the table of can_follow for a position, [previous * MAX_NUMBER + number]: 1 when number can follow
+    def get_follow_table(self: Self, position: int) -> bytes:
+        return self.__follow_later if position > 1 else self.__follow_second
+
+    # whether number can follow previous, as tile at position (0: the first) of a chain
+    def can_follow(self: Self, previous: int, number: int, position: int) -> bool:
+        return (self.__follow_later if position > 1 else self.__follow_second)[previous * RuleTables.MAX_NUMBER + number] == 1
+
+    # a chain can start at cell i: a neighbour has the same number, 0: an empty cell
+    def can_start(self: Self, cells, i: int) -> bool:
+        n = cells[i]
+        return n != 0 and any(cells[j] == n for j in self.neighbours[i])
+
+    # the number of neighbours of cell i with the same number, 0 for an empty cell
+    def count_pairs_at(self: Self, cells, i: int) -> int:
+        n = cells[i]
+        return sum(cells[j] == n for j in self.neighbours[i]) if n else 0
+
+    # a move is possible: 2 neighbours have the same number
+    def has_moves(self: Self, cells) -> bool:
+        get = cells.__getitem__
+        return any(a == b and a for a, b in zip(map(get, self.__first), map(get, self.__second)))
+
+    # all pairs of neighbours with the same number, as indices
+    def get_pairs(self: Self, cells) -> List[Tuple[int, int]]:
+        return [(i, j) for i, j in self.pairs if cells[i] == cells[j] and cells[i]]
+
+    # None: a valid chain of (x, y), else the reason
+    def check_chain(self: Self, cells, chain: List[Tuple[int, int]]) -> str | None:
+        if len(chain) < 2:
+            return "a chain needs at least 2 tiles"
+        if len(set(chain)) != len(chain):
+            return "a tile can only be used once"
+        for position, (x, y) in enumerate(chain):
+            if not (0 <= x < self.columns and 0 <= y < self.rows):
+                return f"({x}, {y}) is not on the board"
+            if position == 0:
+                continue
+            px, py = chain[position - 1]
+            i, previous = y * self.columns + x, py * self.columns + px
+            if not self.is_neighbour(previous, i):
+                return f"({x}, {y}) is not a neighbour of ({px}, {py})"
+            if not self.can_follow(cells[previous], cells[i], position):
+                return f"({x}, {y}) can't be connected to ({px}, {py})"
+        return None
@@ -0,0 +1,271 @@
+# named save slots for unfinished games, in the user datapath:
+#   saves/index.json       per slot: score, highest tile, moves, time and a thumbnail (the tile numbers)
+#   saves/<file>.json      the board of the slot (Grid.to_json) and the number of moves
+# the intro and the load screen only read the index, the board of a slot is read when the slot is opened
+# a saved game of an older version (grid.json) becomes the slot "Saved game"
+# a new slot is called "Game" (numbered), the load screen renames it (<F2>)
+
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Self, Dict, List
+import json
+import os
+import re
+
+import pygame
+
+from config import Config
+from fonts import Fonts
+from frame_clock import FrameClock
+from grid import Grid
+from tiles import Tiles
+
+@dataclass
+class SlotInfo:
+    name: str
+    file: str
+    score: int = 0
+    highest_tile: int = 0
+    moves: int = 0
+    datetime: str = ""
+    columns: int = Grid.NBR_COLUMNS
+    thumbnail: str = "" # hex of the tile numbers, row by row
+
+class SaveSlots:
+    def __init__(self: Self):
+        self.__slots: Dict[str, SlotInfo] | None = None # the index, read when needed
+
+    @staticmethod
+    def get_path() -> str:
+        return os.path.join(Config.get_user_datapath(), 'saves')
+
+    def __get_index(self: Self) -> Dict[str, SlotInfo]:
+        if self.__slots is None:
+            self.__slots = {}
+            try:
+                with open(os.path.join(SaveSlots.get_path(), 'index.json'), 'r') as f:
+                    self.__slots = { js['name']: SlotInfo(**js) for js in json.load(f) }
+            except (KeyError, ValueError, TypeError) as e:
+                print(e)
+            except FileNotFoundError:
+                pass # no saved games
+            self.__import_old_save()
+        return self.__slots
+
+    def __write_index(self: Self) -> None:
+        try:
+            path = os.path.join(SaveSlots.get_path(), 'index.json')
+            with open(path + '.tmp', 'w') as f:
+                json.dump([asdict(info) for info in self.__slots.values()], f)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            print(e)
+
+    # grid.json of the single save of older versions
+    def __import_old_save(self: Self) -> None:
+        if not Grid.is_file_present():
+            return
+        try:
+            with open(os.path.join(Config.get_user_datapath(), 'grid.json'), 'r') as f:
+                numbers = json.load(f)['tile-numbers']
+            os.makedirs(SaveSlots.get_path(), exist_ok = True)
+            name = self.__new_name("Saved game")
+            info = SlotInfo(name, SaveSlots.__get_file(name), sum(2 ** n for n in numbers if n), max(numbers, default = 0), 0,
+                            datetime.now().isoformat(timespec = 'seconds'), Grid.NBR_COLUMNS, bytes(numbers).hex())
+            os.replace(os.path.join(Config.get_user_datapath(), 'grid.json'), os.path.join(SaveSlots.get_path(), info.file))
+            self.__slots[name] = info
+            self.__write_index()
+        except Exception as e:
+            print(e)
+
+    @staticmethod
+    def __get_file(name: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_-]', '_', name) + f'-{datetime.now():%Y%m%d%H%M%S%f}.json'
+
+    def __new_name(self: Self, base: str) -> str:
+        if base not in self.__slots:
+            return base
+        n = 2
+        while f"{base} {n}" in self.__slots:
+            n += 1
+        return f"{base} {n}"
+
+    # the slots, the most recent first
+    def get_slots(self: Self) -> List[SlotInfo]:
+        return sorted(self.__get_index().values(), key = lambda info: info.datetime, reverse = True)
+
+    def has_slots(self: Self) -> bool:
+        return bool(self.__get_index())
+
+    def get_latest(self: Self) -> str | None:
+        slots = self.get_slots()
+        return slots[0].name if slots else None
+
+    # save in the slot, a new slot for name None, returns the name of the slot
+    def write(self: Self, name: str | None, grid: Grid, moves: int) -> str:
+        slots = self.__get_index()
+        if name is None or name not in slots:
+            name = self.__new_name(name or "Game")
+            info = SlotInfo(name, SaveSlots.__get_file(name))
+        else:
+            info = slots[name]
+        numbers = [t.number if t else 0 for t in grid]
+        info.score = sum(2 ** n for n in numbers if n)
+        info.highest_tile = grid.get_highest_number()
+        info.moves = moves
+        info.datetime = datetime.now().isoformat(timespec = 'seconds')
+        info.columns = grid.NBR_COLUMNS
+        info.thumbnail = bytes(numbers).hex()
+        try:
+            os.makedirs(SaveSlots.get_path(), exist_ok = True)
+            grid.write(os.path.join(SaveSlots.get_path(), info.file), { 'moves': moves })
+            slots[name] = info
+            self.__write_index()
+        except Exception as e:
+            print(e)
+        return name
+
+    # the board of the slot in the grid, returns the number of moves
+    # a slot of which the board can't be read (Grid.read removes a corrupt file) is removed from the index
+    def read(self: Self, name: str, grid: Grid) -> int:
+        if not (info := self.__get_index().get(name)):
+            return 0
+        if (js := grid.read(os.path.join(SaveSlots.get_path(), info.file))) is None:
+            del self.__slots[name]
+            self.__write_index()
+            return 0
+        return js.get('moves', 0)
+
+    # returns the new name of the slot: the old one for an empty name, numbered when another slot has it
+    def rename(self: Self, name: str, new_name: str) -> str:
+        slots = self.__get_index()
+        new_name = new_name.strip()
+        if name not in slots or not new_name or new_name == name:
+            return name
+        info = slots.pop(name)
+        info.name = self.__new_name(new_name)
+        slots[info.name] = info
+        self.__write_index()
+        return info.name
+
+    def remove(self: Self, name: str) -> None:
+        if not (info := self.__get_index().pop(name, None)):
+            return
+        try:
+            os.remove(os.path.join(SaveSlots.get_path(), info.file))
+        except Exception:
+            pass # already removed
+        self.__write_index()
+
+# choose a slot to continue: <up>/<down> and <enter> or a click, <delete> twice removes the slot, <esc> back
+# <F2> renames the selected slot: type the new name, <enter> keeps it, <esc> or an empty name cancels
+# (not R: its key press also sends the text "r", which would start the name)
+class LoadScreen:
+    TOP = 40
+    ROW_HEIGHT = 64
+    THUMBNAIL_CELL = 9
+    MAX_NAME = 24
+
+    def __init__(self: Self, screen: pygame.Surface, slots: SaveSlots):
+        self.screen = screen
+        self.slots = slots
+        self.quit = False
+        self.__selected = 0
+        self.__first = 0 # first shown slot
+        self.__delete = False
+        self.__new_name: str | None = None # the name being typed
+
+    # the name of the chosen slot, None to go back (quit tells whether the window was closed)
+    async def choose(self: Self) -> str | None:
+        clock = FrameClock()
+        while True:
+            slots = self.slots.get_slots()
+            if not slots:
+                return None
+            self.__selected = min(self.__selected, len(slots) - 1)
+            self.__draw(slots)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.quit = True
+                    return None
+                if self.__new_name is not None:
+                    self.__edit_name(event, slots[self.__selected].name)
+                    slots = self.slots.get_slots() # renamed
+                elif event.type == pygame.KEYDOWN:
+                    delete = False
+                    if event.key == pygame.K_ESCAPE:
+                        return None
+                    elif event.key in (pygame.K_RETURN, pygame.K_l):
+                        return slots[self.__selected].name
+                    elif event.key in (pygame.K_DOWN, pygame.K_s):
+                        self.__selected = min(len(slots) - 1, self.__selected + 1)
+                    elif event.key in (pygame.K_UP, pygame.K_w):
+                        self.__selected = max(0, self.__selected - 1)
+                    elif event.key == pygame.K_F2:
+                        self.__new_name = ""
+                    elif event.key == pygame.K_DELETE:
+                        if self.__delete:
+                            self.slots.remove(slots[self.__selected].name)
+                            if not (slots := self.slots.get_slots()):
+                                return None
+                            self.__selected = min(self.__selected, len(slots) - 1)
+                        else:
+                            delete = True
+                    self.__delete = delete
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == pygame.BUTTON_LEFT:
+                    row = (event.pos[1] - LoadScreen.TOP) // LoadScreen.ROW_HEIGHT
+                    if 0 <= row < self.__get_rows() and self.__first + row < len(slots):
+                        return slots[self.__first + row].name
+            await clock.tick(30)
+
+    # the typed characters come as text input, the keys end the editing
+    def __edit_name(self: Self, event: pygame.event.Event, name: str) -> None:
+        if event.type == pygame.TEXTINPUT:
+            self.__new_name = (self.__new_name + event.text)[:LoadScreen.MAX_NAME]
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE:
+                self.__new_name = self.__new_name[:-1]
+            elif event.key == pygame.K_RETURN:
+                self.slots.rename(name, self.__new_name)
+                self.__new_name = None
+            elif event.key == pygame.K_ESCAPE:
+                self.__new_name = None
+
+    def __get_rows(self: Self) -> int:
+        return (self.screen.get_height() - LoadScreen.TOP - 40) // LoadScreen.ROW_HEIGHT
+
+    def __draw(self: Self, slots: List[SlotInfo]) -> None:
+        rows = self.__get_rows()
+        # keep the selected slot on screen
+        self.__first = min(max(self.__first, self.__selected - rows + 1), self.__selected)
+        self.screen.fill("paleturquoise")
+        self.__text("Saved games:", 30, "darkblue", 5, 8)
+        for row, info in enumerate(slots[self.__first:self.__first + rows]):
+            top = LoadScreen.TOP + row * LoadScreen.ROW_HEIGHT
+            if self.__first + row == self.__selected:
+                pygame.draw.rect(self.screen, "white", (0, top, self.screen.get_width(), LoadScreen.ROW_HEIGHT - 4))
+            self.__thumbnail(info, 5, top + 2)
+            editing = self.__new_name is not None and self.__first + row == self.__selected
+            self.__text(self.__new_name + "_" if editing else info.name, 26, "red" if editing else "darkblue", 70, top + 4)
+            self.__text(f"score {info.score:n}, tile 2^{info.highest_tile}, {info.moves} moves", 20, "thistle4", 70, top + 24)
+            self.__text(info.datetime.replace('T', ' '), 20, "grey40", 70, top + 40)
+        if self.__new_name is not None:
+            message = "Type the new name, <Enter> keeps it, <Esc> cancels"
+        elif self.__delete:
+            message = "<Delete> again to remove the game"
+        else:
+            message = "<Enter> or click to continue, <F2> rename, <Esc> back"
+        self.__text(message, 22, "red" if self.__delete else "grey40", 5, self.screen.get_height() - 30)
+        pygame.display.flip()
+
+    # the tile numbers as small squares in the colors of the tiles
+    def __thumbnail(self: Self, info: SlotInfo, left: int, top: int) -> None:
+        size = LoadScreen.THUMBNAIL_CELL
+        for i, number in enumerate(bytes.fromhex(info.thumbnail)):
+            if number:
+                x, y = i % info.columns, i // info.columns
+                pygame.draw.rect(self.screen, Tiles.get_color(number), (left + x * (size + 1), top + y * (size + 1), size, size))
+
+    def __text(self: Self, text: str, size: int, color: str, left: int, top: int) -> None:
+        rendered: pygame.Surface = Fonts.get(size).render(text, True, color)
+        self.screen.blit(rendered, (left, top))
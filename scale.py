@@ -0,0 +1,75 @@
+# the scale of the window contents: the layout is made for a window of 420x640, a larger (resizable) window or a
+# HiDPI display draws the tiles, the board, the status and the intro at a larger scale
+# the assets are rendered at the scale itself (Tiles.set_scale, Board.set_scale, Fonts.get_scaled), not scaled when they
+# are drawn: the tile images are rendered again only when the scale changed
+# dragging the border of the window sends many resize events, the new scale is applied when the resizing stopped (WindowResize)
+# the other screens (hiscore, statistics, load, replay bar) keep the layout of scale 1
+
+from typing import Self, Tuple
+import math
+import os
+import time
+
+import pygame
+
+class Scale:
+    BASE_WIDTH = 420
+    BASE_HEIGHT = 640
+    MIN_FACTOR = 0.5
+    factor: float = 1.0
+
+    # a length of the layout at scale 1 in pixels at the current scale
+    @staticmethod
+    def px(length: float) -> int:
+        return round(length * Scale.factor)
+
+    # the largest scale at which the layout fits in a window of this size
+    @staticmethod
+    def fit(size: Tuple[int, int]) -> float:
+        return max(Scale.MIN_FACTOR, min(size[0] / Scale.BASE_WIDTH, size[1] / Scale.BASE_HEIGHT))
+
+    @staticmethod
+    def get_window_size() -> Tuple[int, int]:
+        return (Scale.px(Scale.BASE_WIDTH), Scale.px(Scale.BASE_HEIGHT))
+
+    # before pygame.display.init(): windows shouldn't stretch the window of a HiDPI display, the scale does it sharper
+    @staticmethod
+    def enable_high_dpi() -> None:
+        os.environ.setdefault('SDL_WINDOWS_DPI_AWARENESS', 'permonitorv2')
+
+    # the scale of the display in steps of 0.25: the dpi on windows, else the desktop height (1080 lines: 1),
+    # not larger than what fits on the desktop
+    @staticmethod
+    def get_system_factor() -> float:
+        sizes = pygame.display.get_desktop_sizes()
+        try:
+            import ctypes
+            factor = ctypes.windll.user32.GetDpiForSystem() / 96
+        except (ImportError, AttributeError, OSError):
+            factor = sizes[0][1] / 1080 if sizes else 1.0
+        if sizes:
+            factor = min(factor, 0.9 * sizes[0][1] / Scale.BASE_HEIGHT)
+        return max(1.0, math.floor(factor * 4) / 4)
+
+# debounces the resize events of the window
+class WindowResize:
+    DEBOUNCE_MS = 150
+
+    def __init__(self: Self):
+        self.__size: Tuple[int, int] | None = None
+        self.__time: float = 0.0
+
+    # True: a resize event, it is remembered
+    def check(self: Self, event: pygame.event.Event) -> bool:
+        if event.type != pygame.VIDEORESIZE:
+            return False
+        self.__size = (event.w, event.h)
+        self.__time = time.perf_counter()
+        return True
+
+    # the new size of the window once no resize event came for DEBOUNCE_MS, else None
+    def get_size(self: Self) -> Tuple[int, int] | None:
+        if self.__size is None or (time.perf_counter() - self.__time) * 1000 < WindowResize.DEBOUNCE_MS:
+            return None
+        size, self.__size = self.__size, None
+        return size
@@ -0,0 +1,52 @@
+# settings of the user, in the user datapath (settings.json)
+#   target_fps  frames per second the game keeps to (Ctrl-F in the game switches between TARGET_FPS)
+#   quality     'auto': the frame governor (frame_governor.py) lowers and raises the quality to keep the target,
+#               or a fixed level: minimal, low, medium, full
+
+from dataclasses import dataclass, asdict
+from typing import Self
+import json
+import os
+
+from config import Config
+
+@dataclass
+class Settings:
+    TARGET_FPS = (30, 60, 120)
+    QUALITIES = ('auto', 'minimal', 'low', 'medium', 'full')
+
+    target_fps: int = 60
+    quality: str = 'auto'
+
+    def to_json(self: Self):
+        return asdict(self)
+
+    @staticmethod
+    def from_json(js) -> 'Settings':
+        settings = Settings(int(js['target_fps']), js['quality'])
+        if settings.quality not in Settings.QUALITIES or settings.target_fps <= 0:
+            raise ValueError(f"invalid settings {js}")
+        return settings
+
+    @staticmethod
+    def __get_filename() -> str:
+        Config.make_user_datapath()
+        return os.path.join(Config.get_user_datapath(), 'settings.json')
+
+    @staticmethod
+    def read() -> 'Settings':
+        try:
+            with open(Settings.__get_filename(), 'r') as f:
+                return Settings.from_json(json.load(f))
+        except (KeyError, ValueError, TypeError) as e:
+            print(e)
+        except FileNotFoundError:
+            pass # the defaults
+        return Settings()
+
+    def write(self: Self) -> None:
+        try:
+            with open(Settings.__get_filename(), 'w') as f:
+                json.dump(self.to_json(), f)
+        except Exception as e:
+            print(e)
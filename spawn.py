@@ -0,0 +1,82 @@
+# spawn policies: the numbers of the new tiles in the empty cells of a refill (Grid.refill, GameState.fill)
+# - uniform: every number of the tile range equally likely (the game)
+# - weighted: the lower numbers of the range more likely
+# - guarantee: like uniform, but the board keeps a move: when the new tiles don't make a pair with a neighbour
+#   and the old tiles have none either, they are drawn again (at most MAX_REDRAWS times), then a new tile
+#   gets the number of a neighbour
+# a policy only looks at the neighbours of the new cells (the tables of the rules, rules.py), whether the old tiles
+# have a move is asked from the caller only when needed: Grid keeps a count of the equal pairs, GameState checks its cells
+# the random numbers come from the generator of the caller (randrange), uniform draws them in the same order as before
+
+from typing import Self, Callable, Dict, List
+
+from rules import Rules, RuleTables
+
+RandRange = Callable[[int, int], int]
+
+class SpawnPolicy:
+    # the numbers for the empty cells (indices, in the order of the refill), cells: the old tiles, 0 in the empty cells
+    # old_moves: whether the old tiles have a move, asked only by the policies that need it
+    def choose(self: Self, tables: RuleTables, cells, empty: List[int], low: int, high: int,
+               randrange: RandRange, old_moves: Callable[[], bool]) -> List[int]:
+        return [self.draw(low, high, randrange) for _ in empty]
+
+    def draw(self: Self, low: int, high: int, randrange: RandRange) -> int:
+        return randrange(low, high)
+
+    # a new tile has a neighbour with the same number, old or new
+    @staticmethod
+    def makes_pair(tables: RuleTables, cells, empty: List[int], numbers: List[int]) -> bool:
+        new = dict(zip(empty, numbers))
+        return any(new.get(j, cells[j]) == n for i, n in new.items() for j in tables.neighbours[i])
+
+class UniformSpawn(SpawnPolicy):
+    pass
+
+class WeightedSpawn(SpawnPolicy):
+    # the lowest number of the range has weight range size, the highest 1
+    def draw(self: Self, low: int, high: int, randrange: RandRange) -> int:
+        size = high - low
+        r = randrange(0, size * (size + 1) // 2)
+        for offset in range(size):
+            r -= size - offset
+            if r < 0:
+                return low + offset
+        return high - 1
+
+class GuaranteeSpawn(SpawnPolicy):
+    MAX_REDRAWS = 3
+
+    def choose(self: Self, tables: RuleTables, cells, empty: List[int], low: int, high: int,
+               randrange: RandRange, old_moves: Callable[[], bool]) -> List[int]:
+        numbers = super().choose(tables, cells, empty, low, high, randrange, old_moves)
+        if not empty or SpawnPolicy.makes_pair(tables, cells, empty, numbers) or old_moves():
+            return numbers
+        for _ in range(GuaranteeSpawn.MAX_REDRAWS):
+            numbers = super().choose(tables, cells, empty, low, high, randrange, old_moves)
+            if SpawnPolicy.makes_pair(tables, cells, empty, numbers):
+                return numbers
+        return GuaranteeSpawn.__force_pair(tables, cells, empty, numbers, low, high, randrange)
+
+    # a new tile gets the number of a neighbour: a new one, or an old one in the tile range
+    @staticmethod
+    def __force_pair(tables: RuleTables, cells, empty: List[int], numbers: List[int], low: int, high: int, randrange: RandRange) -> List[int]:
+        new = { i: k for k, i in enumerate(empty) }
+        start = randrange(0, len(empty))
+        for k in range(start, start + len(empty)):
+            i = empty[k % len(empty)]
+            for j in tables.neighbours[i]:
+                if j in new:
+                    numbers[new[i]] = numbers[new[j]]
+                    return numbers
+                if low <= cells[j] < high:
+                    numbers[new[i]] = cells[j]
+                    return numbers
+        return numbers # no neighbour in the range: the game ends
+
+class SpawnPolicies:
+    NAMES: Dict[str, SpawnPolicy] = { 'uniform': UniformSpawn(), 'weighted': WeightedSpawn(), 'guarantee': GuaranteeSpawn() }
+
+    @staticmethod
+    def get(rules: Rules) -> SpawnPolicy:
+        return SpawnPolicies.NAMES[rules.spawn]
@@ -0,0 +1,222 @@
+# lifetime statistics of the user: games played, average and median score, highest tiles, streaks and time played
+# the streaks: days in a row with a game and games in a row with a score above the average of the games before
+# the statistics are running aggregates, updated per finished game without the history of the games:
+# the file and the time to update or show them stay the same after any number of games
+# (statistics_screen, not statistics: that name is taken by the standard library)
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Self, Dict, List
+import json
+import os
+
+import pygame
+
+from config import Config
+from fonts import Fonts
+from frame_clock import FrameClock
+
+# P² algorithm (Jain & Chlamtac): estimate of a quantile with 5 markers, O(1) memory and time per value
+class P2Quantile:
+    def __init__(self: Self, p: float = 0.5):
+        self.p = p
+        self.count = 0
+        self.heights: List[float] = []
+        self.positions: List[int] = [1, 2, 3, 4, 5]
+        self.desired: List[float] = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments: List[float] = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self: Self, x: float) -> None:
+        self.count += 1
+        q = self.heights
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(1, 5) if x < q[i]) - 1
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        # move the middle markers to their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                                                              + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] += d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def get_value(self: Self) -> float:
+        if not self.count:
+            return 0.0
+        if self.count <= 5:
+            # exact for a few values
+            return self.heights[min(self.count - 1, int(self.p * self.count))]
+        return self.heights[2]
+
+    def to_json(self: Self):
+        return { 'p': self.p, 'count': self.count, 'heights': self.heights, 'positions': self.positions, 'desired': self.desired }
+
+    @staticmethod
+    def from_json(js) -> 'P2Quantile':
+        quantile = P2Quantile(js['p'])
+        quantile.count = js['count']
+        quantile.heights = js['heights']
+        quantile.positions = js['positions']
+        quantile.desired = js['desired']
+        return quantile
+
+@dataclass
+class Statistics:
+    games: int = 0
+    total_score: int = 0
+    best_score: int = 0
+    seconds_played: float = 0.0
+    # number of games per highest tile
+    highest_tiles: Dict[int, int] = field(default_factory = dict)
+    # days in a row with at least 1 game
+    last_day: str = ""
+    day_streak: int = 0
+    longest_day_streak: int = 0
+    median: P2Quantile = field(default_factory = P2Quantile)
+    # games in a row with a score above the average of the games before, the first game doesn't count
+    better_streak: int = 0
+    longest_better_streak: int = 0
+
+    def add_game(self: Self, score: int, highest_tile: int, seconds: float, day: date | None = None) -> None:
+        if self.games:
+            self.better_streak = self.better_streak + 1 if score > self.get_average_score() else 0
+            self.longest_better_streak = max(self.longest_better_streak, self.better_streak)
+        self.games += 1
+        self.total_score += score
+        self.best_score = max(self.best_score, score)
+        self.seconds_played += seconds
+        self.highest_tiles[highest_tile] = self.highest_tiles.get(highest_tile, 0) + 1
+        self.median.add(score)
+        day = day or datetime.now().date()
+        if self.last_day != day.isoformat():
+            last = date.fromisoformat(self.last_day) if self.last_day else None
+            self.day_streak = self.day_streak + 1 if last and (day - last).days == 1 else 1
+            self.longest_day_streak = max(self.longest_day_streak, self.day_streak)
+            self.last_day = day.isoformat()
+
+    # time of a game that is saved to continue later
+    def add_time(self: Self, seconds: float) -> None:
+        self.seconds_played += seconds
+
+    def get_average_score(self: Self) -> float:
+        return self.total_score / self.games if self.games else 0.0
+
+    def to_json(self: Self):
+        return { 'games': self.games, 'total-score': self.total_score, 'best-score': self.best_score,
+                 'seconds-played': self.seconds_played, 'highest-tiles': { str(k): v for k, v in self.highest_tiles.items() },
+                 'last-day': self.last_day, 'day-streak': self.day_streak, 'longest-day-streak': self.longest_day_streak,
+                 'median': self.median.to_json(), 'better-streak': self.better_streak, 'longest-better-streak': self.longest_better_streak }
+
+    @staticmethod
+    def from_json(js) -> 'Statistics':
+        return Statistics(js['games'], js['total-score'], js['best-score'], js['seconds-played'],
+                          { int(k): v for k, v in js['highest-tiles'].items() },
+                          js['last-day'], js['day-streak'], js['longest-day-streak'], P2Quantile.from_json(js['median']),
+                          js.get('better-streak', 0), js.get('longest-better-streak', 0)) # not in the files of older versions
+
+class StatisticsScreen:
+    def __init__(self: Self, screen: pygame.Surface):
+        self.screen = screen
+        self.statistics = Statistics()
+        self.__read()
+
+    @staticmethod
+    def __get_filename() -> str:
+        Config.make_user_datapath()
+        return os.path.join(Config.get_user_datapath(), 'statistics.json')
+
+    def __read(self: Self) -> None:
+        p = self.__get_filename()
+        try:
+            with open(p, 'r') as f:
+                self.statistics = Statistics.from_json(json.load(f))
+        except (KeyError, ValueError, TypeError):
+            self.statistics = Statistics()
+            os.remove(p)
+        except FileNotFoundError:
+            pass # first game
+
+    def __write(self: Self) -> None:
+        try:
+            with open(self.__get_filename(), 'w') as f:
+                json.dump(self.statistics.to_json(), f)
+        except Exception as e:
+            print(e)
+
+    def add_game(self: Self, score: int, highest_tile: int, seconds: float) -> None:
+        self.statistics.add_game(score, highest_tile, seconds)
+        self.__write()
+
+    def add_time(self: Self, seconds: float) -> None:
+        self.statistics.add_time(seconds)
+        self.__write()
+
+    # return whether the user wants to quit
+    async def display(self: Self) -> bool:
+        self.__draw()
+        clock = FrameClock()
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return True
+                if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
+                    return False
+            await clock.tick(30)
+
+    def __draw(self: Self) -> None:
+        s = self.statistics
+        self.screen.fill("yellow")
+        top = self.__text("Statistics:", 30, "black", 5)
+        hours, minutes = divmod(int(s.seconds_played) // 60, 60)
+        lines = [f"Games played: {s.games:n}",
+                 f"Time played: {hours}:{minutes:02}",
+                 f"Average score: {round(s.get_average_score()):n}",
+                 f"Median score: {round(s.median.get_value()):n}" + (" (approx.)" if s.median.count > 5 else ""),
+                 f"Best score: {s.best_score:n}",
+                 f"Days in a row: {s.day_streak} (longest {s.longest_day_streak})",
+                 f"Games above average in a row: {s.better_streak} (longest {s.longest_better_streak})"]
+        for line in lines:
+            top = self.__text(line, 24, "darkblue", top + 4)
+        top = self.__text("Highest tile:", 24, "black", top + 12)
+        # a bar per highest tile, the longest bar for the most games
+        most = max(s.highest_tiles.values(), default = 1)
+        font = Fonts.get(22)
+        for tile in sorted(s.highest_tiles):
+            count = s.highest_tiles[tile]
+            top += 4
+            text: pygame.Surface = font.render(f"{tile:2}", True, "blue")
+            self.screen.blit(text, (10, top))
+            pygame.draw.rect(self.screen, "darkblue", (45, top, max(1, 280 * count // most), text.get_height() - 2))
+            text = font.render(f"{count:n}", True, "blue")
+            self.screen.blit(text, (45 + 280 * count // most + 6, top))
+            top += text.get_height()
+        self.__text("Press a key or mouse button to continue...", 26, "grey", top + 16)
+        pygame.display.flip()
+
+    # returns the bottom of the text
+    def __text(self: Self, text: str, size: int, color: str, top: int) -> int:
+        rendered: pygame.Surface = Fonts.get(size).render(text, True, color)
+        rect: pygame.Rect = rendered.get_rect()
+        rect.top = top
+        rect.left = 5
+        self.screen.blit(rendered, rect)
+        return rect.bottom
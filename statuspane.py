@@ -1,10 +1,14 @@
 # place to put extra information (e.g. score)
+# the text is drawn at the scale of the window (scale.py)
 
 from typing import Self, Tuple
 from math import log2
 import locale
 import pygame
 
+from fonts import Fonts
+from scale import Scale
+
 class Status(pygame.sprite.Sprite):
     def __init__(self: Self, pos: Tuple[int, int], size: Tuple[int, int], font_color: str, bg_color: str): 
         super().__init__() 
@@ -24,28 +28,34 @@ class Status(pygame.sprite.Sprite):
         pane = args[0]
         pane.rect.update(kwargs["pos"], pane.rect.size)
 
+    # another place or size, e.g. after the window was resized
+    def set_rect(self: Self, pos: Tuple[int, int], size: Tuple[int, int]) -> None:
+        self.image = pygame.Surface(size)
+        self.rect.update(pos, size)
+        self._draw_sprite()
+
     def _draw_sprite(self: Self) -> None:
         self.image.fill(pygame.Color(self.bg_color))
 
-        font = pygame.font.Font(None, 30)
+        font = Fonts.get_scaled(30)
         text: pygame.Surface = font.render(self.status_text, True, "darkblue")
         text_rect: pygame.Rect = text.get_rect()
-        text_rect.top = 2
-        text_rect.left = 5
+        text_rect.top = Scale.px(2)
+        text_rect.left = Scale.px(5)
         self.image.blit(text, text_rect)
 
         sc : str = f'Score: {self.score:n} (>2^{int(log2(max(1, self.score)))})'
         text = font.render(sc, True, self.font_color)
         text_rect = text.get_rect()
-        text_rect.top  = 35
-        text_rect.left = 5
+        text_rect.top  = Scale.px(35)
+        text_rect.left = Scale.px(5)
         self.image.blit(text, text_rect)
 
         ht : str = f'Highest tile: {2 ** self.highest_tile:n} (=2^{self.highest_tile})'
         text = font.render(ht, True, self.font_color)
         text_rect = text.get_rect()
-        text_rect.top  = 68
-        text_rect.left = 5
+        text_rect.top  = Scale.px(68)
+        text_rect.left = Scale.px(5)
         self.image.blit(text, text_rect)
 
     def set_message(self: Self, text: str) -> None:
@@ -70,6 +80,9 @@ class StatusPane:
     def draw(self: Self, surface: pygame.Surface) -> None:
         self.group.draw(surface)
 
+    def set_rect(self: Self, pos: Tuple[int, int], size: Tuple[int, int]) -> None:
+        self.status.set_rect(pos, size)
+
     def set_message(self: Self, text: str) -> None:
         self.status.set_message(text)
 
@@ -0,0 +1,410 @@
+# stress test of the input handling and the drawing, runs without a window on the SDL dummy video driver
+# streams of pygame events (clicks, double clicks, drags, keys) go through Gameplay.play() and so through
+# MouseEventChecker.check(), without animation delays and without a frame cap. the slowest frames are reported
+# with the events that led up to them
+#   python stress.py                            5000 frames of random events, valid chains (the greedy player) in between
+#   python stress.py --frames 20000 --seed 7    more frames, another game and other events
+#   python stress.py --record events.json       also write the events, to run them again after a change
+#   python stress.py --events events.json       the recorded events, with the seed of the recording
+#   python stress.py --soak 5000                a long session: 5000 moves, a new game when there are no more moves,
+#                                               the memory is sampled with tracemalloc and the rss, exit code 1 when it grows
+#                                               more than --max-growth / --max-rss-growth or a frame allocates more than
+#                                               --max-frame-alloc (the 99th percentile). the new games get random tiles
+# the frame hook of Gameplay posts the events of the next frame, 1 action per frame like a user: a click, a double click,
+# a step of a drag or a key. the hiscore and save files are written in a temporary directory, not in the real data paths
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Self, Deque, List, Tuple
+import argparse
+import asyncio
+import gc
+import heapq
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import tracemalloc
+import traceback
+
+import pygame
+
+from board import Board
+from config import Config
+from game_play import Gameplay
+from game_state import GameState
+from players import GreedyPlayer
+from tiles import Tile
+
+Action = List[pygame.event.Event] # the events of 1 frame
+
+@dataclass
+class Frame:
+    number: int
+    work_ms: float
+    events: Action # handled in this frame
+
+class RandomEvents:
+    # gestures and their weights
+    GESTURES = { 'drag chain': 30, 'click chain': 15, 'key chain': 10, 'click': 10, 'double click': 5,
+                 'drag': 10, 'right click': 3, 'undo redo': 5, 'keys': 12 }
+    KEYS = [pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_w, pygame.K_a, pygame.K_d,
+            pygame.K_SPACE, pygame.K_RETURN, pygame.K_ESCAPE]
+
+    # new_games: <n> when there are no more moves instead of undoing a move
+    def __init__(self: Self, gameplay: Gameplay, seed: int, new_games: bool = False):
+        self.gameplay = gameplay
+        self.new_games = new_games
+        self.random = random.Random(seed)
+        self.player = GreedyPlayer(seed)
+        self.__actions: Deque[Action] = deque()
+
+    def next(self: Self) -> Action | None:
+        if not self.__actions:
+            self.__actions.extend(self.__gesture())
+        return self.__actions.popleft()
+
+    @staticmethod
+    def get_center(x: int, y: int) -> Tuple[int, int]:
+        return (x * (Tile.WIDTH + Board.SEP) + Tile.WIDTH // 2, y * (Tile.HEIGHT + Board.SEP) + Tile.HEIGHT // 2)
+
+    def __random_pos(self: Self) -> Tuple[int, int]:
+        return (self.random.randrange(self.gameplay.board_width), self.random.randrange(self.gameplay.board_height))
+
+    @staticmethod
+    def key(key: int, mod: int = 0) -> pygame.event.Event:
+        return pygame.event.Event(pygame.KEYUP, key = key, mod = mod)
+
+    @staticmethod
+    def button(type: int, pos: Tuple[int, int], button: int = pygame.BUTTON_LEFT) -> pygame.event.Event:
+        return pygame.event.Event(type, pos = pos, button = button)
+
+    @staticmethod
+    def motion(pos: Tuple[int, int]) -> pygame.event.Event:
+        return pygame.event.Event(pygame.MOUSEMOTION, pos = pos, rel = (0, 0), buttons = (1, 0, 0))
+
+    # down and up, the double click timer runs out: a single click
+    def click(self: Self, pos: Tuple[int, int]) -> Action:
+        return [RandomEvents.button(pygame.MOUSEBUTTONDOWN, pos), RandomEvents.button(pygame.MOUSEBUTTONUP, pos),
+                self.gameplay.mouse_checker.double_click_timer]
+
+    @staticmethod
+    def double_click(pos: Tuple[int, int]) -> Action:
+        return [RandomEvents.button(pygame.MOUSEBUTTONDOWN, pos), RandomEvents.button(pygame.MOUSEBUTTONUP, pos)] * 2
+
+    # down, the single click timer runs out: the start of a drag, then a step per frame
+    def drag(self: Self, points: List[Tuple[int, int]]) -> List[Action]:
+        actions = [[RandomEvents.button(pygame.MOUSEBUTTONDOWN, points[0]), self.gameplay.mouse_checker.single_click_timer]]
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            actions.append([RandomEvents.motion(((x1 + x2) // 2, (y1 + y2) // 2)), RandomEvents.motion((x2, y2))])
+        actions.append([RandomEvents.button(pygame.MOUSEBUTTONUP, points[-1])])
+        return actions
+
+    # the end of a chain: <Enter> or a double click on the last tile
+    def __make_move(self: Self, last: Tuple[int, int]) -> Action:
+        return [RandomEvents.key(pygame.K_RETURN)] if self.random.random() < 0.5 else RandomEvents.double_click(last)
+
+    def __gesture(self: Self) -> List[Action]:
+        gameplay = self.gameplay
+        if gameplay.no_moves:
+            return [[RandomEvents.key(pygame.K_n if self.new_games else pygame.K_z, 0 if self.new_games else pygame.KMOD_CTRL)]]
+        gesture = self.random.choices(list(RandomEvents.GESTURES), list(RandomEvents.GESTURES.values()))[0]
+        chain = None
+        if gesture.endswith('chain'):
+            state = GameState.from_cells(gameplay.grid.NBR_COLUMNS, gameplay.grid.NBR_ROWS, gameplay.get_tile_numbers())
+            if not (chain := self.player.choose(state)):
+                gesture = 'keys'
+        if gesture == 'drag chain':
+            points = [RandomEvents.get_center(x, y) for x, y in chain]
+            return self.drag(points) + [self.__make_move(points[-1])]
+        if gesture == 'click chain':
+            points = [RandomEvents.get_center(x, y) for x, y in chain]
+            return [self.click(p) for p in points[:-1]] + [self.__make_move(points[-1])]
+        if gesture == 'key chain':
+            actions = [[RandomEvents.key(pygame.K_ESCAPE)]]
+            x, y = gameplay.active_tile_pos.x, gameplay.active_tile_pos.y
+            for cx, cy in chain:
+                keys = [pygame.K_RIGHT if cx > x else pygame.K_LEFT] * abs(cx - x) + [pygame.K_DOWN if cy > y else pygame.K_UP] * abs(cy - y)
+                actions += [[RandomEvents.key(k)] for k in keys] + [[RandomEvents.key(pygame.K_SPACE)]]
+                x, y = cx, cy
+            return actions + [[RandomEvents.key(pygame.K_RETURN)]]
+        if gesture == 'click':
+            return [self.click(self.__random_pos())]
+        if gesture == 'double click':
+            return [RandomEvents.double_click(self.__random_pos())]
+        if gesture == 'drag':
+            return self.drag([self.__random_pos() for _ in range(self.random.randrange(2, 8))])
+        if gesture == 'right click':
+            pos = self.__random_pos()
+            return [[RandomEvents.button(pygame.MOUSEBUTTONDOWN, pos, pygame.BUTTON_RIGHT),
+                     RandomEvents.button(pygame.MOUSEBUTTONUP, pos, pygame.BUTTON_RIGHT)]]
+        if gesture == 'undo redo':
+            return [[RandomEvents.key(self.random.choice([pygame.K_z, pygame.K_z, pygame.K_y]), pygame.KMOD_CTRL)]]
+        return [[RandomEvents.key(self.random.choice(RandomEvents.KEYS))] for _ in range(self.random.randrange(1, 6))]
+
+class RecordedEvents:
+    def __init__(self: Self, frames: List[Action]):
+        self.__frames: Deque[Action] = deque(frames)
+
+    def next(self: Self) -> Action | None:
+        return self.__frames.popleft() if self.__frames else None
+
+    @staticmethod
+    def to_json(frames: List[Action]):
+        return [[{ 'type': event.type, **event.dict } for event in action] for action in frames]
+
+    @staticmethod
+    def from_json(js) -> List[Action]:
+        return [[pygame.event.Event(e.pop('type'), { k: tuple(v) if isinstance(v, list) else v for k, v in e.items() }) for e in action]
+                for action in js]
+
+@dataclass
+class MemorySample:
+    frame: int
+    moves: int
+    traced: int     # bytes allocated by the game (tracemalloc), without the harness
+    rss: int | None # bytes, None: unknown on this platform
+
+# tracemalloc and the rss every sample_frames frames after warmup_frames, and the allocations of every frame
+class MemoryTracker:
+    def __init__(self: Self, sample_frames: int, warmup_frames: int):
+        self.sample_frames = sample_frames
+        self.warmup_frames = warmup_frames
+        self.samples: List[MemorySample] = []
+        self.frame_allocs = array('q') # bytes: the peak of a frame above its start
+        self.__baseline: tracemalloc.Snapshot | None = None
+        self.__last: tracemalloc.Snapshot | None = None
+        self.__frame_start = 0
+        tracemalloc.start()
+
+    @staticmethod
+    def get_rss() -> int | None:
+        try:
+            with open('/proc/self/statm', 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            return None # not linux
+
+    # the allocations of the harness itself are left out
+    @staticmethod
+    def __take_snapshot() -> tracemalloc.Snapshot:
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, os.path.abspath(__file__)),
+                                                          tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    # after the work of the harness in the frame hook: the allocations of the next frame start here
+    def start_frame(self: Self) -> None:
+        tracemalloc.reset_peak()
+        self.__frame_start = tracemalloc.get_traced_memory()[0]
+
+    # counted False: a frame that does more than a user action (the first frame, a new game)
+    def add_frame(self: Self, number: int, moves: int, counted: bool) -> None:
+        if counted:
+            self.frame_allocs.append(tracemalloc.get_traced_memory()[1] - self.__frame_start)
+        if number == self.warmup_frames or (number > self.warmup_frames and number % self.sample_frames == 0):
+            self.sample(number, moves)
+
+    def sample(self: Self, number: int, moves: int) -> None:
+        snapshot = MemoryTracker.__take_snapshot()
+        if self.__baseline is None:
+            self.__baseline = snapshot
+        self.__last = snapshot
+        self.samples.append(MemorySample(number, moves, sum(s.size for s in snapshot.statistics('filename')), MemoryTracker.get_rss()))
+
+    @staticmethod
+    def __get_name(filename: str) -> str:
+        here = os.path.dirname(os.path.abspath(__file__))
+        return os.path.relpath(filename, here) if filename.startswith(here) else os.path.join(*filename.split(os.sep)[-2:])
+
+    # returns the number of failed checks
+    def report(self: Self, max_growth: int, max_rss_growth: int, max_frame_alloc: int) -> int:
+        if len(self.samples) < 2:
+            print("\nnot enough frames for the memory: more moves or a shorter --warmup")
+            return 0
+        print(f"\n{'frame':>8}{'moves':>8}{'traced KB':>12}{'rss KB':>10}")
+        for s in self.samples:
+            print(f"{s.frame:>8}{s.moves:>8}{s.traced / 1024:>12.0f}{(s.rss or 0) / 1024:>10.0f}")
+        first, last = self.samples[0], self.samples[-1]
+        growth = last.traced - first.traced
+        rss_growth = last.rss - first.rss if first.rss is not None and last.rss is not None else 0
+        moves = max(1, last.moves - first.moves)
+        print(f"growth after the warmup: traced {growth / 1024:+.1f} KB ({growth / moves:+.1f} bytes per move), rss {rss_growth / 1024:+.0f} KB")
+        print("growth per subsystem (file):")
+        for stat in self.__last.compare_to(self.__baseline, 'filename')[:10]:
+            if stat.size_diff:
+                print(f"  {MemoryTracker.__get_name(stat.traceback[0].filename):<40}{stat.size_diff / 1024:>+10.1f} KB{stat.count_diff:>+8} blocks")
+        allocs = sorted(self.frame_allocs)
+        p99 = allocs[min(len(allocs) - 1, len(allocs) * 99 // 100)] if allocs else 0
+        if allocs:
+            print(f"allocated per frame: median {statistics.median(allocs) / 1024:.1f} KB, p99 {p99 / 1024:.1f} KB, max {allocs[-1] / 1024:.1f} KB")
+        failed = 0
+        for name, value, limit in [("traced growth", growth, max_growth), ("rss growth", rss_growth, max_rss_growth),
+                                   ("allocated per frame (p99)", p99, max_frame_alloc)]:
+            if value > limit:
+                print(f"FAIL: {name} {value / 1024:.1f} KB over {limit / 1024:.0f} KB")
+                failed += 1
+        return failed
+
+class StressTest:
+    CONTEXT = 3 # frames of events shown with a slow frame
+
+    # max_frames None: until the source has no more events, max_moves: stop after this many moves
+    def __init__(self: Self, gameplay: Gameplay, source, max_frames: int | None, max_moves: int | None = None,
+                 slowest: int = 10, record: bool = False, memory: MemoryTracker | None = None):
+        self.gameplay = gameplay
+        self.source = source
+        self.max_frames = max_frames
+        self.max_moves = max_moves
+        self.memory = memory
+        self.times = array('d') # work per frame in ms
+        self.max_slowest = slowest
+        self.slowest: List[Tuple[float, int, List[Frame]]] = [] # heap: the slowest frames, with the frames before
+        self.recent: Deque[Frame] = deque(maxlen = StressTest.CONTEXT)
+        self.posted: List[Action] | None = [] if record else None # all the actions, for --record
+        self.pending: Action = [] # posted after the previous frame, handled in the current one
+        self.__stop: int = 0 # the steps of quitting: quit, then 's' to save
+        gameplay.set_frame_hook(self.__frame_hook)
+
+    def get_moves(self: Self) -> int:
+        return self.gameplay.frame_stats.get_count("make_move")
+
+    @staticmethod
+    def __is_new_game(action: Action) -> bool:
+        return any(event.type == pygame.KEYUP and event.key == pygame.K_n and not event.mod for event in action)
+
+    def __frame_hook(self: Self, work_ms: float) -> None:
+        frame = Frame(len(self.times), work_ms, self.pending)
+        self.times.append(work_ms)
+        self.recent.append(frame)
+        if self.max_slowest and (len(self.slowest) < self.max_slowest or work_ms > self.slowest[0][0]):
+            item = (work_ms, frame.number, list(self.recent))
+            if len(self.slowest) < self.max_slowest:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heapreplace(self.slowest, item)
+        moves = self.get_moves()
+        if self.memory:
+            self.memory.add_frame(frame.number, moves, frame.number > 0 and not StressTest.__is_new_game(frame.events))
+        action = None
+        if not self.__stop and (self.max_frames is None or len(self.times) < self.max_frames) and (self.max_moves is None or moves < self.max_moves):
+            action = self.source.next()
+            if action is not None and self.posted is not None:
+                self.posted.append(action)
+        if action is None:
+            if self.memory and self.__stop == 0:
+                self.memory.sample(frame.number, moves)
+            # quit and save, the game isn't finished: no hiscore to wait for
+            action = [pygame.event.Event(pygame.QUIT)] if self.__stop == 0 else [RandomEvents.key(pygame.K_s)]
+            self.__stop += 1
+        if StressTest.__is_new_game(action):
+            # the game is finished: a key ends the hiscore screen later on (when the score is a hiscore, else it's ignored)
+            asyncio.get_running_loop().call_later(0.1, pygame.event.post, pygame.event.Event(pygame.KEYDOWN, key = pygame.K_SPACE, mod = 0))
+        for event in action:
+            pygame.event.post(event)
+        self.pending = action
+        if self.memory:
+            self.memory.start_frame()
+
+    @staticmethod
+    def describe(event: pygame.event.Event) -> str:
+        if event.type == pygame.KEYUP:
+            return ("ctrl-" if event.mod & pygame.KMOD_CTRL else "") + pygame.key.name(event.key)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            return f"{'down' if event.button == pygame.BUTTON_LEFT else 'button ' + str(event.button)} {event.pos}"
+        if event.type == pygame.MOUSEBUTTONUP:
+            return "up"
+        if event.type == pygame.MOUSEMOTION:
+            return f"move {event.pos}"
+        return pygame.event.event_name(event.type).lower()
+
+    @staticmethod
+    def print_frames(frames: List[Frame]) -> None:
+        for f in frames:
+            events = ", ".join(StressTest.describe(e) for e in f.events) or "-"
+            print(f"    {f.number:>6} {f.work_ms:8.2f} ms  {events}")
+
+    def report(self: Self, budget_ms: float) -> None:
+        times = sorted(self.times)
+        if not times:
+            return
+        def percentile(p: int) -> float:
+            return times[min(len(times) - 1, len(times) * p // 100)]
+        print(f"{len(times)} frames, {self.get_moves()} moves, work per frame: median {statistics.median(times):.2f} ms, p95 {percentile(95):.2f}, "
+              f"p99 {percentile(99):.2f}, max {times[-1]:.2f}, {sum(ms > budget_ms for ms in times)} over {budget_ms:.1f} ms")
+        for name, js in self.gameplay.frame_stats.to_json().items():
+            print(f"  {name:<14}{js['count']:>8} x  mean {js['mean_ms']:>7.3f} ms  max {js['max_ms']:>8.3f} ms")
+        if self.slowest:
+            print(f"\nslowest frames, with the events of the frames before (the drawing of a frame shows the events of the frame before):")
+        for work_ms, number, frames in sorted(self.slowest, reverse = True):
+            print(f"frame {number:>6}  {work_ms:8.2f} ms")
+            StressTest.print_frames(frames)
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = "ConnectLog2 stress test with event streams (SDL dummy video driver)")
+    parser.add_argument("--frames", type = int, default = 5000, help = "frames of random events (default 5000)")
+    parser.add_argument("--seed", type = int, default = 1, help = "seed of the game and of the events (default 1)")
+    parser.add_argument("--events", metavar = "PATH", help = "the recorded events of --record instead of random events")
+    parser.add_argument("--record", metavar = "PATH", help = "write the events as json")
+    parser.add_argument("--slowest", type = int, default = 10, help = "slowest frames to show (default 10)")
+    parser.add_argument("--budget", type = float, default = 1000 / 60, help = "ms per frame to count as slow (default 60 fps)")
+    parser.add_argument("--soak", type = int, metavar = "MOVES", help = "play this many moves (new games included) and track the memory")
+    parser.add_argument("--sample", type = int, default = 1000, help = "soak: frames between the memory samples (default 1000)")
+    parser.add_argument("--warmup", type = int, default = 1000, help = "soak: frames before the first memory sample (default 1000)")
+    parser.add_argument("--max-growth", type = int, default = 1024, help = "soak: KB the game may allocate more after the warmup (default 1024)")
+    parser.add_argument("--max-rss-growth", type = int, default = 8192, help = "soak: KB the rss may grow after the warmup (default 8192)")
+    parser.add_argument("--max-frame-alloc", type = int, default = 256, help = "soak: KB a frame may allocate (99th percentile, default 256)")
+    args = parser.parse_args(argv)
+
+    seed, frames = args.seed, None
+    if args.events:
+        with open(args.events, 'r') as f:
+            js = json.load(f)
+        seed, frames = js['seed'], RecordedEvents.from_json(js['frames'])
+
+    data_dir = tempfile.mkdtemp(prefix = "connectlog2-stress-")
+    Config.DATAPATH = os.path.join(data_dir, 'data')
+    Config.USER_DATAPATH = os.path.join(data_dir, 'user')
+    pygame.init()
+    loop = asyncio.new_event_loop()
+    result = 0
+    try:
+        gameplay = Gameplay(pygame.display.set_mode((420, 640)))
+        gameplay.set_animation_delay(0)
+        gameplay.set_frame_target(0, 'full')
+        gameplay.grid.rng = seed
+        source = RecordedEvents(frames) if frames is not None else RandomEvents(gameplay, seed, new_games = bool(args.soak))
+        memory = MemoryTracker(args.sample, args.warmup) if args.soak else None
+        max_frames = None if frames is not None or args.soak else args.frames
+        test = StressTest(gameplay, source, max_frames, args.soak, args.slowest, bool(args.record), memory)
+        try:
+            loop.run_until_complete(gameplay.play(Gameplay.Start.NEW))
+        except Exception:
+            traceback.print_exc()
+            print("\nthe events of the last frames:")
+            StressTest.print_frames(list(test.recent) + [Frame(len(test.times), 0.0, test.pending)])
+            result = 1
+        test.report(args.budget)
+        if memory and memory.report(args.max_growth * 1024, args.max_rss_growth * 1024, args.max_frame_alloc * 1024):
+            result = 1
+        if args.record:
+            with open(args.record, 'w') as f:
+                json.dump({ 'seed': seed, 'frames': RecordedEvents.to_json(test.posted) }, f)
+            print(f"Events written to {args.record}")
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        loop.close()
+        pygame.quit()
+        shutil.rmtree(data_dir, ignore_errors = True)
+    return result
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+# difficulty sweeps: simulated games (GameState and a player of players.py) for a grid of rule parameters
+#   python sweep.py --range-size 6 7 8 9 10 --sizes 5x6 6x7 --games 500
+#   python sweep.py --range-offset 6 8 10 --range-divisor 2 3 --out sweep.json
+# every combination of the parameters is a point, its games run on a process pool in chunks
+# the results of a point are cached on disk by a hash of the parameters, a rerun only plays the new points
+# reported per point: the game length (moves) and the highest tile curves:
+# the fraction of the games that reaches a tile and the median move at which it was reached
+
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Self, List, Dict, Tuple
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import statistics
+import sys
+
+from game_state import GameState, Rules, DEFAULT_RULES
+from players import Players
+
+@dataclass(frozen = True)
+class SweepPoint:
+    columns: int = GameState.COLUMNS
+    rows: int = GameState.ROWS
+    range_size: int = DEFAULT_RULES.range_size
+    range_offset: int = DEFAULT_RULES.range_offset
+    range_divisor: int = DEFAULT_RULES.range_divisor
+    neighbours: int = DEFAULT_RULES.neighbours
+    chain: str = DEFAULT_RULES.chain
+    rounding: str = DEFAULT_RULES.rounding
+    spawn: str = DEFAULT_RULES.spawn
+
+    def get_rules(self: Self) -> Rules:
+        return Rules(self.range_size, self.range_offset, self.range_divisor, self.neighbours, self.chain, self.rounding, self.spawn)
+
+    # the move rules only when they aren't those of the game
+    def get_label(self: Self) -> str:
+        label = f"{self.columns}x{self.rows} size {self.range_size} (h-{self.range_offset})//{self.range_divisor}"
+        if not self.get_rules().has_default_moves():
+            label += f" n{self.neighbours} {self.chain} {self.rounding}"
+        if self.spawn != DEFAULT_RULES.spawn:
+            label += f" spawn {self.spawn}"
+        return label
+
+# 1 game: number of moves, highest tile, score and the move at which every highest tile was first reached
+def play_game(point: SweepPoint, player_name: str, seed: int, max_moves: int):
+    state = GameState(point.columns, point.rows, seed, rules = point.get_rules())
+    player = Players.create(player_name, seed)
+    highest = state.get_highest_number()
+    reached = { highest: 0 }
+    while state.moves < max_moves and (chain := player.choose(state)):
+        state.apply_chain(chain)
+        if (h := state.get_highest_number()) > highest:
+            for tile in range(highest + 1, h + 1):
+                reached[tile] = state.moves
+            highest = h
+    return { 'moves': state.moves, 'highest': highest, 'score': state.score, 'reached': reached }
+
+def play_games(point: SweepPoint, player_name: str, first_seed: int, nbr_games: int, max_moves: int):
+    return [play_game(point, player_name, seed, max_moves) for seed in range(first_seed, first_seed + nbr_games)]
+
+class Sweep:
+    CACHE_VERSION = 1 # change when the rules or the players change, the cached results are then played again
+    CHUNK_GAMES = 25
+
+    def __init__(self: Self, cache_path: str, player: str, games: int, seed: int, max_moves: int):
+        self.cache_path = cache_path
+        self.player = player
+        self.games = games
+        self.seed = seed
+        self.max_moves = max_moves
+        os.makedirs(cache_path, exist_ok = True)
+
+    def __get_key(self: Self, point: SweepPoint) -> str:
+        js = { 'point': asdict(point), 'player': self.player, 'games': self.games, 'seed': self.seed,
+               'max-moves': self.max_moves, 'version': Sweep.CACHE_VERSION }
+        return hashlib.sha256(json.dumps(js, sort_keys = True).encode()).hexdigest()[:24]
+
+    def __read_cache(self: Self, point: SweepPoint):
+        try:
+            with open(os.path.join(self.cache_path, self.__get_key(point) + '.json'), 'r') as f:
+                return json.load(f)['games']
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def __write_cache(self: Self, point: SweepPoint, games) -> None:
+        try:
+            path = os.path.join(self.cache_path, self.__get_key(point) + '.json')
+            with open(path + '.tmp', 'w') as f:
+                json.dump({ 'point': asdict(point), 'player': self.player, 'games': games }, f)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            print(e)
+
+    # the games of all points, from the cache or played on the pool
+    def run(self: Self, points: List[SweepPoint], workers: int | None) -> Dict[SweepPoint, List]:
+        results = {}
+        todo = []
+        for point in points:
+            if (games := self.__read_cache(point)) is not None:
+                results[point] = games
+            else:
+                todo.append(point)
+        print(f"{len(points) - len(todo)} of {len(points)} points cached, playing {len(todo) * self.games} games")
+        if not todo:
+            return results
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            futures = { point: [pool.submit(play_games, point, self.player, self.seed + start, min(Sweep.CHUNK_GAMES, self.games - start), self.max_moves)
+                                for start in range(0, self.games, Sweep.CHUNK_GAMES)]
+                        for point in todo }
+            for point, chunks in futures.items():
+                games = [game for chunk in chunks for game in chunk.result()]
+                # json keys are strings, the same in the cache and in a fresh result
+                for game in games:
+                    game['reached'] = { str(k): v for k, v in game['reached'].items() }
+                self.__write_cache(point, games)
+                results[point] = games
+                print(f"  {point.get_label()}: done")
+        return results
+
+    @staticmethod
+    def summarize(games) -> Dict:
+        moves = sorted(g['moves'] for g in games)
+        deciles = statistics.quantiles(moves, n = 10) if len(moves) > 1 else moves * 9
+        tiles = sorted({ int(t) for g in games for t in g['reached'] })
+        reach = {}
+        for tile in tiles:
+            at = [g['reached'][str(tile)] for g in games if str(tile) in g['reached']]
+            reach[tile] = { 'fraction': len(at) / len(games), 'median-move': statistics.median(at) }
+        return { 'games': len(games),
+                 'moves': { 'mean': statistics.fmean(moves), 'p10': deciles[0], 'p50': deciles[4], 'p90': deciles[8] },
+                 'highest': { 'mean': statistics.fmean(g['highest'] for g in games), 'max': max(g['highest'] for g in games) },
+                 'score': { 'mean': statistics.fmean(g['score'] for g in games) },
+                 'reach': reach }
+
+def report(summaries: Dict[SweepPoint, Dict]) -> None:
+    # the tiles that aren't on the board from the start and not reached in every game
+    tiles = sorted({ tile for s in summaries.values() for tile, r in s['reach'].items() if r['fraction'] < 1 and r['median-move'] > 0 })[:12]
+    width = max([34] + [len(point.get_label()) + 2 for point in summaries])
+    print(f"\n{'point':<{width}}{'moves p50':>10}{'p90':>7}{'high':>6}  " + "".join(f"{'>=' + str(t):>6}" for t in tiles))
+    for point, s in summaries.items():
+        curve = "".join(f"{s['reach'].get(t, {'fraction': 0})['fraction']:>6.0%}" for t in tiles)
+        print(f"{point.get_label():<{width}}{s['moves']['p50']:>10.0f}{s['moves']['p90']:>7.0f}{s['highest']['mean']:>6.1f}  {curve}")
+    print(f"\n{'point':<{width}}median move to reach a tile")
+    for point, s in summaries.items():
+        print(f"{point.get_label():<{width}}" + "".join((f"{s['reach'][t]['median-move']:>6.0f}" if t in s['reach'] else f"{'-':>6}") for t in tiles))
+
+# the argument types: a bad value is an error of the command line, not of the pool workers
+def positive_int(text: str) -> int:
+    if not text.isdigit() or int(text) < 1:
+        raise argparse.ArgumentTypeError(f"not a positive number: {text}")
+    return int(text)
+
+def board_size(text: str) -> Tuple[int, int]:
+    numbers = text.lower().split('x')
+    if len(numbers) != 2 or not all(n.isdigit() and int(n) > 0 for n in numbers):
+        raise argparse.ArgumentTypeError(f"a size is columns x rows, e.g. 5x6: {text}")
+    return int(numbers[0]), int(numbers[1])
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = "ConnectLog2 difficulty sweeps over the rule parameters")
+    parser.add_argument("--sizes", nargs = "+", type = board_size, default = [(GameState.COLUMNS, GameState.ROWS)], help = "board sizes, columns x rows")
+    parser.add_argument("--range-size", nargs = "+", type = positive_int, default = [DEFAULT_RULES.range_size])
+    parser.add_argument("--range-offset", nargs = "+", type = int, default = [DEFAULT_RULES.range_offset])
+    parser.add_argument("--range-divisor", nargs = "+", type = positive_int, default = [DEFAULT_RULES.range_divisor])
+    parser.add_argument("--neighbours", nargs = "+", type = int, choices = Rules.NEIGHBOURS, default = [DEFAULT_RULES.neighbours])
+    parser.add_argument("--chain", nargs = "+", choices = Rules.CHAINS, default = [DEFAULT_RULES.chain],
+                        help = "same-or-higher: after the first 2 equal tiles the same or 1 higher, same: only equal tiles")
+    parser.add_argument("--rounding", nargs = "+", choices = Rules.ROUNDINGS, default = [DEFAULT_RULES.rounding],
+                        help = "the merged tile: the sum rounded up or down to a power of 2")
+    parser.add_argument("--spawn", nargs = "+", choices = Rules.SPAWNS, default = [DEFAULT_RULES.spawn],
+                        help = "the new tiles: uniform, weighted (lower numbers more likely) or guarantee (always a move left)")
+    parser.add_argument("--player", choices = Players.NAMES, default = 'greedy')
+    parser.add_argument("--games", type = positive_int, default = 200, help = "games per point (default 200)")
+    parser.add_argument("--seed", type = int, default = 1, help = "seed of the first game, the games of every point use the same seeds")
+    parser.add_argument("--max-moves", type = positive_int, default = 5000, help = "a game is stopped after this many moves")
+    parser.add_argument("--workers", type = positive_int, help = "processes (default: number of cpus)")
+    parser.add_argument("--cache", default = ".sweep-cache", help = "directory for the cached results")
+    parser.add_argument("--out", metavar = "PATH", help = "write the summaries as json")
+    args = parser.parse_args(argv)
+
+    points = [SweepPoint(c, r, size, offset, divisor, neighbours, chain, rounding, spawn)
+              for (c, r), size, offset, divisor, neighbours, chain, rounding, spawn
+              in itertools.product(args.sizes, args.range_size, args.range_offset, args.range_divisor, args.neighbours, args.chain, args.rounding, args.spawn)]
+    sweep = Sweep(args.cache, args.player, args.games, args.seed, args.max_moves)
+    summaries = { point: Sweep.summarize(games) for point, games in sweep.run(points, args.workers).items() }
+    summaries = { point: summaries[point] for point in points }
+    report(summaries)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump([{ 'point': asdict(point), 'player': args.player } | s for point, s in summaries.items()], f, indent = 2)
+        print(f"Summaries written to {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# telemetry of the moves in columnar chunks, needs numpy
+# a directory with 1 .npy file per column per chunk: <column>.<chunk>.npy, chunks are only added (never rewritten),
+# so a column of millions of moves is read with 1 np.load (memory mapped) per chunk without parsing anything
+# the moves are buffered in numpy arrays, a chunk is written when the buffer is full and at close()
+#   game            id of the game (random)
+#   move            number of the move in the game, from 1
+#   chain_length    number of connected tiles
+#   inputs          the numbers of the connected tiles, all moves after each other (split with chain_length)
+#   result          number of the new tile
+#   low_before, high_before, low, high
+#                   tile range (TileRange) before and after the move (handle_highest_number)
+#   decide_ms       time since the previous move (or the start of the game)
+#   animation_ms    time to make the move, with the animation
+#   score           score after the move
+# written by Gameplay (--telemetry) and the headless games of the bot api
+
+from typing import Self, Dict, List
+import glob
+import os
+import random
+import re
+
+import numpy as np
+
+class TelemetryWriter:
+    COLUMNS = { 'game': np.int64, 'move': np.uint32, 'chain_length': np.uint16, 'result': np.uint8,
+                'low_before': np.uint8, 'high_before': np.uint8, 'low': np.uint8, 'high': np.uint8,
+                'decide_ms': np.float32, 'animation_ms': np.float32, 'score': np.uint64 }
+    CHUNK_ROWS = 1 << 16
+
+    def __init__(self: Self, path: str, chunk_rows: int = CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        os.makedirs(path, exist_ok = True)
+        # continue after the chunks of earlier sessions
+        chunks = [int(m.group(1)) for f in glob.glob(os.path.join(path, 'move.*.npy')) if (m := re.search(r'\.(\d+)\.npy$', f))]
+        self.__chunk = max(chunks, default = -1) + 1
+        self.__columns: Dict[str, np.ndarray] = { name: np.empty(chunk_rows, dtype) for name, dtype in TelemetryWriter.COLUMNS.items() }
+        self.__inputs: np.ndarray = np.empty(chunk_rows * 4, np.uint8)
+        self.__rows = 0
+        self.__nbr_inputs = 0
+
+    @staticmethod
+    def new_game_id() -> int:
+        return random.getrandbits(63)
+
+    def add_move(self: Self, game: int, move: int, inputs: List[int], result: int, low_before: int, high_before: int,
+                 low: int, high: int, decide_ms: float, animation_ms: float, score: int) -> None:
+        row = self.__rows
+        if row == len(self.__columns['move']): # a chunk that couldn't be written is kept: more room
+            self.__columns = { name: np.resize(values, 2 * row) for name, values in self.__columns.items() }
+        columns = self.__columns
+        columns['game'][row] = game
+        columns['move'][row] = move
+        columns['chain_length'][row] = len(inputs)
+        columns['result'][row] = result
+        columns['low_before'][row] = low_before
+        columns['high_before'][row] = high_before
+        columns['low'][row] = low
+        columns['high'][row] = high
+        columns['decide_ms'][row] = decide_ms
+        columns['animation_ms'][row] = animation_ms
+        columns['score'][row] = score
+        if self.__nbr_inputs + len(inputs) > len(self.__inputs):
+            self.__inputs = np.resize(self.__inputs, 2 * (self.__nbr_inputs + len(inputs)))
+        self.__inputs[self.__nbr_inputs:self.__nbr_inputs + len(inputs)] = inputs
+        self.__nbr_inputs += len(inputs)
+        self.__rows += 1
+        if self.__rows % self.chunk_rows == 0:
+            self.flush()
+
+    # write the buffered moves as a new chunk, when that fails they are kept and written again (all columns) with the next chunk
+    def flush(self: Self) -> None:
+        if not self.__rows:
+            return
+        try:
+            # the move column last: a chunk only counts (for the reader) when it's complete
+            self.__save('inputs', self.__inputs[:self.__nbr_inputs])
+            for name in [n for n in TelemetryWriter.COLUMNS if n != 'move'] + ['move']:
+                self.__save(name, self.__columns[name][:self.__rows])
+        except Exception as e:
+            print(e)
+            return
+        self.__chunk += 1
+        self.__rows = 0
+        self.__nbr_inputs = 0
+
+    def __save(self: Self, name: str, values: np.ndarray) -> None:
+        path = os.path.join(self.path, f'{name}.{self.__chunk:06d}.npy')
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, values)
+        os.replace(path + '.tmp', path)
+
+    def close(self: Self) -> None:
+        self.flush()
+
+class TelemetryReader:
+    def __init__(self: Self, path: str):
+        self.path = path
+        # complete chunks only: the move column is written last
+        self.chunks = sorted(int(m.group(1)) for f in glob.glob(os.path.join(path, 'move.*.npy')) if (m := re.search(r'\.(\d+)\.npy$', f)))
+
+    # all values of a column, the chunks are memory mapped
+    def column(self: Self, name: str) -> np.ndarray:
+        parts = [np.load(os.path.join(self.path, f'{name}.{chunk:06d}.npy'), mmap_mode = 'r') for chunk in self.chunks]
+        if not parts:
+            return np.empty(0, TelemetryWriter.COLUMNS.get(name, np.uint8))
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    def __len__(self: Self) -> int:
+        return len(self.column('move'))
+
+    # the input numbers of move i: inputs[offsets[i]:offsets[i + 1]]
+    def inputs(self: Self):
+        lengths = self.column('chain_length')
+        offsets = np.zeros(len(lengths) + 1, np.int64)
+        np.cumsum(lengths, out = offsets[1:])
+        return self.column('inputs'), offsets
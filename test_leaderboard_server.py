@@ -0,0 +1,74 @@
+# tests of the leaderboard server over http, on a free port with a log in a temporary directory
+#   python -m unittest test_leaderboard_server
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from leaderboard_server import LeaderboardServer, ScoreLog
+
+class LeaderboardServerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.dir.name, 'leaderboard.jsonl')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    @staticmethod
+    def score(points: int) -> dict:
+        return { 'points': points, 'tile': 12, 'user': 'test', 'datetime': f'2024-01-01 00:00:{points % 60:02}' }
+
+    @staticmethod
+    async def request(port: int, method: str, target: str, body: bytes = b'') -> tuple:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            key, _, value = line.decode().partition(':')
+            if key.lower() == 'content-length':
+                length = int(value)
+        response = await reader.readexactly(length)
+        writer.close()
+        return status, json.loads(response) if response else None
+
+    async def post_batches(self, batches) -> list:
+        server = LeaderboardServer('127.0.0.1', 0, self.log)
+        await server.start()
+        try:
+            results = [await self.request(server.port, 'POST', '/scores', json.dumps(batch).encode()) for batch in batches]
+            _, top = await self.request(server.port, 'GET', '/top?n=100')
+            return results, top
+        finally:
+            await server.stop()
+
+    # a bad score at the end of a batch rejects the whole batch: nothing is added that isn't in the log
+    def test_batch_with_bad_trailing_score(self):
+        bad = [self.score(100), self.score(200), { 'points': 'many', 'tile': 12, 'user': 'test', 'datetime': 'x' }]
+        results, top = asyncio.run(self.post_batches([bad, bad[:-1] + [{ 'points': 300 }]]))
+        self.assertEqual([status for status, _ in results], [400, 400])
+        self.assertEqual(top, [])
+        # the batch without the bad score is accepted completely, and the state after a restart is the same
+        results, top = asyncio.run(self.post_batches([bad[:-1]]))
+        self.assertEqual(results, [(200, { 'accepted': 2 })])
+        _, restarted = asyncio.run(self.post_batches([]))
+        self.assertEqual(restarted, top)
+        self.assertEqual([s['points'] for s in top], [200, 100])
+
+    # a batch that can't be logged isn't added either: 500, and the memory stays the same as the log
+    def test_batch_not_logged(self):
+        with mock.patch.object(ScoreLog, 'append', side_effect = OSError(28, "No space left on device")):
+            results, top = asyncio.run(self.post_batches([[self.score(100), self.score(100)]]))
+        self.assertEqual([status for status, _ in results], [500])
+        self.assertEqual(top, [])
+        results, top = asyncio.run(self.post_batches([[self.score(100), self.score(100)]]))
+        self.assertEqual(results, [(200, { 'accepted': 1 })])
+        self.assertEqual([s['points'] for s in top], [100])
+
+if __name__ == '__main__':
+    unittest.main()
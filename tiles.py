@@ -4,7 +4,11 @@ import pygame
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Self
+from typing import Self, Dict, Tuple
+
+from profiling import Profiler
+from fonts import Fonts
+from scale import Scale
 
 class TileState(Enum):
     ON = 1
@@ -33,16 +37,87 @@ class Tiles(object):
               "saddlebrown", "seagreen"]
     MIN_NBR = 1
     MAX_NBR = 60
+    # unused color for transparency
+    TRANSPARENT = "grey20"
+    # rendered tile images per (number, color, marked, highlighted), shared by all tiles with the same look
+    # at the current scale, rendered again after the scale changed
+    __images: Dict[Tuple[int, str, bool, bool], pygame.Surface] = {}
+
     @staticmethod
     def get_tile(number: int) -> pygame.sprite.Sprite:
         # gauge number, TODO: give out-of-range error instead
         number = min(Tiles.MAX_NBR, number)
         number = max(Tiles.MIN_NBR, number)
-        return Tile(number, Tiles.colors[(number - 1) % len(Tiles.colors)])
+        return Tile(number, Tiles.get_color(number))
+
+    @staticmethod
+    def get_color(number: int) -> str:
+        return Tiles.colors[(number - 1) % len(Tiles.colors)]
+
+    @staticmethod
+    def get_image(number: int, color: str, marked: bool, highlighted: bool) -> pygame.Surface:
+        key = (number, color, marked, highlighted)
+        if (image := Tiles.__images.get(key)) is None:
+            image = Tiles.__images[key] = Tiles.render_image(number, color, marked, highlighted)
+        return image
+
+    # the size of the tiles at the current scale (scale.py), the images of another size are dropped
+    @staticmethod
+    def set_scale() -> None:
+        size = Scale.px(Tile.BASE_SIZE)
+        if size != Tile.WIDTH:
+            Tile.WIDTH = Tile.HEIGHT = size
+            Tiles.__images.clear()
+
+    # put already rendered images in the cache (e.g. loaded from disk)
+    @staticmethod
+    def add_image(number: int, color: str, marked: bool, highlighted: bool, image: pygame.Surface) -> None:
+        Tiles.__images[(number, color, marked, highlighted)] = image
+
+    # all tile images in 1 png: a row per number, a column per (marked, highlighted)
+    # rendered once and loaded by other processes (render_replays.py) instead of rendering every tile with the font
+    ATLAS_LOOKS = [(False, False), (True, False), (False, True), (True, True)]
+
+    @staticmethod
+    def save_atlas(path: str) -> None:
+        atlas = pygame.Surface((Tile.WIDTH * len(Tiles.ATLAS_LOOKS), Tile.HEIGHT * Tiles.MAX_NBR))
+        atlas.fill(pygame.Color(Tiles.TRANSPARENT))
+        for number in range(Tiles.MIN_NBR, Tiles.MAX_NBR + 1):
+            for column, (marked, highlighted) in enumerate(Tiles.ATLAS_LOOKS):
+                image = Tiles.get_image(number, Tiles.get_color(number), marked, highlighted)
+                atlas.blit(image, (column * Tile.WIDTH, (number - 1) * Tile.HEIGHT))
+        pygame.image.save(atlas, path)
+
+    @staticmethod
+    def load_atlas(path: str) -> None:
+        atlas = pygame.image.load(path)
+        for number in range(Tiles.MIN_NBR, Tiles.MAX_NBR + 1):
+            for column, (marked, highlighted) in enumerate(Tiles.ATLAS_LOOKS):
+                image = atlas.subsurface((column * Tile.WIDTH, (number - 1) * Tile.HEIGHT, Tile.WIDTH, Tile.HEIGHT)).copy()
+                image.set_colorkey(Tiles.TRANSPARENT)
+                Tiles.add_image(number, Tiles.get_color(number), marked, highlighted, image)
+
+    @staticmethod
+    def render_image(number: int, color: str, marked: bool, highlighted: bool) -> pygame.Surface:
+        image = pygame.Surface([Tile.WIDTH, Tile.HEIGHT])
+        image.fill(pygame.Color(Tiles.TRANSPARENT))
+        image.set_colorkey(Tiles.TRANSPARENT)
+        pygame.draw.rect(image, color, pygame.Rect(0, 0, Tile.WIDTH, Tile.HEIGHT), width = 0, border_radius = Scale.px(7)) 
+  
+        font = Fonts.get_scaled(60)
+        text_color = pygame.Color("white") if not marked else pygame.Color("black")
+        text = font.render(str(number), True, text_color)
+        text_rect = text.get_rect(center=(Tile.WIDTH/2, Tile.HEIGHT/2))
+        image.blit(text, text_rect)
+
+        if highlighted:
+            pygame.draw.rect(image, pygame.Color("white"), pygame.Rect(0, 0, Tile.WIDTH, Tile.HEIGHT), width = max(1, Scale.px(2)), border_radius = Scale.px(7))
+        return image
 
     
 class Tile(pygame.sprite.Sprite): 
-    WIDTH = HEIGHT = 80
+    BASE_SIZE = 80 # at scale 1
+    WIDTH = HEIGHT = BASE_SIZE # at the current scale, see Tiles.set_scale()
     def __init__(self: Self, number: int, color: str):
         super().__init__() 
   
@@ -50,7 +125,6 @@ class Tile(pygame.sprite.Sprite):
         self.number = number
         self.highlighted = False
         self.marked = False
-        self.image = pygame.Surface([Tile.WIDTH, Tile.HEIGHT]) 
         self.__draw_sprite()
   
         self.rect = self.image.get_rect() 
@@ -87,25 +161,7 @@ class Tile(pygame.sprite.Sprite):
     def get_rect(self: Self) -> pygame.Rect:
         return self.rect
 
+    @Profiler.timed("Tile.draw_sprite")
     def __draw_sprite(self: Self):
-        # use unused color for transparency
-        unused_color = "grey20"
-        self.image.fill(pygame.Color(unused_color))
-        self.image.set_colorkey(unused_color)
-        pygame.draw.rect(self.image, self.color, pygame.Rect(0, 0, Tile.WIDTH, Tile.HEIGHT), width = 0, border_radius = 7) 
-  
-        font = pygame.font.Font(None, 60)
-        text_color = pygame.Color("white") if not self.marked else pygame.Color("black")
-        text = font.render(str(self.number), True, text_color)
-        text_rect = text.get_rect(center=(Tile.WIDTH/2, Tile.HEIGHT/2))
-        self.image.blit(text, text_rect)
-
-        if self.highlighted:
-            pygame.draw.rect(self.image, pygame.Color("white"), pygame.Rect(0, 0, Tile.WIDTH, Tile.HEIGHT), width = 2, border_radius = 7)
-
-
-
-
-
-
-
+        # the image is shared with the other tiles that look the same, it isn't drawn on
+        self.image = Tiles.get_image(self.number, self.color, self.marked, self.highlighted)